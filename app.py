@@ -1,27 +1,26 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
-import glob
 import os
-import re
-import io
-import sys
+from datetime import datetime
 from pathlib import Path
-import unicodedata
 
-# pyhwp 라이브러리 내부 모듈 임포트 시도
-try:
-    import hwp5.hwp5txt
-    HAS_PYHWP = True
-except ImportError:
-    HAS_PYHWP = False
+import jobs
+import perf_trace as perf
+from app_cache import (get_data_version, get_regulation_names, get_catalog, get_regulation_dates, get_regulation_toc,
+                       get_toc_contents, search_keyword, search_query, fetch_article_history, fetch_article_detail, iter_citations, db_exists,
+                       get_release_info, get_similarity_index, get_duplicate_clusters, get_cluster_members,
+                       get_impact_reports, get_impact_report, get_autocomplete_index, get_glossary_terms,
+                       get_term_definitions, USE_RELEASE)
+from regulation_db import DATA_DIR, PREFERRED_REG_NAME, DEFAULT_ART_NO, SEARCH_FACETS, LEVEL_ORDER, CITATION_KINDS, citation_terms
+from similarity import DEFAULT_TOP_K
+from near_duplicates import word_diff
+from impact_report import CHANGE_TYPES, export_excel, report_frames
+from text_index import highlight, parse_query
+from glossary import KINDS
 
 # =========================================================
 # 1. 설정 및 상수 정의
 # =========================================================
-DB_FILE = "regulation_master.db"
-DATA_DIR = "규정"
-
 MENU_NAMES = {
     "1": "1. 규정 목록 확인",
     "2": "2. 개정 일자 확인",
@@ -29,628 +28,224 @@ MENU_NAMES = {
     "4": "4. 조항 히스토리 추적",
     "5": "5. 조항 상세 조회",
     "6": "6. 통합 키워드 검색",
-    "7": "7. 조항 인용(역참조) 검색"
+    "7": "7. 조항 인용(역참조) 검색",
+    "8": "8. 유사 조항 찾기",
+    "9": "9. 시장 간 유사 조항 비교",
+    "10": "10. 개정 영향 보고서",
+    "11": "11. 용어 사전"
 }
 
-PREFERRED_REG_NAME = "유가증권시장 업무규정"
-DEFAULT_ART_NO = "제20조의2"
-
-# ----------------------------------------------------------------------
-# [추가됨] TXT 파싱용 정규표현식 상수
-# ----------------------------------------------------------------------
-ARTICLE_ID_PATTERN = re.compile(r"^(제\d+조(?:의\d+)?)")
-HO_PATTERN = re.compile(r"(^|\n)\s*(\d+(?:의\d+)*)\.\s*", re.MULTILINE)
-HANG_PATTERN = re.compile(r"(^|\n)\s*([①-⑳])", re.MULTILINE)
-MOK_PATTERN = re.compile(r"(^|\n)\s*([가-하])\.\s*", re.MULTILINE)
-CHAPTER_PATTERN = re.compile(r"^제(\d+)장\s*(.+)")
-SECTION_PATTERN = re.compile(r"^제(\d+)절\s*(.+)")
-
+# 백그라운드 작업 진행률 갱신 주기(초)와 끝난 작업 결과를 사이드바에 남겨 둘 시간(초)
+JOB_POLL_SEC = 1.0
+JOB_RESULT_SEC = 600
 
 # =========================================================
-# 2. HWP -> TXT 및 TXT -> CSV 변환 관련 함수
+# 2. 백그라운드 작업(변환/적재/내보내기) 및 성능 패널 표시
 # =========================================================
-def convert_hwp_to_txt_st():
-    """Streamlit 환경에서 실행하기 위한 HWP -> TXT 파싱 로직"""
-    target_dir = Path(DATA_DIR)
-    
-    if not target_dir.is_dir():
-        return -1, 0, 0, f"'{DATA_DIR}' 폴더가 없습니다."
-
-    hwp_files = list(target_dir.glob("*.hwp"))
-    if not hwp_files:
-        return 0, 0, 0, f"'{DATA_DIR}' 폴더 내에 .hwp 파일이 없습니다."
-
-    converted = 0
-    skipped = 0
-    errors = 0
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for idx, hwp_path in enumerate(hwp_files):
-        txt_path = hwp_path.with_suffix(".txt")
-        
-        if txt_path.exists():
-            skipped += 1
-        else:
-            status_text.text(f"처리 중: {hwp_path.name}")
-            
-            # 파이썬 내부 모듈(hwp5txt)을 직접 호출
-            original_argv = sys.argv
-            sys.argv = ['hwp5txt', '--output', str(txt_path), str(hwp_path)]
-            
-            try:
-                hwp5.hwp5txt.main()
-                # 에러 없이 정상 리턴되는 경우 카운트 증가
-                converted += 1
-            except SystemExit as e:
-                # hwp5txt.main()이 내부적으로 sys.exit()을 호출하는 경우 에러 코드로 분기
-                if e.code == 0 or e.code is None:
-                    converted += 1
-                else:
-                    st.error(f"'{hwp_path.name}' 변환 실패 (에러 코드: {e.code})")
-                    errors += 1
-            except Exception as e:
-                st.error(f"'{hwp_path.name}' 처리 중 알 수 없는 오류: {e}")
-                errors += 1
-            finally:
-                sys.argv = original_argv
-                
-        progress_bar.progress((idx + 1) / len(hwp_files))
-        
-    status_text.empty()
-    progress_bar.empty()
-    return converted, skipped, errors, "완료"
-
-def read_source_text(filename: str) -> str:
-    path = Path(filename)
-    if not path.exists():
-        raise FileNotFoundError(f'"{filename}" 파일을 찾을 수 없습니다.')
-
-    encodings_to_try = ["utf-8", "cp949", "euc-kr"]
-    text = None
-    for enc in encodings_to_try:
-        try:
-            with path.open("r", encoding=enc) as f:
-                text = f.read()
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if text is None:
-        with path.open("rb") as f:
-            text = f.read().decode("utf-8", errors="ignore")
-    return text
-
-def clean_text(s: str) -> str:
-    if s is None: return ""
-    s = s.replace("\t", " ")
-    return re.sub(r"\s+", " ", s).strip()
+def start_job(job_type):
+    """작업을 백그라운드로 시작. 같은 종류가 이미 실행 중이면 그 작업의 진행 상황을 함께 봄"""
+    job_id, started = jobs.submit(job_type)
+    st.session_state.setdefault("watched_jobs", {})[job_id] = job_type
+    if not started:
+        st.info(f"이미 실행 중인 '{jobs.JOB_LABELS[job_type]}' 작업이 있어 그 진행 상황을 표시합니다.")
+
+def render_job_result(job):
+    label = jobs.JOB_LABELS[job["job_type"]]
+    if job["status"] == jobs.STATUS_FAILED:
+        st.error(f"{label} 실패: {job['error']}")
+        return
+
+    r = job["result"]
+    if job["job_type"] in ("hwp_to_txt", "txt_to_parquet"):
+        if r["converted"] == -1: st.warning(r["message"])
+        elif r["converted"] == 0 and r["skipped"] == 0: st.info(r["message"])
+        else: st.success(f"{label.replace(' -> ', '->')} 완료! (신규: {r['converted']}개, 건너뜀: {r['skipped']}개, 오류: {len(r['errors'])}개)")
+        for err in r["errors"]: st.error(err)
+    elif job["job_type"] == "db_update":
+        if r["loaded"] == -1: st.warning(f"폴더가 생성되었습니다. Parquet/CSV 파일을 '{DATA_DIR}'에 넣어주세요.")
+        else: st.success(f"DB 업데이트 완료! (신규: {r['loaded']}개, 건너뜀: {r['skipped']}개)")
+    elif job["job_type"] == "excel_export" and os.path.exists(r["path"]):
+        st.download_button(
+            label="💾 엑셀 파일 다운로드",
+            data=lambda path=r["path"]: Path(path).read_bytes(),
+            file_name="regulation_db_dump.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"download_{job['id']}",
+            on_click="ignore",
+        )
 
-def parse_moks(base_ref: str, article_id: str, title: str, hang: str, ho: str, ho_text: str):
-    rows = []
-    mok_matches = list(MOK_PATTERN.finditer(ho_text))
-    if not mok_matches: return rows
-
-    for i, m in enumerate(mok_matches):
-        mok_char = m.group(2)
-        start = m.start(2)
-        end = mok_matches[i + 1].start(2) if i + 1 < len(mok_matches) else len(ho_text)
-        mok_text = ho_text[start:end].strip()
-        base_ref_mok = f"{base_ref}{mok_char}목"
-
-        rows.append({
-            "참조번호": base_ref_mok, "조": article_id, "조명": title,
-            "항": hang, "호": ho, "목": mok_char, "내용": mok_text
-        })
-    return rows
-
-def parse_h_block(article_id: str, title: str, h_char: str, block_raw: str):
-    rows = []
-    ho_matches = list(HO_PATTERN.finditer(block_raw))
-
-    if not ho_matches:
-        content = block_raw.strip()
-        rows.append({
-            "참조번호": f"{article_id}제{h_char}항", "조": article_id, "조명": title,
-            "항": h_char, "호": "0", "목": "0", "내용": content
-        })
-    else:
-        hang_main = block_raw[: ho_matches[0].start(0)].strip()
-        if hang_main:
-            rows.append({
-                "참조번호": f"{article_id}제{h_char}항", "조": article_id, "조명": title,
-                "항": h_char, "호": "0", "목": "0", "내용": hang_main
-            })
-
-    for i, match in enumerate(ho_matches):
-        start = match.start(2)
-        end = ho_matches[i + 1].start(0) if i + 1 < len(ho_matches) else len(block_raw)
-        ho_text = block_raw[start:end].strip()
-
-        m2 = re.match(r"(\d+(?:의\d+)*)\.\s*(.*)", ho_text, flags=re.S)
-        if m2:
-            ho_num = m2.group(1)
-            remainder = m2.group(2)
-        else:
-            ho_num = match.group(2)
-            remainder = ho_text
-
-        mok_matches = list(MOK_PATTERN.finditer(remainder))
-        if mok_matches: ho_main = remainder[: mok_matches[0].start(0)].strip()
-        else: ho_main = remainder.strip()
-
-        base_ref = f"{article_id}제{ho_num}호"
-        rows.append({
-            "참조번호": base_ref, "조": article_id, "조명": title,
-            "항": h_char, "호": ho_num, "목": "0", "내용": ho_main
-        })
-        rows.extend(parse_moks(base_ref, article_id, title, h_char, ho_num, remainder))
-    return rows
-
-def parse_article_with_hang(article_id: str, title: str, body_text: str):
-    rows = []
-    hang_matches = list(HANG_PATTERN.finditer(body_text))
-    for i, hm in enumerate(hang_matches):
-        h_char = hm.group(2)
-        start = hm.start(2)
-        end = hang_matches[i + 1].start(2) if i + 1 < len(hang_matches) else len(body_text)
-        block_raw = body_text[start:end].strip()
-        rows.extend(parse_h_block(article_id, title, h_char, block_raw))
-    return rows
-
-def parse_article_no_hang(article_id: str, title: str, body_text: str):
-    rows = []
-    ho_matches = list(HO_PATTERN.finditer(body_text))
-
-    if not ho_matches:
-        content = body_text.strip()
-        rows.append({
-            "참조번호": article_id, "조": article_id, "조명": title,
-            "항": "0", "호": "0", "목": "0", "내용": content
-        })
-        return rows
-
-    base_text = body_text[: ho_matches[0].start(0)].strip()
-    if base_text:
-        rows.append({
-            "참조번호": article_id, "조": article_id, "조명": title,
-            "항": "0", "호": "0", "목": "0", "내용": base_text
-        })
-
-    for i, match in enumerate(ho_matches):
-        start = match.start(2)
-        end = ho_matches[i + 1].start(0) if i + 1 < len(ho_matches) else len(body_text)
-        ho_text = body_text[start:end].strip()
-
-        m2 = re.match(r"(\d+(?:의\d+)*)\.\s*(.*)", ho_text, flags=re.S)
-        if m2:
-            ho_num = m2.group(1)
-            remainder = m2.group(2)
-        else:
-            ho_num = match.group(2)
-            remainder = ho_text
-
-        mok_matches = list(MOK_PATTERN.finditer(remainder))
-        if mok_matches: ho_main = remainder[: mok_matches[0].start(0)].strip()
-        else: ho_main = remainder.strip()
-
-        base_ref = f"{article_id}제{ho_num}호"
-        rows.append({
-            "참조번호": base_ref, "조": article_id, "조명": title,
-            "항": "0", "호": ho_num, "목": "0", "내용": ho_main
-        })
-        rows.extend(parse_moks(base_ref, article_id, title, "0", ho_num, remainder))
-    return rows
-
-def parse_article(article_text: str):
-    rows = []
-    lines_local = article_text.splitlines()
-    if not lines_local: return rows
-
-    header_line = lines_local[0]
-    m = ARTICLE_ID_PATTERN.match(header_line)
-    if not m: return rows
-    article_id = m.group(1)
-
-    after = header_line[m.end() :]
-    after_strip = after.lstrip()
-
-    if after_strip.startswith("삭제"):
-        rows.append({
-            "참조번호": article_id, "조": article_id, "조명": "삭제",
-            "항": "0", "호": "0", "목": "0", "내용": article_text.strip()
-        })
-        return rows
-
-    idx_lp = header_line.find("(", len(article_id))
-    idx_rp = header_line.find(")", idx_lp + 1) if idx_lp != -1 else -1
-    if idx_lp == -1 or idx_rp == -1 or idx_rp < idx_lp:
-        title = ""
-        first_body_part = header_line[m.end() :]
-    else:
-        title = header_line[idx_lp + 1 : idx_rp]
-        first_body_part = header_line[idx_rp + 1 :]
-
-    body_lines_local = []
-    if first_body_part is not None: body_lines_local.append(first_body_part.strip())
-    if len(lines_local) > 1: body_lines_local.extend(lines_local[1:])
-    body_text = "\n".join(body_lines_local).strip()
-
-    if not body_text:
-        rows.append({
-            "참조번호": article_id, "조": article_id, "조명": title,
-            "항": "0", "호": "0", "목": "0", "내용": ""
-        })
-        return rows
-
-    if re.search(r"[①-⑳]", body_text):
-        rows.extend(parse_article_with_hang(article_id, title, body_text))
-    else:
-        rows.extend(parse_article_no_hang(article_id, title, body_text))
-    return rows
-
-def parse_all(text: str):
-    lines = text.splitlines()
-    current_chapter_no = ""
-    current_chapter_title = ""
-    current_section_no = ""
-    current_section_title = ""
-    article_meta = []
-
-    for idx, line in enumerate(lines):
-        s = line.strip()
-        m_ch = CHAPTER_PATTERN.match(s)
-        if m_ch:
-            current_chapter_no = m_ch.group(1)
-            current_chapter_title = m_ch.group(2).strip()
-            continue
-        m_se = SECTION_PATTERN.match(s)
-        if m_se:
-            current_section_no = m_se.group(1)
-            current_section_title = m_se.group(2).strip()
+@st.fragment(run_every=JOB_POLL_SEC)
+def render_job_status():
+    """실행 중인 작업의 진행률과 최근에 끝난 작업의 결과를 주기적으로 갱신 (이 부분만 다시 실행됨)"""
+    watched = st.session_state.setdefault("watched_jobs", {})
+    refresh_app = False
+    for job_type, job in jobs.latest_jobs().items():
+        if job["status"] == jobs.STATUS_RUNNING:
+            watched[job["id"]] = job_type
+            st.progress(job["progress"], text=f"{jobs.JOB_LABELS[job_type]}: {job['message'] or '시작 중...'}")
             continue
-        if re.match(r"^제\d+조", s):
-            article_meta.append((idx, current_chapter_no, current_chapter_title, current_section_no, current_section_title))
-
-    article_texts = []
-    for i, meta in enumerate(article_meta):
-        start = meta[0]
-        end = article_meta[i + 1][0] if i + 1 < len(article_meta) else len(lines)
-        seg_lines = []
-        for j in range(start, end):
-            line = lines[j]
-            t = line.strip()
-            if t == "" or t == "조항 인쇄" or CHAPTER_PATTERN.match(t) or SECTION_PATTERN.match(t):
-                continue
-            seg_lines.append(line)
-        article_texts.append((meta, "\n".join(seg_lines)))
-
-    all_rows = []
-    for meta, art_text in article_texts:
-        _, ch_no, ch_title, se_no, se_title = meta
-        rows = parse_article(art_text)
-        for r in rows:
-            r["장번호"] = ch_no
-            r["장명"] = ch_title
-            r["절번호"] = se_no
-            r["절명"] = se_title
-        all_rows.extend(r for r in rows)
-
-    rows_clean = []
-    for r in all_rows:
-        hang = str(r.get("항", "0"))
-        ho = str(r.get("호", "0"))
-        mok = str(r.get("목", "0"))
-
-        if mok != "0": level = "목"
-        elif ho != "0": level = "호"
-        elif hang != "0": level = "항"
-        else: level = "조"
-
-        rows_clean.append({
-            "구분": level,
-            "장번호": clean_text(r.get("장번호", "")),
-            "장명": clean_text(r.get("장명", "")),
-            "절번호": clean_text(r.get("절번호", "")),
-            "절명": clean_text(r.get("절명", "")),
-            "참조번호": clean_text(r.get("참조번호", "")),
-            "조명": clean_text(r.get("조명", "")),
-            "조": clean_text(r.get("조", "")),
-            "항": hang, "호": ho, "목": mok,
-            "내용": clean_text(r.get("내용", "")),
-        })
-
-    return pd.DataFrame(rows_clean, columns=["구분", "장번호", "장명", "절번호", "절명", "참조번호", "조명", "조", "항", "호", "목", "내용"])
-
-def convert_txt_files_to_csv():
-    """Streamlit 환경에서 실행하기 위한 파싱 로직 래핑 함수"""
-    target_dir = Path(DATA_DIR)
-    
-    if not target_dir.is_dir():
-        return -1, 0, 0, f"'{DATA_DIR}' 폴더가 없습니다."
-
-    txt_files = list(target_dir.glob("*.txt"))
-    if not txt_files:
-        return 0, 0, 0, f"'{DATA_DIR}' 폴더 내에 .txt 파일이 없습니다."
-
-    converted = 0
-    skipped = 0
-    errors = 0
-    
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+        # 이 세션이 지켜보던 DB 업데이트가 끝나면 화면 전체를 다시 그려 새 데이터를 반영
+        if watched.pop(job["id"], None) == "db_update":
+            get_data_version.clear()
+            refresh_app = True
+        finished = datetime.fromisoformat(job["finished_at"]) if job["finished_at"] else None
+        if finished and (datetime.now() - finished).total_seconds() <= JOB_RESULT_SEC:
+            render_job_result(job)
+    if refresh_app: st.rerun(scope="app")
+
+def render_source_buttons():
+    """원본 변환 및 DB 등록 버튼 (배포용 읽기 전용 DB에서는 표시하지 않음)"""
+    # --- 원본 파일 처리 (HWP -> TXT -> Parquet) ---
+    st.markdown("**(1) 원본 파일 처리**")
     
-    for idx, txt_path in enumerate(txt_files):
-        output_csv_path = txt_path.with_suffix(".csv")
-        
-        if output_csv_path.exists():
-            skipped += 1
+    # [추가됨] HWP -> TXT 변환 버튼
+    # 버튼은 작업을 백그라운드로 시작만 하고, 진행률과 결과는 아래 작업 상태 영역에서 갱신됨
+    if st.button("📄 HWP -> TXT 변환"):
+        # 내장 추출기(olefile)로 읽고, 배포용 문서 등은 pyhwp로 변환
+        if not jobs.hwp_converter_available():
+            st.error("pyhwp 라이브러리가 설치되어 있지 않습니다. 터미널에서 'pip install pyhwp'를 실행해주세요.")
         else:
-            try:
-                status_text.text(f"처리 중: {txt_path.name}")
-                text = read_source_text(str(txt_path))
-                df = parse_all(text)
-                df.to_csv(output_csv_path, index=False, encoding="utf-8-sig")
-                converted += 1
-            except Exception as e:
-                st.error(f"'{txt_path.name}' 처리 중 오류: {e}")
-                errors += 1
-        
-        progress_bar.progress((idx + 1) / len(txt_files))
-        
-    status_text.empty()
-    progress_bar.empty()
-    return converted, skipped, errors, "완료"
+            start_job("hwp_to_txt")
 
-
-# =========================================================
-# 3. DB 핸들링 및 최적화 함수
-# =========================================================
-def get_connection():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    return conn
-
-def init_db():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS regulation_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            regulation_name TEXT,
-            reg_date TEXT,
-            unique_key TEXT,
-            ref_no TEXT,
-            article_title TEXT,
-            content TEXT,
-            UNIQUE(regulation_name, reg_date, unique_key)
-        )
-    ''')
-    
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_reg_name ON regulation_history(regulation_name);",
-        "CREATE INDEX IF NOT EXISTS idx_reg_date ON regulation_history(reg_date);",
-        "CREATE INDEX IF NOT EXISTS idx_ref_no ON regulation_history(ref_no);",
-        "CREATE INDEX IF NOT EXISTS idx_name_date ON regulation_history(regulation_name, reg_date);"
-    ]
-    for idx_sql in indexes: cursor.execute(idx_sql)
-    conn.commit()
-    conn.close()
-
-@st.cache_data(ttl=3600) 
-def get_regulation_names():
-    if not os.path.exists(DB_FILE): return []
-    conn = get_connection()
-    try:
-        df = pd.read_sql("SELECT DISTINCT regulation_name FROM regulation_history ORDER BY regulation_name", conn)
-        return df['regulation_name'].tolist()
-    except: return []
-    finally: conn.close()
-
-@st.cache_data(ttl=3600)
-def get_regulation_dates(reg_name):
-    conn = get_connection()
-    try:
-        dates = pd.read_sql("SELECT DISTINCT reg_date FROM regulation_history WHERE regulation_name=? ORDER BY reg_date DESC", conn, params=(reg_name,))
-        return dates['reg_date'].tolist()
-    finally: conn.close()
-
-def parse_filename_info(filename):
-    base_name = os.path.basename(filename)
-    name_without_ext = os.path.splitext(base_name)[0]
-    
-    # Mac(NFD)과 Windows(NFC)의 한글 인코딩 차이를 NFC(결합형)로 통일
-    name_without_ext = unicodedata.normalize('NFC', name_without_ext)
+    if st.button("📄 TXT -> Parquet 변환"):
+        start_job("txt_to_parquet")
     
-    date_match = re.search(r'(\d{8})', name_without_ext)
-    reg_date = date_match.group(1) if date_match else None
-    
-    if '_전문_' in name_without_ext:
-        reg_name = name_without_ext.split('_전문_')[0]
-    elif reg_date:
-        reg_name = name_without_ext.replace(reg_date, '').strip('_')
+    st.markdown("**(2) 시스템 DB 등록**")
+    if st.button("🔄 DB 업데이트 (증분)"):
+        start_job("db_update")
+
+@st.fragment
+def render_admin_panel():
+    """원본 변환/DB 등록/내보내기 버튼. 버튼을 눌러도 이 영역만 다시 실행되고 메뉴 화면은 다시 그리지 않음"""
+    # 배포용 읽기 전용 DB를 쓰는 중이면 변환/DB 등록 결과가 화면에 반영되지 않으므로 내보내기만 제공
+    if USE_RELEASE:
+        info = get_release_info()
+        st.caption(f"배포용 읽기 전용 DB 사용 중 (빌드 {info.get('built_at', '-')}, 데이터 버전 {info.get('data_version', '-')})")
     else:
-        reg_name = name_without_ext
-    return reg_name, reg_date
-
-def generate_key(row):
-    return f"{row['장번호']}_{row['조']}_{row['항']}_{row['호']}_{row['목']}"
-
-def load_files():
-    init_db()
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-        return -1, 0
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    existing = set()
-    try:
-        cursor.execute("SELECT DISTINCT regulation_name, reg_date FROM regulation_history")
-        for row in cursor.fetchall(): existing.add((row[0], row[1]))
-    except: pass
-
-    files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-    count = 0
-    skipped = 0
-    batch_data = []
-    
-    for filepath in files:
-        reg_name, reg_date = parse_filename_info(filepath)
-        if not reg_date: continue
+        render_source_buttons()
 
-        if (reg_name, reg_date) in existing:
-            skipped += 1
-            continue
-
-        try:
-            df = pd.read_csv(filepath)
-            df['unique_key'] = df.apply(generate_key, axis=1)
-            
-            for _, row in df.iterrows():
-                batch_data.append((
-                    reg_name, reg_date, row['unique_key'],
-                    row.get('참조번호', ''), row.get('조명', ''), str(row.get('내용', ''))
-                ))
-            
-            if len(batch_data) >= 1000:
-                cursor.executemany('''
-                    INSERT OR IGNORE INTO regulation_history 
-                    (regulation_name, reg_date, unique_key, ref_no, article_title, content) 
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', batch_data)
-                batch_data = []
-            
-            count += 1
-        except Exception:
-            pass
-            
-    if batch_data:
-        cursor.executemany('''
-            INSERT OR IGNORE INTO regulation_history 
-            (regulation_name, reg_date, unique_key, ref_no, article_title, content) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', batch_data)
-        
-    conn.commit()
-    conn.close()
-    
-    get_regulation_names.clear()
-    get_regulation_dates.clear()
-    
-    return count, skipped
-
-def export_db_to_excel():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
-    
-    output = io.BytesIO()
-    try:
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for table_name in tables:
-                t_name = table_name[0]
-                df = pd.read_sql(f"SELECT * FROM {t_name}", conn)
-                df.to_excel(writer, sheet_name=t_name, index=False)
-    except Exception:
-        conn.close()
-        return None
-
-    conn.close()
-    return output.getvalue()
+    st.write("")
+    st.markdown("**(3) 데이터 내보내기**")
+    if st.button("📥 DB 전체 엑셀 다운로드 준비"):
+        if db_exists():
+            start_job("excel_export")
+
+    render_job_status()
+
+def render_perf_panel():
+    """최근 요청의 단계별 소요 시간과 느린 쿼리 샘플 표시"""
+    enabled = st.toggle("단계별 시간 측정", value=perf.is_enabled(), help="모든 세션에 적용되며, 결과는 perf_trace.jsonl에도 기록됩니다.")
+    if enabled != perf.is_enabled():
+        perf.enable(enabled)
+    if not enabled:
+        st.caption("측정이 꺼져 있습니다.")
+        return
+
+    records = perf.recent_requests()[::-1]
+    if not records:
+        st.caption("아직 측정된 요청이 없습니다.")
+        return
+    rows = []
+    for r in records:
+        rows.append({"시각": r["ts"][11:19], "메뉴": r.get("menu", r["request"]), "합계(ms)": round(r["total_ms"], 1),
+                     **{k: round(v, 1) for k, v in perf.stage_breakdown(r).items()}})
+    st.markdown("**최근 요청 (단계별 ms)**")
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+    slow = perf.slow_queries()[::-1]
+    if slow:
+        st.markdown(f"**느린 쿼리 ({perf.SLOW_QUERY_MS:.0f}ms 이상)**")
+        st.dataframe(pd.DataFrame(slow)[["ts", "ms", "sql", "params"]], hide_index=True)
+
+
+def diff_markdown(base, other):
+    """기준 본문과 달라진 어절 표시 (새 어절은 빨간색, 기준에만 있던 어절은 취소선)"""
+    parts = []
+    for op, text in word_diff(base, other):
+        if op == "equal": parts.append(text)
+        elif op == "insert": parts.append(f":red[**{text}**]")
+        else: parts.append(f":grey[~~{text}~~]")
+    return " ".join(parts)
+
+def select_regulation(label, ac_index):
+    """규정 선택. 목록에 없는 값(규정명 앞부분이나 초성)을 입력하고 Enter를 누르면 자동 완성 첫 후보로 바꿈"""
+    value = st.selectbox(label, reg_names, index=default_reg_index, accept_new_options=True,
+                         help="규정명 앞부분이나 초성(예: ㅇㄱㅈㄱ)을 입력할 수 있습니다.")
+    if value in reg_names: return value
+    resolved = ac_index.resolve_name(value) if value else None
+    if resolved: st.caption(f"'{value}' → {resolved}")
+    else:
+        resolved = reg_names[default_reg_index]
+        st.warning(f"'{value}'와 일치하는 규정이 없어 {resolved}을(를) 조회합니다.")
+    return resolved
+
+def select_ref(label, ac_index, reg_name, reg_date=None):
+    """조항 번호 선택. 후보는 법령 순서이며 입력하는 대로 걸러짐.
+    목록에 없는 값은 자동 완성 첫 후보로 바꾸고, 후보가 없으면 입력 그대로 부분 일치 검색"""
+    options = ac_index.refs(reg_name, reg_date)
+    default = options.index(DEFAULT_ART_NO) if DEFAULT_ART_NO in options else (0 if options else None)
+    value = st.selectbox(label, options, index=default, accept_new_options=True,
+                         help="'20조의2', '20의2', '20조 1항'처럼 입력할 수 있습니다.")
+    resolved = ac_index.resolve_ref(reg_name, value, reg_date)
+    if resolved != (value or "").strip(): st.caption(f"'{value}' → {resolved}")
+    return resolved
 
 
 # =========================================================
-# 4. 메인 UI 구성
+# 3. 메인 UI 구성
 # =========================================================
-st.set_page_config(page_title="금융 규정 검색 시스템", layout="wide", page_icon="⚡")
+# 페이지 아이콘은 Material 아이콘을 사용 (이모지 문자열이면 Streamlit이 이모지 목록 전체를 로드해 첫 실행이 느려짐)
+st.set_page_config(page_title="금융 규정 검색 시스템", layout="wide", page_icon=":material/bolt:")
+
+# 이번 재실행 전체를 하나의 요청으로 측정 (측정이 꺼져 있으면 아무 일도 하지 않음)
+perf.begin_request("rerun")
 
 with st.sidebar:
     st.header("⚙️ 관리 및 메뉴")
     
-    # --- 원본 파일 처리 (HWP -> TXT -> CSV) ---
-    st.markdown("**(1) 원본 파일 처리**")
-    
-    # [추가됨] HWP -> TXT 변환 버튼
-    if st.button("📄 HWP -> TXT 변환"):
-        if not HAS_PYHWP:
-            st.error("pyhwp 라이브러리가 설치되어 있지 않습니다. 터미널에서 'pip install pyhwp'를 실행해주세요.")
-        else:
-            with st.spinner("HWP 파일을 파싱하여 TXT로 변환 중입니다..."):
-                conv, skip, err, msg = convert_hwp_to_txt_st()
-                if conv == -1:
-                    st.warning(msg)
-                elif conv == 0 and skip == 0:
-                    st.info(msg)
-                else:
-                    st.success(f"HWP->TXT 변환 완료! (신규: {conv}개, 건너뜀: {skip}개, 오류: {err}개)")
-
-    if st.button("📄 TXT -> CSV 변환"):
-        with st.spinner("TXT 파일을 파싱하여 CSV로 변환 중입니다..."):
-            conv, skip, err, msg = convert_txt_files_to_csv()
-            if conv == -1:
-                st.warning(msg)
-            elif conv == 0 and skip == 0:
-                st.info(msg)
-            else:
-                st.success(f"TXT->CSV 변환 완료! (신규: {conv}개, 건너뜀: {skip}개, 오류: {err}개)")
-    
-    st.markdown("**(2) 시스템 DB 등록**")
-    if st.button("🔄 DB 업데이트 (증분)"):
-        with st.spinner(f"'{DATA_DIR}' 폴더 스캔 중..."):
-            cnt, skip = load_files()
-        
-        if cnt == -1:
-            st.warning(f"폴더가 생성되었습니다. CSV 파일을 '{DATA_DIR}'에 넣어주세요.")
-        else:
-            st.success(f"DB 업데이트 완료! (신규: {cnt}개, 건너뜀: {skip}개)")
-    
-    st.write("")
-    st.markdown("**(3) 데이터 내보내기**")
-    if st.button("📥 DB 전체 엑셀 다운로드 준비"):
-        with st.spinner("엑셀 파일 생성 중... (데이터 양에 따라 시간이 걸릴 수 있습니다)"):
-            if os.path.exists(DB_FILE):
-                excel_data = export_db_to_excel()
-                if excel_data:
-                    st.download_button(
-                        label="💾 엑셀 파일 다운로드",
-                        data=excel_data,
-                        file_name="regulation_db_dump.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                else:
-                    st.error("오류 발생")
+    render_admin_panel()
 
     st.markdown("---")
     st.header("🔍 기능 선택")
     menu = st.radio("메뉴 선택", list(MENU_NAMES.values()))
 
+    st.markdown("---")
+    perf_panel = st.expander("⏱️ 성능")
+
+perf.annotate(menu=menu)
+
 st.title(f"⚡ {menu}")
 
-reg_names = get_regulation_names()
+data_version = get_data_version()
+reg_names = get_regulation_names(data_version)
 default_reg_index = 0
 if PREFERRED_REG_NAME in reg_names:
     default_reg_index = reg_names.index(PREFERRED_REG_NAME)
 
 # =========================================================
-# 5. 메뉴별 로직 
+# 4. 메뉴별 로직 
 # =========================================================
 
 if menu == MENU_NAMES["1"]:
     st.subheader("📂 시스템에 등록된 규정 목록")
-    if reg_names: st.table(pd.DataFrame(reg_names, columns=["규정명"]))
+    if reg_names:
+        # 규정별 최신 스냅샷 기준 요약 (카탈로그는 개정일 내림차순이므로 첫 행이 최신)
+        catalog = get_catalog(data_version)
+        summary = catalog.groupby("regulation_name", sort=True).agg(
+            구분=("is_rule", lambda v: "시행세칙" if v.iloc[0] else "규정"),
+            최신개정일=("reg_date", "first"),
+            개정횟수=("reg_date", "size"),
+            조수=("article_count", "first"),
+            행수=("row_count", "first"),
+        )
+        st.table(summary.rename_axis("규정명").reset_index())
     else: st.info("데이터가 없습니다.")
 
 elif menu == MENU_NAMES["2"]:
     st.subheader("📅 규정별 개정 히스토리")
     if reg_names:
         target = st.selectbox("규정 선택", reg_names, index=default_reg_index)
-        dates = get_regulation_dates(target)
+        dates = get_regulation_dates(data_version, target)
         st.write(f"**{target}** 개정일 목록:")
         st.table(pd.DataFrame(dates, columns=["개정일자"]))
 
@@ -659,26 +254,41 @@ elif menu == MENU_NAMES["3"]:
     if reg_names:
         c1, c2 = st.columns(2)
         with c1: target = st.selectbox("규정", reg_names, index=default_reg_index)
-        dates = get_regulation_dates(target)
+        dates = get_regulation_dates(data_version, target)
         with c2: date = st.selectbox("날짜", dates) if dates else st.selectbox("날짜", [])
         
-        if st.button("조회"):
-            conn = get_connection()
-            df = pd.read_sql("SELECT ref_no as '조항', article_title as '조명', content as '내용' FROM regulation_history WHERE regulation_name=? AND reg_date=? ORDER BY id", conn, params=(target, date))
-            conn.close()
+        toc = get_regulation_toc(data_version, target, date) if date else pd.DataFrame()
+        if toc.empty:
+            st.info("목차 정보가 없습니다. 사이드바의 'DB 업데이트'를 실행해주세요.")
+        else:
+            # 목차 트리: 장 노드 아래에 절 노드를 두고, 선택한 노드의 본문만 조회
+            nodes = []
+            for chapter, ch_group in toc.groupby(['chapter_no', 'chapter_title'], sort=False):
+                ch_label = f"제{chapter[0]}장 {chapter[1]}" if chapter[0] else "(장 구분 없음)"
+                ch_range = f"{ch_group.iloc[0]['first_ref']} ~ {ch_group.iloc[-1]['last_ref']}"
+                nodes.append((f"{ch_label}  ·  {ch_range}", chapter, None))
+                if (ch_group['section_no'] != "").any():
+                    for _, sec in ch_group.iterrows():
+                        sec_label = f"제{sec['section_no']}절 {sec['section_title']}" if sec['section_no'] else "(절 구분 없음)"
+                        nodes.append((f"　└ {sec_label}  ·  {sec['first_ref']} ~ {sec['last_ref']} ({sec['row_count']}건)",
+                                      chapter, (sec['section_no'], sec['section_title'])))
+
+            st.caption(f"총 {int(toc['row_count'].sum())}건 · {len(toc.groupby(['chapter_no', 'chapter_title']))}개 장")
+            node_idx = st.radio("목차", range(len(nodes)), format_func=lambda i: nodes[i][0])
+            _, chapter, section = nodes[node_idx]
+            df = get_toc_contents(data_version, target, date, chapter, section)
             st.dataframe(df, width='stretch', height=600)
 
 elif menu == MENU_NAMES["4"]:
     st.subheader("🕰️ 조항 변경 이력 추적")
     if reg_names:
         c1, c2 = st.columns(2)
-        with c1: target = st.selectbox("규정", reg_names, index=default_reg_index)
-        with c2: ref = st.text_input("조항 번호", value=DEFAULT_ART_NO)
+        ac_index = get_autocomplete_index(data_version)
+        with c1: target = select_regulation("규정", ac_index)
+        with c2: ref = select_ref("조항 번호", ac_index, target)
         
         if st.button("히스토리 검색"):
-            conn = get_connection()
-            df = pd.read_sql("SELECT reg_date, ref_no, article_title, content, unique_key FROM regulation_history WHERE regulation_name=? AND ref_no LIKE ? ORDER BY unique_key, reg_date", conn, params=(target, f"%{ref}%"))
-            conn.close()
+            df = fetch_article_history(target, ref)
             
             if df.empty: st.warning("결과가 없습니다.")
             else:
@@ -699,19 +309,14 @@ elif menu == MENU_NAMES["5"]:
     st.subheader("🔎 특정 시점 조항 상세 조회")
     if reg_names:
         c1, c2, c3 = st.columns(3)
-        with c1: target = st.selectbox("규정", reg_names, index=default_reg_index)
-        dates = get_regulation_dates(target)
+        ac_index = get_autocomplete_index(data_version)
+        with c1: target = select_regulation("규정", ac_index)
+        dates = get_regulation_dates(data_version, target)
         with c2: date = st.selectbox("날짜", dates) if dates else st.selectbox("날짜", [])
-        with c3: ref = st.text_input("조항 번호", value=DEFAULT_ART_NO)
+        with c3: ref = select_ref("조항 번호", ac_index, target, date)
         
         if st.button("조회"):
-            conn = get_connection()
-            df = pd.read_sql("""
-                SELECT ref_no AS '조항', article_title AS '조명', content AS '내용' 
-                FROM regulation_history 
-                WHERE regulation_name=? AND reg_date=? AND ref_no LIKE ?
-            """, conn, params=(target, date, f"%{ref}%"))
-            conn.close()
+            df = fetch_article_detail(target, date, ref)
             st.table(df)
 
 elif menu == MENU_NAMES["6"]:
@@ -721,143 +326,265 @@ elif menu == MENU_NAMES["6"]:
         with c1:
             target = st.selectbox("대상", ["전체 규정 (All)"] + reg_names, index=0)
             latest = st.checkbox("최신 규정만", value=True)
+            collapse = st.checkbox("같은 본문은 한 번만 (개정일 범위 표시)", value=True, disabled=latest,
+                                   help="전체 개정본 검색에서 개정되지 않은 조항을 개정본마다 반복하지 않고 한 번만 보여줍니다.")
+            advanced = st.checkbox("고급 검색 (AND/OR/NOT, \"구문\", NEAR/k)", value=False,
+                                   help='예: 공매도 AND 호가 NOT 시간외 · "매매거래의 정지" · 증거금 NEAR/20 위탁 · (공매도 OR 대차) AND 호가')
         with c2:
-            keyword = st.text_input("검색어", placeholder="예: 공매도")
+            keyword = st.text_input("검색어", placeholder='예: 공매도' if not advanced else '예: 공매도 AND 호가 NOT 시간외')
             btn = st.button("검색")
 
+        # 패싯을 고르면 스크립트가 다시 실행되므로 마지막 검색 조건을 세션에 보관
+        # 고급 검색 질의는 검색 전에 문법을 확인하고, 틀리면 이전 검색 결과를 지움
+        if btn and keyword and advanced:
+            try: parse_query(keyword)
+            except ValueError as e:
+                st.error(f"질의를 해석할 수 없습니다: {e}")
+                st.session_state.pop("search_params", None)
+                btn = False
         if btn and keyword:
-            conn = get_connection()
-            q = "SELECT regulation_name, reg_date, ref_no, article_title, content FROM regulation_history WHERE (content LIKE ? OR article_title LIKE ?)"
-            p = [f"%{keyword}%", f"%{keyword}%"]
-            if target != "전체 규정 (All)":
-                q += " AND regulation_name = ?"
-                p.append(target)
-            
-            if latest:
-                q += """
-                    AND (regulation_name, reg_date) IN (
-                        SELECT regulation_name, MAX(reg_date)
-                        FROM regulation_history
-                        GROUP BY regulation_name
-                    )
-                """
-            q += " ORDER BY regulation_name, reg_date DESC, id"
-            
-            df = pd.read_sql(q, conn, params=p)
-            conn.close()
+            st.session_state["search_params"] = (keyword, None if target == "전체 규정 (All)" else target, latest,
+                                                 collapse and not latest and not advanced, advanced)
+            for key, _ in SEARCH_FACETS: st.session_state.pop(f"facet_{key}", None)
+
+        if "search_params" in st.session_state:
+            keyword, target_name, latest, collapse, advanced = st.session_state["search_params"]
+            if advanced: df, facets = search_query(data_version, keyword, target_name, latest)
+            else: df, facets = search_keyword(data_version, keyword, target_name, latest, collapse)
             
             if df.empty: st.warning("결과 없음")
             else:
-                st.success(f"총 {len(df)}건 검색됨")
+                with st.expander(f"🧭 결과 좁히기 (총 {len(df)}건)", expanded=True):
+                    selected = {}
+                    for col, (key, label) in zip(st.columns(len(SEARCH_FACETS)), SEARCH_FACETS):
+                        counts = facets[facets['facet'] == key].set_index('value')['hits']
+                        if key == "reg_date": values = sorted(counts.index, reverse=True)
+                        elif key == "level": values = [v for v in LEVEL_ORDER if v in counts.index]
+                        elif key == "regulation_name": values = sorted(counts.index)
+                        else: values = counts.sort_values(ascending=False).index.tolist()
+                        with col:
+                            selected[key] = st.multiselect(
+                                label, values, key=f"facet_{key}",
+                                format_func=lambda v, c=counts: f"{v or '(없음)'} ({c[v]})"
+                            )
+
+                for key, values in selected.items():
+                    if values: df = df[df[key].isin(values)]
+
+                if collapse: st.success(f"총 {len(df)}건 검색됨 (개정본 {df['snapshots'].sum()}건을 같은 본문끼리 묶음)")
+                else: st.success(f"총 {len(df)}건 검색됨")
                 if len(df) > 200: st.warning("⚠️ 결과가 너무 많아 일부만 표시될 수 있습니다.")
                     
                 for _, row in df.iterrows():
                     with st.container(border=True):
-                        st.markdown(f"**📌 [{row['regulation_name']}] {row['ref_no']} {row['article_title']}** :grey[{row['reg_date']}]")
-                        st.markdown(row['content'].replace(keyword, f":red[**{keyword}**]"))
+                        if collapse:
+                            until = f"{row['next_date']} 전까지" if isinstance(row['next_date'], str) else "현재"
+                            dates = f"{row['first_date']} ~ {until} · 개정본 {row['snapshots']}개"
+                        else: dates = row['reg_date']
+                        st.markdown(f"**📌 [{row['regulation_name']}] {row['ref_no']} {row['article_title']}** :grey[{dates}]")
+                        if advanced: st.markdown(highlight(row['content'], row['matches'], ":red[**", "**]"))
+                        else: st.markdown(row['content'].replace(keyword, f":red[**{keyword}**]"))
 
 elif menu == MENU_NAMES["7"]:
     st.subheader("🔗 조항 인용 및 역참조 분석")
     st.info("특정 규정의 조항이 내/외부에서 어떻게 인용되고 있는지 분석합니다.")
     
     if reg_names:
+        ac_index = get_autocomplete_index(data_version)
         col1, col2 = st.columns(2)
         with col1:
-            target_reg = st.selectbox("관심 규정", reg_names, index=default_reg_index)
+            target_reg = select_regulation("관심 규정", ac_index)
         with col2:
-            target_art = st.text_input("관심 조항 번호", value=DEFAULT_ART_NO)
+            target_art = select_ref("관심 조항 번호", ac_index, target_reg)
             
         latest_only = st.checkbox("최신 규정 내용에서만 찾기 (권장)", value=True)
         search_btn = st.button("인용 분석 시작", type="primary")
         
         if search_btn and target_art:
-            conn = get_connection()
-            
-            is_rule = "시행세칙" in target_reg
-            partner_reg_name = target_reg.replace(" 시행세칙", "").replace("시행세칙", "").strip() if is_rule else f"{target_reg} 시행세칙"
-
-            term_internal = target_art 
-            term_partner = f"세칙 {target_art}" if is_rule else f"규정 {target_art}"
-            term_external = f"「{target_reg}」 {target_art}"
-
-            base_query = """
-                SELECT regulation_name, reg_date, ref_no, article_title, content
-                FROM regulation_history
-                WHERE 
-                   (regulation_name = ? AND content LIKE ?) OR 
-                   (regulation_name LIKE ? AND content LIKE ?) OR
-                   (content LIKE ?)
-            """
-            
-            partner_like = f"%{partner_reg_name}%"
-            params = [
-                target_reg, f"%{term_internal}%",
-                partner_like, f"%{term_partner}%",
-                f"%{term_external}%"
-            ]
-            
-            if latest_only:
-                full_query = f"""
-                    WITH LatestDates AS (
-                        SELECT regulation_name, MAX(reg_date) as max_date
-                        FROM regulation_history
-                        GROUP BY regulation_name
-                    )
-                    SELECT h.regulation_name, h.reg_date, h.ref_no, h.article_title, h.content
-                    FROM regulation_history h
-                    JOIN LatestDates ld ON h.regulation_name = ld.regulation_name AND h.reg_date = ld.max_date
-                    WHERE 
-                       (h.regulation_name = ? AND h.content LIKE ?) OR 
-                       (h.regulation_name LIKE ? AND h.content LIKE ?) OR
-                       (h.content LIKE ?)
-                    ORDER BY h.regulation_name, h.id
-                """
-            else:
-                full_query = base_query + " ORDER BY regulation_name, id"
+            terms = citation_terms(target_reg, target_art)
+            partner_reg_name = terms["partner_reg_name"]
+            # 종류별 제목과 본문 자리를 먼저 그려 두고, 동시에 실행한 조회가 끝나는 대로 해당 자리를 채움
+            sections = {
+                "internal": (f"### 🏠 [{target_reg}] 내부 참조", None, "red", False),
+                "partner": (f"### 🤝 [{partner_reg_name}] 참조", f"검색 조건: '{terms['term_partner']}'", "blue", False),
+                "external": ("### 🌏 타 규정 참조", f"검색 조건: '{terms['term_external']}'", "green", True),
+            }
+            summary = st.empty()
+            summary.info("인용 분석 중...")
+            bodies = {}
+            for kind in CITATION_KINDS:
+                title, condition, _, _ = sections[kind]
+                st.markdown(title)
+                if condition: st.info(condition)
+                bodies[kind] = st.empty()
+                bodies[kind].caption("검색 중...")
+
+            counts = {}
+            for kind, result in iter_citations(target_reg, target_art, latest_only):
+                term, (_, _, color, show_reg) = terms[f"term_{kind}"], sections[kind]
+                with bodies[kind].container():
+                    if isinstance(result, TimeoutError): st.warning("시간 제한 안에 끝나지 않았습니다. 조항 번호를 더 구체적으로 입력해 다시 시도하세요.")
+                    elif isinstance(result, Exception): st.error(f"조회 중 오류: {result}")
+                    elif result.empty: st.caption("결과 없음")
+                    for _, row in (result.iterrows() if isinstance(result, pd.DataFrame) else ()):
+                        with st.container(border=True):
+                            reg_label = f"[{row['regulation_name']}] " if show_reg else ""
+                            st.markdown(f"**📌 {reg_label}{row['ref_no']} {row['article_title']}**")
+                            st.markdown(row['content'].replace(term, f":{color}[**{term}**]"))
+                counts[kind] = f"{len(result)}건" if isinstance(result, pd.DataFrame) else "시간 초과" if isinstance(result, TimeoutError) else "오류"
+
+            message = f"분석 완료: 내부 {counts['internal']} / {partner_reg_name} {counts['partner']} / 타 규정 {counts['external']}"
+            if all(c.endswith("건") for c in counts.values()): summary.success(message)
+            else: summary.warning(message)
+
+elif menu == MENU_NAMES["8"]:
+    st.subheader("🧬 유사 조항 찾기")
+    st.info("최신 개정본 기준으로 선택한 조항과 문장이 비슷한 조항을 다른 시장 규정이나 시행세칙에서 찾습니다.")
 
-            df_filtered = pd.read_sql(full_query, conn, params=params)
-            conn.close()
-            
-            results_internal, results_partner, results_external = [], [], []
-            
-            for _, row in df_filtered.iterrows():
-                curr_reg = row['regulation_name']
-                content = row['content']
-                
-                if curr_reg == target_reg:
-                    if term_internal in content: results_internal.append(row)
-                elif partner_reg_name in curr_reg: 
-                    if term_partner in content: results_partner.append(row)
-                else:
-                    if term_external in content: results_external.append(row)
-
-            st.success(f"분석 완료: 내부 {len(results_internal)}건 / {partner_reg_name} {len(results_partner)}건 / 타 규정 {len(results_external)}건")
-            
-            st.markdown(f"### 🏠 [{target_reg}] 내부 참조")
-            if results_internal:
-                for row in results_internal:
-                    with st.container(border=True):
-                        st.markdown(f"**📌 {row['ref_no']} {row['article_title']}**")
-                        st.markdown(row['content'].replace(term_internal, f":red[**{term_internal}**]"))
-            else:
-                st.caption("결과 없음")
+    if reg_names:
+        c1, c2, c3 = st.columns([2, 1, 1])
+        ac_index = get_autocomplete_index(data_version)
+        with c1: target = select_regulation("규정", ac_index)
+        # 유사도 인덱스는 최신 개정본 기준이므로 후보도 최신 개정본의 조항 번호
+        latest_date = next(iter(get_regulation_dates(data_version, target)), None)
+        with c2: ref = select_ref("조항 번호", ac_index, target, latest_date)
+        with c3: top_k = st.number_input("결과 수", min_value=1, max_value=50, value=DEFAULT_TOP_K)
+        other_only = st.checkbox("다른 규정에서만 찾기", value=True)
+
+        index = get_similarity_index(data_version)
+        rows = index.find_rows(target, ref) if ref else []
+        if not len(rows):
+            st.warning("최신 개정본에서 해당 조항을 찾을 수 없습니다.")
+        else:
+            # 조항 번호가 같은 행(항/호)이 여러 개일 수 있으므로 기준 행을 고르게 함
+            row = st.selectbox("기준 조항", rows, format_func=lambda r: f"{index.rows.at[r, 'ref_no']}  {index.rows.at[r, 'content'][:60]}")
+            base = index.rows.loc[row]
+            with st.container(border=True):
+                st.markdown(f"**📌 [{base['regulation_name']}] {base['ref_no']} {base['article_title']}** :grey[{base['reg_date']}]")
+                st.markdown(base['content'])
+
+            similar = index.similar(row, top_k, other_only)
+            if similar.empty: st.caption("결과 없음")
+            for _, r in similar.iterrows():
+                with st.container(border=True):
+                    st.markdown(f"**[{r['regulation_name']}] {r['ref_no']} {r['article_title']}** :grey[{r['reg_date']}] · 유사도 {r['similarity']:.2f}")
+                    st.markdown(r['content'])
+
+elif menu == MENU_NAMES["9"]:
+    st.subheader("🧩 시장 간 유사 조항 비교")
+    st.info("여러 규정에 거의 같은 문장으로 들어 있는 조항을 묶고, 최신 개정본에서 규정마다 문구가 달라진 곳을 보여줍니다.")
 
-            st.markdown(f"### 🤝 [{partner_reg_name}] 참조")
-            st.info(f"검색 조건: '{term_partner}'")
-            if results_partner:
-                for row in results_partner:
-                    with st.container(border=True):
-                        st.markdown(f"**📌 {row['ref_no']} {row['article_title']}**")
-                        st.markdown(row['content'].replace(term_partner, f":blue[**{term_partner}**]"))
-            else:
-                st.caption("결과 없음")
+    if reg_names:
+        c1, c2 = st.columns([2, 1])
+        with c1: target = st.selectbox("규정", ["전체 규정 (All)"] + reg_names, index=0)
+        with c2: diverged_only = st.checkbox("최신본에서 달라진 조항만", value=True)
+
+        clusters = get_duplicate_clusters(data_version, None if target == "전체 규정 (All)" else target, diverged_only)
+        if clusters is None:
+            st.warning("분석 결과가 없습니다. 터미널에서 'python near_duplicates.py build'를 실행하세요.")
+        elif clusters.empty:
+            st.caption("결과 없음")
+        else:
+            labels = dict(zip(clusters["cluster_id"], clusters["option_label"]))
+            cluster_id = st.selectbox(f"유사 조항 묶음 ({len(clusters)}개)", clusters["cluster_id"], format_func=labels.get)
+            members = get_cluster_members(data_version, cluster_id)
+            latest = members[members["is_latest"] == 1]
+
+            st.markdown("### 최신 개정본")
+            st.caption("첫 번째 조항을 기준으로 달라진 어절을 표시합니다.")
+            base = latest["content"].iloc[0] if not latest.empty else ""
+            for i, (_, m) in enumerate(latest.iterrows()):
+                with st.container(border=True):
+                    st.markdown(f"**📌 [{m['regulation_name']}] {m['ref_no']} {m['article_title']}** :grey[{m['last_date']}]")
+                    st.markdown(m['content'] if i == 0 else diff_markdown(base, m['content']))
+
+            with st.expander(f"전체 이력 ({len(members)}건)"):
+                st.dataframe(members.rename(columns={
+                    "regulation_name": "규정", "ref_no": "조항", "article_title": "조명", "content": "내용",
+                    "first_date": "처음", "last_date": "마지막", "snapshot_count": "개정본 수", "is_latest": "최신"
+                }), hide_index=True)
+
+elif menu == MENU_NAMES["10"]:
+    st.subheader("📑 개정 영향 보고서")
+    st.info("새 개정본을 적재할 때 직전 개정본과 비교해 바뀐 조와, 최신 규정 전체에서 그 조를 인용하는 조항(인용의 인용 포함)을 정리해 둔 보고서입니다.")
+
+    reports = get_impact_reports(data_version)
+    if reports is None or reports.empty:
+        st.warning("보고서가 없습니다. 규정의 새 개정본을 적재하거나 터미널에서 'python impact_report.py build'를 실행하세요.")
+    else:
+        keys = list(zip(reports["regulation_name"], reports["reg_date"]))
+        labels = reports.set_index(["regulation_name", "reg_date"])
+        key = st.selectbox(
+            f"보고서 ({len(reports)}개)", keys,
+            format_func=lambda k: f"{k[0]} · {labels.at[k, 'prev_date']} → {k[1]} · 바뀐 조 {labels.at[k, 'changed_count']} · 영향 조항 {labels.at[k, 'impacted_count']}"
+        )
+        report = get_impact_report(data_version, *key)
+        summary, changes, citations = report["summary"], report["changes"], report["citations"]
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("바뀐 조", summary["changed_count"])
+        c2.metric("영향 조항", summary["impacted_count"])
+        c3.metric("영향 규정", summary["impacted_regulations"])
+        c4.metric("인용 단계", summary["depth"])
+        st.download_button(
+            label="📥 엑셀로 내려받기",
+            data=lambda: export_excel(report),
+            file_name=f"{key[0]}_{key[1]}_영향.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        frames = report_frames(report)
+
+        st.markdown(f"### 바뀐 조 ({len(changes)}개)")
+        st.dataframe(frames["바뀐 조"][["조", "구분", "조명"]], hide_index=True)
+        if not changes.empty:
+            row = st.selectbox("비교할 조", changes.index,
+                               format_func=lambda i: f"{changes.at[i, 'article']} {changes.at[i, 'article_title']} ({CHANGE_TYPES[changes.at[i, 'change_type']]})")
+            with st.container(border=True):
+                st.markdown(diff_markdown(changes.at[row, "old_text"], changes.at[row, "new_text"]))
+
+        st.markdown(f"### 영향받는 조항 ({len(citations)}건)")
+        if citations.empty:
+            st.caption("바뀐 조를 인용하는 조항이 없습니다.")
+        table = frames["영향 조항"]
+        for depth, group in table.groupby("단계"):
+            st.markdown(f"**{depth}단계** " + ("(바뀐 조를 직접 인용)" if depth == 1 else f"({depth - 1}단계 조항을 인용)"))
+            st.dataframe(group.drop(columns=["단계"]), hide_index=True)
+
+elif menu == MENU_NAMES["11"]:
+    st.subheader("📖 용어 사전")
+    st.info("규정 본문에서 정의된 용어(정의 조항, '이하 ~라 한다' 약칭)가 어디서 정의되고, 개정마다 정의문이 어떻게 바뀌었는지 보여줍니다.")
 
-            st.markdown(f"### 🌏 타 규정 참조")
-            st.info(f"검색 조건: '{term_external}'")
-            if results_external:
-                for row in results_external:
+    if reg_names:
+        c1, c2 = st.columns([1, 2])
+        with c1: target = st.selectbox("규정", ["전체 규정 (All)"] + reg_names, index=0)
+        reg_filter = None if target == "전체 규정 (All)" else target
+        terms = get_glossary_terms(data_version, reg_filter)
+        if terms.empty:
+            st.caption("최신 개정본에 정의된 용어가 없습니다.")
+        else:
+            labels = dict(zip(terms["term"], terms["label"]))
+            with c2: term = st.selectbox(f"용어 ({len(terms)}개)", terms["term"], format_func=labels.get)
+            definitions, history = get_term_definitions(data_version, term, reg_filter)
+
+            st.markdown(f"### 정의 위치 ({history['regulation_name'].nunique()}개 규정)")
+            st.caption("같은 정의문이 이어진 개정일 범위별로 묶고, 직전 시기 정의문과 달라진 어절을 표시합니다. 사용 조항 수는 구간 마지막 개정본 기준입니다.")
+            for reg_name, group in history.groupby("regulation_name", sort=False):
+                rows = list(group.itertuples(index=False))
+                for i, r in enumerate(rows):
+                    scope = f" · 이 {r.scope}에서" if r.scope else ""
                     with st.container(border=True):
-                        st.markdown(f"**📌 [{row['regulation_name']}] {row['ref_no']} {row['article_title']}**")
-                        st.markdown(row['content'].replace(term_external, f":green[**{term_external}**]"))
-            else:
-                st.caption("결과 없음")
\ No newline at end of file
+                        st.markdown(f"**📌 [{reg_name}] {r.ref_no}** ({KINDS[r.kind]}{scope}) "
+                                    f":grey[{r.first_date} ~ {r.last_date} · 개정본 {r.snapshots}개 · 사용 {r.usage_count}곳]")
+                        # 같은 규정·종류·범위에서 바로 이전 시기의 정의문(그 뒤의 첫 행)과 비교
+                        prev = next((p for p in rows[i + 1:] if (p.kind, p.scope) == (r.kind, r.scope)), None)
+                        st.markdown(diff_markdown(prev.definition, r.definition) if prev else r.definition)
+
+            with st.expander(f"개정본별 정의 행 ({len(definitions)}건)"):
+                st.dataframe(definitions.drop(columns=["seq"]).sort_values(["regulation_name", "reg_date"], ascending=[True, False]).rename(columns={
+                    "regulation_name": "규정", "reg_date": "개정일", "kind": "종류", "scope": "범위", "row_id": "행 ID",
+                    "ref_no": "조항", "article_title": "조명", "definition": "정의문", "usage_count": "사용 조항 수"
+                }), hide_index=True)
+
+perf.end_request()
+with perf_panel:
+    render_perf_panel()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+대시보드(app.py) DB 조회 캐시
+Streamlit은 상호작용마다 app.py를 처음부터 다시 실행하므로, app.py 안에서 정의한 캐시 함수는
+재실행마다 데코레이터(함수 소스 해시 계산 포함)를 다시 거칩니다. 캐시 함수를 이 모듈에 두면
+프로세스당 한 번만 만들어지고, 캐시 자체는 모든 세션이 공유합니다. (쿼리 본문은 regulation_db 모듈)
+
+캐시 함수는 모두 첫 인자로 DB 데이터 버전을 받습니다. watch_folder.py 등 다른 프로세스가 적재하면
+버전이 올라가므로, 다음 재실행부터는 새 키로 조회되어 이전 캐시가 자연히 무효화됩니다.
+
+샤드 구성(regulation_shards)이 있으면 규정 1개 대상 조회는 해당 샤드로, 전체 검색은 모든 샤드로 나누어 실행합니다.
+배포용 DB(release_db)가 있으면 그 파일을 읽기 전용(immutable)으로 엽니다.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import streamlit as st
+
+import perf_trace as perf
+import regulation_db as db
+import regulation_shards as shards
+import release_db as release
+import autocomplete
+import glossary
+import impact_report
+import near_duplicates
+import similarity
+import text_index
+from regulation_db import DB_FILE, get_connection
+
+# 전문 조회 시 세션당 캐시해 둘 장/절 본문 개수 (메모리 상한)
+SECTION_CACHE_ENTRIES = 32
+
+# 키워드 검색 결과(패싯 포함)를 세션당 캐시해 둘 개수
+SEARCH_CACHE_ENTRIES = 16
+
+# 인용 분석 전체 시간 제한(초). 제한을 넘긴 종류는 SQLite 실행을 중단하고 '시간 초과'로 표시
+CITATION_BUDGET_SEC = float(os.environ.get("REG_CITATION_BUDGET_SEC", "10"))
+# 인용 분석 종류별 조회를 동시에 실행할 스레드 (모든 세션이 공유)
+_citation_pool = ThreadPoolExecutor(max_workers=2 * len(db.CITATION_KINDS), thread_name_prefix="citation")
+
+# 데이터 버전을 다시 읽는 주기(초). 재실행(클릭)마다 DB 연결을 여는 대신 이 간격으로만 확인하며,
+# 같은 프로세스의 DB 업데이트 작업이 끝나면 get_data_version.clear()로 바로 반영함
+DATA_VERSION_TTL_SEC = 2
+
+# 샤드 구성 사용 여부 (프로세스 시작 시 한 번 결정)
+USE_SHARDS = shards.is_enabled()
+# 배포용 읽기 전용 DB 사용 여부 (샤드 구성이 없고 배포용 DB 파일이 있을 때)
+USE_RELEASE = not USE_SHARDS and release.is_enabled()
+
+
+# ---------------------------------------------------------
+# DB 선택 (통합 DB / 배포용 DB / 샤드)
+# ---------------------------------------------------------
+def db_exists():
+    return USE_SHARDS or USE_RELEASE or os.path.exists(DB_FILE)
+
+def connect():
+    """통합 DB 연결 (배포용 DB가 있으면 읽기 전용 연결)"""
+    return db.get_readonly_connection() if USE_RELEASE else get_connection()
+
+def connect_catalog():
+    """규정 목록, 개정일, 데이터 버전을 읽을 연결 (샤드 구성이면 카탈로그 DB)"""
+    return shards.connect_catalog() if USE_SHARDS else connect()
+
+def run_query(reg_name, fn, *args):
+    """규정 1개 대상 조회 fn(conn, *args)를 그 규정이 있는 DB에서 실행"""
+    if USE_SHARDS: return shards.run(reg_name, fn, *args)
+    conn = connect()
+    try: return fn(conn, *args)
+    finally: conn.close()
+
+@st.cache_resource(show_spinner=False)
+def get_release_info():
+    """배포용 DB의 빌드 정보 (파일이 바뀌지 않으므로 프로세스당 한 번 읽음)"""
+    return release.read_info() if USE_RELEASE else {}
+
+@st.cache_resource(show_spinner=False)
+def ensure_schema():
+    """카탈로그 등 새 테이블이 없는 기존 DB를 프로세스당 한 번 갱신 (init_db가 카탈로그를 채움)"""
+    if not (USE_SHARDS or USE_RELEASE) and os.path.exists(DB_FILE): db.init_db()
+
+
+# ---------------------------------------------------------
+# 캐시 조회
+# ---------------------------------------------------------
+@st.cache_data(ttl=DATA_VERSION_TTL_SEC, show_spinner=False)
+def get_data_version():
+    if not db_exists(): return 0
+    ensure_schema()
+    conn = connect_catalog()
+    try: return db.get_data_version(conn)
+    finally: conn.close()
+
+# 규정 목록과 개정일은 작은 카탈로그 테이블에서 읽고 데이터 버전으로 무효화되므로 TTL을 두지 않음
+@st.cache_data
+def get_regulation_names(version):
+    if not db_exists(): return []
+    conn = connect_catalog()
+    try: return db.fetch_regulation_names(conn)
+    except: return []
+    finally: conn.close()
+
+@st.cache_data
+def get_catalog(version):
+    conn = connect_catalog()
+    try: return db.fetch_catalog(conn)
+    finally: conn.close()
+
+@st.cache_data
+def get_regulation_dates(version, reg_name):
+    conn = connect_catalog()
+    try: return db.fetch_regulation_dates(conn, reg_name)
+    finally: conn.close()
+
+@st.cache_data(max_entries=SECTION_CACHE_ENTRIES)
+def get_regulation_toc(version, reg_name, reg_date):
+    return run_query(reg_name, db.fetch_toc, reg_name, reg_date)
+
+@st.cache_data(max_entries=SECTION_CACHE_ENTRIES)
+def get_toc_contents(version, reg_name, reg_date, chapter, section=None):
+    return run_query(reg_name, db.fetch_toc_contents, reg_name, reg_date, chapter, section)
+
+@st.cache_data(max_entries=SEARCH_CACHE_ENTRIES)
+def search_keyword(version, keyword, target, latest, collapse=False):
+    if USE_SHARDS: return shards.search_keyword(keyword, target, latest, collapse)
+    conn = connect()
+    try: return db.search_keyword(conn, keyword, target, latest, collapse)
+    finally: conn.close()
+
+# 고급 검색(AND/OR/NOT, 구문, NEAR): 최신 규정은 공유 위치 색인으로, 전체 개정본은 후보 행을 읽어 계산
+@st.cache_data(max_entries=SEARCH_CACHE_ENTRIES)
+def search_query(version, query, target, latest):
+    if latest: df = get_text_index(version).search(query, target)
+    else:
+        conns = [get_connection(f) for f in shards.shard_files()] if USE_SHARDS else [connect()]
+        try: df = text_index.search_scan(conns, query, target)
+        finally:
+            for conn in conns: conn.close()
+    return df, db.facet_counts(df)
+
+
+# 용어 사전은 적재할 때 스냅샷마다 만들어지며(glossary.py), 샤드 구성이면 모든 샤드의 결과를 합침
+@st.cache_data
+def get_glossary_terms(version, reg_name=None):
+    """용어 목록과 선택 상자 표시 문구(label). 문구는 여기서 한 번만 만들어 재실행마다 용어 수만큼 조회하지 않음"""
+    if reg_name is not None: df = run_query(reg_name, glossary.fetch_terms, reg_name)
+    elif USE_SHARDS: df = glossary.merge_terms(shards.fan_out(glossary.fetch_terms))
+    else:
+        conn = connect()
+        try: df = glossary.fetch_terms(conn)
+        finally: conn.close()
+    return df.assign(label=[f"{t} (규정 {r}개 · 사용 {u}곳)"
+                            for t, r, u in zip(df["term"], df["regulations"], df["usage_count"])])
+
+@st.cache_data(max_entries=SECTION_CACHE_ENTRIES)
+def get_term_definitions(version, term, reg_name=None):
+    """(스냅샷별 정의 행, 정의문 개정 이력)"""
+    if reg_name is not None: df = run_query(reg_name, glossary.fetch_definitions, term, reg_name)
+    elif USE_SHARDS: df = pd.concat(shards.fan_out(glossary.fetch_definitions, term), ignore_index=True)
+    else:
+        conn = connect()
+        try: df = glossary.fetch_definitions(conn, term)
+        finally: conn.close()
+    return df, glossary.definition_history(df)
+
+
+# 유사 조항 군집은 오프라인 분석(near_duplicates.py build) 결과이며, 분석이 끝나면 데이터 버전이 올라감
+@st.cache_data
+def get_duplicate_clusters(version, reg_name, diverged_only):
+    """군집 목록과 선택 상자 표시 문구(option_label). 분석 결과가 없으면 None"""
+    conn = connect_catalog()
+    try: df = near_duplicates.fetch_clusters(conn, reg_name, diverged_only)
+    finally: conn.close()
+    if df is None: return None
+    return df.assign(option_label=[f"규정 {r}개 · 문구 {v}종 · {label[:50]}" for r, v, label in
+                                   zip(df["latest_regulations"], df["latest_variants"], df["label"])])
+
+@st.cache_data(max_entries=SECTION_CACHE_ENTRIES)
+def get_cluster_members(version, cluster_id):
+    conn = connect_catalog()
+    try: return near_duplicates.fetch_cluster_members(conn, cluster_id)
+    finally: conn.close()
+
+# 개정 영향 보고서는 적재할 때 만들어지고(impact_report.py), 적재가 끝나면 데이터 버전이 올라감
+@st.cache_data
+def get_impact_reports(version):
+    conn = connect_catalog()
+    try: return impact_report.fetch_reports(conn)
+    finally: conn.close()
+
+@st.cache_data(max_entries=SECTION_CACHE_ENTRIES)
+def get_impact_report(version, reg_name, reg_date):
+    conn = connect_catalog()
+    try: return impact_report.fetch_report(conn, reg_name, reg_date)
+    finally: conn.close()
+
+# numpy 배열로 된 인덱스는 cache_data처럼 매번 복사하지 않도록 cache_resource로 공유 (데이터 버전별 1개)
+@st.cache_resource(max_entries=1, show_spinner="유사 조항 인덱스를 불러오는 중...")
+def get_similarity_index(version):
+    conns = [get_connection(f) for f in shards.shard_files()] if USE_SHARDS else [connect()]
+    try: return similarity.SimilarityIndex.load(conns)
+    finally:
+        for conn in conns: conn.close()
+
+# 자동 완성 색인도 모든 세션이 공유해 입력할 때마다 DB를 읽지 않음 (데이터 버전별 1개)
+@st.cache_resource(max_entries=1, show_spinner="조항 번호 색인을 만드는 중...")
+def get_autocomplete_index(version):
+    conns = [get_connection(f) for f in shards.shard_files()] if USE_SHARDS else [connect()]
+    try: return autocomplete.AutocompleteIndex.load(conns)
+    finally:
+        for conn in conns: conn.close()
+
+# 본문 위치 역색인 (최신 스냅샷, 데이터 버전별 1개)
+@st.cache_resource(max_entries=1, show_spinner="본문 위치 색인을 불러오는 중...")
+def get_text_index(version):
+    conns = [get_connection(f) for f in shards.shard_files()] if USE_SHARDS else [connect()]
+    try: return text_index.TextIndex.load(conns)
+    finally:
+        for conn in conns: conn.close()
+
+
+# ---------------------------------------------------------
+# 캐시하지 않는 조회 (버튼을 누를 때만 실행)
+# ---------------------------------------------------------
+def fetch_article_history(reg_name, ref):
+    return run_query(reg_name, db.fetch_article_history, reg_name, ref)
+
+def fetch_article_detail(reg_name, reg_date, ref):
+    return run_query(reg_name, db.fetch_article_detail, reg_name, reg_date, ref)
+
+def find_citation_rows(kind, target_reg, target_art, latest_only, deadline=None):
+    if USE_SHARDS: return shards.find_citation_rows(kind, target_reg, target_art, latest_only, deadline)
+    conn = connect()
+    try: return db.find_citation_rows(conn, kind, target_reg, target_art, latest_only, deadline)
+    finally: conn.close()
+
+def iter_citations(target_reg, target_art, latest_only, budget=CITATION_BUDGET_SEC):
+    """인용 분석 세 종류를 각자의 연결에서 동시에 실행하고 끝나는 순서대로 (종류, DataFrame 또는 예외)를 돌려줌
+    전체 시간 제한(budget)이 지나면 남은 종류는 TimeoutError (조회는 deadline에서 SQLite 실행을 중단함)"""
+    deadline = time.monotonic() + budget
+    # 작업 스레드의 SQL span도 이 재실행의 성능 기록에 남도록 요청 문맥을 넘김
+    lookup = perf.wrap(find_citation_rows)
+    futures = {_citation_pool.submit(lookup, kind, target_reg, target_art, latest_only, deadline): kind
+               for kind in db.CITATION_KINDS}
+    pending = set(futures.values())
+    try:
+        # DataFrame 생성 등 SQLite 밖의 마무리 시간을 조금 더 기다림
+        for future in as_completed(futures, timeout=budget + 1):
+            kind = futures[future]
+            pending.discard(kind)
+            yield kind, future.exception() or future.result()
+    except TimeoutError:
+        for kind in db.CITATION_KINDS:
+            if kind in pending: yield kind, TimeoutError(f"인용 분석 시간 초과: {kind}")
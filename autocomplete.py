@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+조항 번호 / 규정명 자동 완성
+모든 스냅샷의 조항 번호(ref_no)와 규정명을 메모리에 올려 접두어 색인을 만들고,
+입력한 앞부분으로 후보를 법령 순서로 돌려줍니다. 규정명은 초성(ㅇㄱㅈㄱ)으로도 찾습니다.
+
+    - 조항 번호: 스냅샷(규정명, 개정일)별로 번호를 정렬해 두고 bisect로 접두어 범위를 찾은 뒤 법령 순서로 정렬.
+      법령 순서는 조 번호(제N조의M) 순, 같은 조 안에서는 원문 순서(항 -> 호 -> 목). 항이 있는 조도 조 번호 자체를 후보에 넣음
+      (개정일을 지정하지 않으면 그 규정의 모든 개정본에 나온 번호의 합집합. 조 안의 순서는 최신 개정본 우선)
+    - 입력 정규화: 공백 제거, 숫자로 시작하면 '제'를 붙이고 '1항'은 원문 표기 '①항'으로 바꿈
+      (예: '20조의2 1항' -> '제20조의2제①항', '20의2'·'20-2' -> '제20조의2', '20조 1' -> '제20조제1' 또는 '제20조제①')
+    - 규정명: 단어 시작 위치마다 접두어 비교. 입력의 초성 자모(ㄱ~ㅎ)는 그 초성으로 시작하는 음절과 일치
+
+대시보드에서는 데이터 버전별로 한 번 만들어 모든 세션이 공유합니다(app_cache.get_autocomplete_index).
+
+사용 예:
+    python autocomplete.py "20조의2" --reg "유가증권시장 업무규정"
+    python autocomplete.py ㅇㄱㅈㄱ
+"""
+
+import argparse
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+DEFAULT_LIMIT = 20
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+CIRCLED = "①②③④⑤⑥⑦⑧⑨⑩⑪⑫⑬⑭⑮⑯⑰⑱⑲⑳"
+_HANGUL_BASE, _HANGUL_LAST = 0xAC00, 0xD7A3
+# 접두어 범위의 끝 (어떤 문자보다 큰 코드 포인트)
+_PREFIX_END = "\U0010ffff"
+
+# 참조번호 앞의 조 번호 (제N조[의M])
+ARTICLE_PATTERN = re.compile(r"^제(\d+)조(?:의(\d+))?")
+
+# 스냅샷 안의 원문 순서로 읽음
+REFS_SQL = "SELECT regulation_name, reg_date, ref_no FROM regulation_history WHERE ref_no IS NOT NULL AND ref_no != '' ORDER BY id"
+
+
+# ----------------------------------------------------------------------
+# 1. 정규화 및 정렬 키
+# ----------------------------------------------------------------------
+def article_key(ref):
+    """조 번호 정렬 키 (조, 조의). 형식이 다른 번호는 맨 뒤"""
+    m = ARTICLE_PATTERN.match(ref)
+    return (int(m.group(1)), int(m.group(2) or 0)) if m else (float("inf"), 0)
+
+def legal_order(snapshots):
+    """snapshots: 원문 순서의 참조번호 목록들 (앞의 목록 우선) -> 법령 순서의 중복 없는 번호 목록
+    조 번호 순으로 정렬하고, 같은 조 안에서는 처음 나온 순서를 유지. 조 번호 자체(제N조)는 그 조의 맨 앞"""
+    seen = {}
+    for refs in snapshots:
+        for ref in refs:
+            if ref in seen: continue
+            m = ARTICLE_PATTERN.match(ref)
+            if m and m.group() not in seen: seen[m.group()] = len(seen)
+            if ref not in seen: seen[ref] = len(seen)
+    return sorted(seen, key=lambda ref: (article_key(ref), seen[ref]))
+
+def _circled(m):
+    n = int(m.group(1))
+    return f"제{CIRCLED[n - 1]}항" if 1 <= n <= len(CIRCLED) else m.group(0)
+
+def ref_queries(text):
+    """입력 -> 비교할 참조번호 접두어 목록. 끝의 '제N'은 호와 항(①) 두 가지로 해석"""
+    parts = (text or "").split()
+    if not parts: return [""]
+    # 공백 뒤 숫자로 시작하는 토막은 앞 번호와 '제'로 이음 ('20조의2 1항' -> '20조의2제1항')
+    s = parts[0] + "".join(("제" + p) if p[0].isdigit() else p for p in parts[1:])
+    if s[0].isdigit(): s = "제" + s
+    s = re.sub(r"^제(\d+)-(?=\d)", r"제\1조의", s)
+    s = re.sub(r"^제(\d+)(?=의)", r"제\1조", s)
+    s = re.sub(r"([조항호])(?=\d)", r"\1제", s)
+    s = re.sub(r"제(\d+)항", _circled, s)
+    queries = [s]
+    m = re.search(r"제(\d+)$", s)
+    if m and m.start() > 0 and 1 <= int(m.group(1)) <= len(CIRCLED):
+        queries.append(s[:m.start()] + "제" + CIRCLED[int(m.group(1)) - 1])
+    return queries
+
+def choseong(ch):
+    code = ord(ch)
+    if _HANGUL_BASE <= code <= _HANGUL_LAST: return CHOSEONG[(code - _HANGUL_BASE) // 588]
+    return ch
+
+def _match_at(text, pos, query):
+    """text[pos:]가 query로 시작하는지. query의 초성 자모는 같은 초성의 음절과도 일치"""
+    if pos + len(query) > len(text): return False
+    for q, t in zip(query, text[pos:]):
+        if q != t and not (q in CHOSEONG and choseong(t) == q): return False
+    return True
+
+
+# ----------------------------------------------------------------------
+# 2. 색인
+# ----------------------------------------------------------------------
+class AutocompleteIndex:
+    """스냅샷별 조항 번호 접두어 색인과 규정명 목록"""
+
+    def __init__(self, refs):
+        """refs: (규정명, 개정일, 참조번호) 반복"""
+        snapshots = defaultdict(dict)
+        for reg_name, reg_date, ref in refs:
+            snapshots[(reg_name, reg_date)].setdefault(ref)
+
+        by_reg = defaultdict(list)
+        for (reg_name, reg_date), uniq in snapshots.items():
+            by_reg[reg_name].append((reg_date, uniq))
+
+        # scope -> (법령 순서 번호 목록, 정렬된 번호, 정렬된 번호의 법령 순서 위치)
+        self._scopes = {}
+        for reg_name, dated in by_reg.items():
+            dated.sort(key=lambda d: d[0], reverse=True)
+            for reg_date, uniq in dated:
+                self._add_scope((reg_name, reg_date), legal_order([uniq]))
+            self._add_scope((reg_name, None), legal_order(uniq for _, uniq in dated))
+
+        self.names = sorted(by_reg)
+        # 규정명(공백 제거)과 단어 시작 위치
+        self._name_keys = []
+        for name in self.names:
+            compact = re.sub(r"\s+", "", name)
+            starts, pos = [], 0
+            for word in name.split():
+                starts.append(pos)
+                pos += len(word)
+            self._name_keys.append((name, compact, starts))
+
+    def _add_scope(self, scope, ordered):
+        keys = sorted(range(len(ordered)), key=ordered.__getitem__)
+        self._scopes[scope] = (ordered, [ordered[i] for i in keys], keys)
+
+    @classmethod
+    def load(cls, conns):
+        """DB 연결 목록(통합 DB 1개 또는 샤드들)에서 모든 스냅샷의 조항 번호를 읽어 색인 생성"""
+        return cls(row for conn in conns for row in conn.execute(REFS_SQL))
+
+    def refs(self, reg_name, reg_date=None):
+        """스냅샷(reg_date=None이면 모든 개정본)의 조항 번호 전체 (법령 순서)"""
+        scope = self._scopes.get((reg_name, reg_date))
+        return scope[0] if scope else []
+
+    def suggest_refs(self, reg_name, text, reg_date=None, limit=DEFAULT_LIMIT):
+        """입력으로 시작하는 조항 번호 후보 (법령 순서, 최대 limit개)"""
+        scope = self._scopes.get((reg_name, reg_date))
+        if not scope: return []
+        ordered, keys, positions = scope
+        hits = set()
+        for q in ref_queries(text):
+            hits.update(positions[bisect_left(keys, q):bisect_left(keys, q + _PREFIX_END)])
+        return [ordered[i] for i in sorted(hits)[:limit]]
+
+    def suggest_names(self, text, limit=DEFAULT_LIMIT):
+        """입력(초성 가능)으로 시작하는 규정명 후보. 규정명 앞부분 일치를 단어 중간 일치보다 먼저"""
+        query = re.sub(r"\s+", "", text or "")
+        if not query: return self.names[:limit]
+        head, inner = [], []
+        for name, compact, starts in self._name_keys:
+            if _match_at(compact, 0, query): head.append(name)
+            elif any(_match_at(compact, pos, query) for pos in starts[1:]): inner.append(name)
+        return (head + inner)[:limit]
+
+    def resolve_name(self, text):
+        """목록에 있는 규정명은 그대로, 아니면 첫 후보 (없으면 None)"""
+        if text in self.names: return text
+        hits = self.suggest_names(text, limit=1)
+        return hits[0] if hits else None
+
+    def resolve_ref(self, reg_name, text, reg_date=None):
+        """있는 조항 번호는 그대로, 아니면 첫 후보. 후보가 없으면 입력을 그대로 돌려줌 (기존 부분 일치 검색)"""
+        ref = (text or "").strip()
+        if not ref or ref in self.refs(reg_name, reg_date): return ref
+        hits = self.suggest_refs(reg_name, ref, reg_date, limit=1)
+        return hits[0] if hits else ref
+
+
+# ----------------------------------------------------------------------
+# 3. CLI
+# ----------------------------------------------------------------------
+def main():
+    import regulation_db as db
+    import regulation_shards as shards
+
+    parser = argparse.ArgumentParser(description="조항 번호 / 규정명 자동 완성 후보 조회")
+    parser.add_argument("text", help="입력 (조항 번호 앞부분 또는 규정명/초성)")
+    parser.add_argument("--reg", help="규정명 (지정하면 조항 번호 후보, 없으면 규정명 후보)")
+    parser.add_argument("--date", help="개정일 (없으면 모든 개정본)")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"후보 수 (기본: {DEFAULT_LIMIT})")
+    parser.add_argument("--db", default=None, help="DB 파일 (기본: regulation_master.db, 샤드 구성이면 샤드 전체)")
+    args = parser.parse_args()
+
+    files = [args.db] if args.db else (shards.shard_files() if shards.is_enabled() else [db.DB_FILE])
+    conns = [db.get_connection(f) for f in files]
+    t0 = time.perf_counter()
+    index = AutocompleteIndex.load(conns)
+    build_ms = (time.perf_counter() - t0) * 1000
+    for conn in conns: conn.close()
+
+    t0 = time.perf_counter()
+    if args.reg: hits = index.suggest_refs(args.reg, args.text, args.date, args.limit)
+    else: hits = index.suggest_names(args.text, args.limit)
+    query_ms = (time.perf_counter() - t0) * 1000
+
+    for hit in hits: print(hit)
+    print(f"\n후보 {len(hits)}개 · 색인 생성 {build_ms:.0f}ms · 조회 {query_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+동시 사용자 부하 테스트
+가상 사용자 N명이 실제 사용 흐름(목차 탐색, 키워드 검색, 조항 히스토리, 인용 분석)을 반복하도록 해
+단계별 응답 시간 p50/p95/p99, 처리량(초당 단계 수), SQLite 잠금 대기를 측정합니다.
+--ingest를 주면 같은 시간 동안 다른 스레드(프로세스)가 원본 파일 재적재(ingest_csv_files)를 계속 실행하는
+구간을 추가로 측정해, 적재 중 조회가 얼마나 느려지는지 비교합니다.
+
+    - queries 대상(기본): 가상 사용자마다 스레드 1개, 단계마다 새 연결(대시보드의 클릭 1회와 같음)로
+      regulation_db 조회 함수를 직접 호출. 연결은 busy timeout 없이 열고 잠금 오류를 직접 재시도해 대기 시간을 기록
+    - app 대상: 가상 사용자마다 프로세스 1개가 app.py를 Streamlit AppTest로 실행하고 위젯을 조작해 재실행 시간을 측정
+      (캐시와 화면 렌더링까지 포함. 이때 잠금 대기는 SQLite busy timeout 안에서 일어나므로 따로 집계되지 않음)
+
+원본 DB는 건드리지 않도록 .bench/load_test.db로 복사해 사용합니다.
+
+사용 예:
+    python benchmark_load.py                                   # 가상 사용자 8명, 20초
+    python benchmark_load.py --users 16 --duration 30 --ingest --output load_bench.json
+    python benchmark_load.py --target app --users 4 --duration 20 --ingest
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import regulation_db as db
+
+APP_FILE = Path(__file__).with_name("app.py")
+BENCH_DIR = ".bench"
+LOAD_DB_FILE = os.path.join(BENCH_DIR, "load_test.db")
+
+KEYWORDS = ["공매도", "증거금", "상장폐지", "거래정지", "유동성공급", "결제", "위탁"]
+ARTICLE_RE = re.compile(r"제\d+조(의\d+)?")
+ARTICLES_PER_REG = 20
+
+# 사용 흐름별 선택 비율 (대시보드 사용 로그가 없어 목차 탐색과 검색 위주로 가정)
+SCRIPT_WEIGHTS = {"browse": 4, "search": 3, "history": 2, "citation": 1}
+
+# 잠금 오류 재시도 간격(초)과 포기 시간
+RETRY_SLEEP = 0.001
+MAX_RETRY_SLEEP = 0.05
+LOCK_GIVE_UP_SEC = 60.0
+
+# app 대상: 자식 프로세스의 첫 화면 렌더링(약 1~2초) 동안에도 적재가 이어지도록 적재 구간에 더하는 여유
+APP_STARTUP_GRACE_SEC = 3.0
+
+
+# ----------------------------------------------------------------------
+# 1. 잠금 대기 측정용 연결
+# ----------------------------------------------------------------------
+class LockStats:
+    """스레드 간 공유하는 잠금 대기 집계 (횟수, 총 대기, 최대 대기)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def add(self, waited):
+        with self._lock:
+            self.count += 1
+            self.total += waited
+            self.max = max(self.max, waited)
+
+    def summary(self):
+        with self._lock:
+            return {"count": self.count, "total_ms": round(self.total * 1000, 1), "max_ms": round(self.max * 1000, 1)}
+
+lock_stats = LockStats()
+
+def _is_lock_error(e):
+    msg = str(e)
+    return "locked" in msg or "busy" in msg
+
+def _retry_locked(fn, *args):
+    """SQLITE_BUSY/LOCKED면 짧게 쉬었다가 다시 실행하고, 기다린 시간을 lock_stats에 기록"""
+    started, sleep = None, RETRY_SLEEP
+    while True:
+        try:
+            result = fn(*args)
+            if started is not None: lock_stats.add(time.perf_counter() - started)
+            return result
+        except sqlite3.OperationalError as e:
+            if not _is_lock_error(e): raise
+            if started is None: started = time.perf_counter()
+            elif time.perf_counter() - started > LOCK_GIVE_UP_SEC: raise
+            time.sleep(sleep)
+            sleep = min(sleep * 2, MAX_RETRY_SLEEP)
+
+class LockTimingCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        return _retry_locked(super().execute, *args)
+
+    def executemany(self, *args):
+        return _retry_locked(super().executemany, *args)
+
+class LockTimingConnection(sqlite3.Connection):
+    def cursor(self, factory=LockTimingCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        return _retry_locked(super().commit)
+
+def connect(db_file=None):
+    """regulation_db.get_connection과 같은 설정이되, busy timeout 대신 직접 재시도해 대기 시간을 잼"""
+    conn = sqlite3.connect(db_file or db.DB_FILE, timeout=0, check_same_thread=False, factory=LockTimingConnection)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+
+# ----------------------------------------------------------------------
+# 2. 테스트 DB 및 사용 흐름
+# ----------------------------------------------------------------------
+def prepare_db(src):
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"원본 DB가 없습니다: {src}")
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(LOAD_DB_FILE + suffix): os.remove(LOAD_DB_FILE + suffix)
+    # 원본이 WAL 모드로 쓰는 중일 수 있으므로 파일 복사 대신 백업 API로 일관된 사본을 만듦
+    src_conn, dest_conn = sqlite3.connect(src), sqlite3.connect(LOAD_DB_FILE)
+    try: src_conn.backup(dest_conn)
+    finally:
+        src_conn.close()
+        dest_conn.close()
+    db.init_db(LOAD_DB_FILE)
+    return LOAD_DB_FILE
+
+def load_targets(db_file):
+    """규정별 최신 개정일과 조항 번호 표본 {규정명: (최신 개정일, [조항 번호])}"""
+    conn = db.get_connection(db_file)
+    try:
+        targets = {}
+        for reg_name, reg_date in conn.execute("SELECT regulation_name, MAX(reg_date) FROM regulation_catalog GROUP BY regulation_name"):
+            refs = {m.group(0) for (ref,) in conn.execute(
+                "SELECT ref_no FROM regulation_history WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+                for m in [ARTICLE_RE.match(ref or "")] if m}
+            if refs: targets[reg_name] = (reg_date, sorted(refs)[:ARTICLES_PER_REG])
+    finally:
+        conn.close()
+    if not targets:
+        raise RuntimeError("조항이 있는 규정이 없습니다. DB에 규정을 먼저 적재하세요.")
+    return targets
+
+def pick_script(rng):
+    return rng.choices(list(SCRIPT_WEIGHTS), weights=list(SCRIPT_WEIGHTS.values()))[0]
+
+def session_steps(script, rng, targets):
+    """사용 흐름 1회의 단계 목록 [(단계 이름, 함수(conn))]. 대시보드에서 한 화면씩 넘어가는 순서와 같음"""
+    reg = rng.choice(list(targets))
+    reg_date, refs = targets[reg]
+    art = rng.choice(refs)
+    if script == "browse":
+        def toc_contents(conn):
+            toc = db.fetch_toc(conn, reg, reg_date)
+            row = toc.iloc[rng.randrange(len(toc))]
+            return db.fetch_toc_contents(conn, reg, reg_date, (row["chapter_no"], row["chapter_title"]))
+        return [("names", db.fetch_regulation_names),
+                ("dates", lambda conn: db.fetch_regulation_dates(conn, reg)),
+                ("toc", lambda conn: db.fetch_toc(conn, reg, reg_date)),
+                ("toc_contents", toc_contents)]
+    if script == "search":
+        keyword, latest = rng.choice(KEYWORDS), rng.random() < 0.7
+        target = reg if rng.random() < 0.3 else None
+        return [("keyword", lambda conn: db.search_keyword(conn, keyword, target, latest))]
+    if script == "history":
+        return [("history", lambda conn: db.fetch_article_history(conn, reg, art)),
+                ("detail", lambda conn: db.fetch_article_detail(conn, reg, reg_date, art))]
+    return [("citation", lambda conn: db.find_citations(conn, reg, art, True))]
+
+
+# ----------------------------------------------------------------------
+# 3. queries 대상 (스레드 가상 사용자)
+# ----------------------------------------------------------------------
+def virtual_user(seed, db_file, targets, deadline, think, out):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        script = pick_script(rng)
+        for step, fn in session_steps(script, rng, targets):
+            t0 = time.perf_counter()
+            conn = connect(db_file)
+            try: fn(conn)
+            finally: conn.close()
+            out["steps"].append((f"{script}.{step}", (time.perf_counter() - t0) * 1000))
+            if think: time.sleep(rng.uniform(0, 2 * think))
+        out["sessions"] += 1
+
+def ingest_writer(db_file, csv_files, deadline, out):
+    """마감 시각까지 같은 CSV들을 반복 재적재 (대시보드의 'DB 업데이트' 또는 폴더 감시 적재와 같은 쓰기 부하)"""
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        db.ingest_csv_files(csv_files, db_file)
+        out.append((time.perf_counter() - t0) * 1000)
+
+def run_query_phase(db_file, targets, users, duration, think, csv_files, seed):
+    lock_stats.reset()
+    deadline = time.perf_counter() + duration
+    results = [{"steps": [], "sessions": 0} for _ in range(users)]
+    ingests = []
+    threads = [threading.Thread(target=virtual_user, args=(seed + i, db_file, targets, deadline, think, results[i]))
+               for i in range(users)]
+    if csv_files:
+        threads.append(threading.Thread(target=ingest_writer, args=(db_file, csv_files, deadline, ingests)))
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    return summarize([s for r in results for s in r["steps"]], sum(r["sessions"] for r in results),
+                     elapsed, lock_stats.summary(), ingests)
+
+
+# ----------------------------------------------------------------------
+# 4. app 대상 (AppTest 프로세스 가상 사용자)
+# ----------------------------------------------------------------------
+def widget(items, label):
+    return next(w for w in items if w.label == label)
+
+def app_session(at, script, rng, targets):
+    """AppTest 화면에서 사용 흐름 1회를 실행하고 단계별 재실행 시간 [(단계 이름, ms)] 반환"""
+    menus = widget(at.sidebar.radio, "메뉴 선택").options
+    menu_of = {m.split(".")[0]: m for m in menus}
+    reg = rng.choice(list(targets))
+    art = rng.choice(targets[reg][1])
+    timings = []
+
+    def step(name, action):
+        t0 = time.perf_counter()
+        action().run()
+        timings.append((f"{script}.{name}", (time.perf_counter() - t0) * 1000))
+        if at.exception: raise RuntimeError(f"{script}.{name}: {at.exception[0].value}")
+
+    if script == "browse":
+        step("menu", lambda: widget(at.sidebar.radio, "메뉴 선택").set_value(menu_of["3"]))
+        step("regulation", lambda: widget(at.selectbox, "규정").set_value(reg))
+        toc = widget(at.radio, "목차") if any(r.label == "목차" for r in at.radio) else None
+        if toc and toc.options:
+            step("toc_node", lambda: widget(at.radio, "목차").set_value(rng.randrange(len(toc.options))))
+    elif script == "search":
+        step("menu", lambda: widget(at.sidebar.radio, "메뉴 선택").set_value(menu_of["6"]))
+        widget(at.checkbox, "최신 규정만").set_value(rng.random() < 0.7)
+        widget(at.text_input, "검색어").input(rng.choice(KEYWORDS))
+        step("search", lambda: widget(at.button, "검색").click())
+    elif script == "history":
+        step("menu", lambda: widget(at.sidebar.radio, "메뉴 선택").set_value(menu_of["4"]))
+        widget(at.selectbox, "규정").set_value(reg)
+        widget(at.text_input, "조항 번호").input(art)
+        step("history", lambda: widget(at.button, "히스토리 검색").click())
+    else:
+        step("menu", lambda: widget(at.sidebar.radio, "메뉴 선택").set_value(menu_of["7"]))
+        widget(at.selectbox, "관심 규정").set_value(reg)
+        widget(at.text_input, "관심 조항 번호").input(art)
+        step("citation", lambda: widget(at.button, "인용 분석 시작").click())
+    return timings
+
+def app_child(seed, duration, think):
+    """자식 프로세스: 첫 화면을 그린 뒤 마감 시각까지 사용 흐름을 반복하고 결과를 JSON 한 줄로 출력"""
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(seed)
+    targets = load_targets(db.DB_FILE)
+    at = AppTest.from_file(str(APP_FILE), default_timeout=120)
+    at.run()
+    steps, sessions = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for step in app_session(at, pick_script(rng), rng, targets):
+            steps.append(step)
+            if think: time.sleep(rng.uniform(0, 2 * think))
+        sessions += 1
+    print(json.dumps({"steps": steps, "sessions": sessions}, ensure_ascii=False))
+
+def run_app_phase(db_file, users, duration, think, csv_files, seed):
+    # 자식 프로세스는 복사본 DB만 보도록 샤드/배포용 DB 경로를 없는 파일로 지정
+    env = dict(os.environ, REG_DB_FILE=os.path.abspath(db_file),
+               REG_SHARD_DIR=os.path.abspath(os.path.join(BENCH_DIR, "no_shards")),
+               REG_RELEASE_DB=os.path.abspath(os.path.join(BENCH_DIR, "no_release.db")))
+    procs = [subprocess.Popen([sys.executable, __file__, "--child", "--seed", str(seed + i),
+                               "--duration", str(duration), "--think-ms", str(think * 1000)],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env, cwd=APP_FILE.parent)
+             for i in range(users)]
+    # 첫 화면(임포트, 캐시 적재)은 측정 구간에서 빼기 위해 적재 스레드는 자식이 시작한 뒤 띄움
+    ingests = []
+    writer = None
+    started = time.perf_counter()
+    if csv_files:
+        lock_stats.reset()
+        writer = threading.Thread(target=ingest_writer,
+                                  args=(db_file, csv_files, started + duration + APP_STARTUP_GRACE_SEC, ingests))
+        writer.start()
+    outputs = [p.communicate() for p in procs]
+    if writer: writer.join()
+    elapsed = time.perf_counter() - started
+    failed = [err.strip().splitlines()[-1] if err.strip() else f"exit {p.returncode}"
+              for p, (out, err) in zip(procs, outputs) if p.returncode != 0]
+    if failed:
+        raise RuntimeError("가상 사용자 프로세스 실패: " + "; ".join(failed))
+    results = [json.loads(out.strip().splitlines()[-1]) for out, _ in outputs]
+    # 각 자식의 측정 구간은 duration이므로 처리량은 그 기준으로 계산
+    return summarize([tuple(s) for r in results for s in r["steps"]], sum(r["sessions"] for r in results),
+                     min(elapsed, duration), lock_stats.summary() if csv_files else None, ingests)
+
+
+# ----------------------------------------------------------------------
+# 5. 집계 및 보고
+# ----------------------------------------------------------------------
+def percentiles(values):
+    if len(values) < 2:
+        v = round(values[0], 2) if values else None
+        return {"p50": v, "p95": v, "p99": v}
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": round(q[49], 2), "p95": round(q[94], 2), "p99": round(q[98], 2)}
+
+def summarize(steps, sessions, elapsed, locks, ingests):
+    by_step = defaultdict(list)
+    for name, ms in steps: by_step[name].append(ms)
+    return {
+        "sessions": sessions,
+        "steps": len(steps),
+        "elapsed_sec": round(elapsed, 2),
+        "steps_per_sec": round(len(steps) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": percentiles([ms for _, ms in steps]),
+        "by_step": {name: {"count": len(v), **percentiles(v)} for name, v in sorted(by_step.items())},
+        "lock_waits": locks,
+        "ingest_runs": len(ingests),
+        "ingest_ms": percentiles(ingests) if ingests else None,
+    }
+
+def print_phase(name, r):
+    lat = r["latency_ms"]
+    print(f"\n[{name}] 세션 {r['sessions']}회, 단계 {r['steps']}회, {r['steps_per_sec']}단계/s "
+          f"(p50 {lat['p50']} / p95 {lat['p95']} / p99 {lat['p99']} ms)")
+    print(f"  {'단계':<26} {'횟수':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for step, s in r["by_step"].items():
+        print(f"  {step:<26} {s['count']:>6} {s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f}")
+    if r["lock_waits"] is not None:
+        w = r["lock_waits"]
+        print(f"  잠금 대기: {w['count']}회, 합계 {w['total_ms']}ms, 최대 {w['max_ms']}ms")
+    if r["ingest_runs"]:
+        print(f"  적재: {r['ingest_runs']}회 (p50 {r['ingest_ms']['p50']}ms, p99 {r['ingest_ms']['p99']}ms)")
+
+def pick_ingest_files(data_dir, count, targets, seed):
+    """DB에 이미 있는 최신 스냅샷의 원본 파일(Parquet/CSV) 중 count개 (같은 내용을 다시 넣으므로 조회 결과는 바뀌지 않음)"""
+    latest = {(reg, date) for reg, (date, _) in targets.items()}
+    files = [p for p in db.data_files(data_dir) if db.parse_filename_info(p) in latest]
+    if not files:
+        raise RuntimeError(f"'{data_dir}'에 DB의 최신 스냅샷과 같은 Parquet/CSV가 없습니다.")
+    return [str(p) for p in random.Random(seed).sample(files, min(count, len(files)))]
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 동시 사용자 부하 테스트")
+    parser.add_argument("--target", choices=["queries", "app"], default="queries",
+                        help="queries: 조회 함수 직접 호출(스레드), app: app.py를 AppTest로 실행(프로세스)")
+    parser.add_argument("--users", type=int, default=8, help="동시 가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=20.0, help="구간별 측정 시간(초)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="단계 사이 평균 대기 시간(ms, 0이면 쉬지 않음)")
+    parser.add_argument("--ingest", action="store_true", help="적재 중 구간을 추가로 측정")
+    parser.add_argument("--ingest-files", type=int, default=3, help="적재 구간에서 반복 재적재할 CSV 수")
+    parser.add_argument("--src", default=db.DB_FILE, help=f"복사할 원본 DB (기본: {db.DB_FILE})")
+    parser.add_argument("--data-dir", default=db.DATA_DIR, help="재적재할 CSV 폴더 (기본: 규정)")
+    parser.add_argument("--seed", type=int, default=0, help="사용 흐름 선택용 난수 시드")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    think = args.think_ms / 1000
+
+    if args.child:
+        app_child(args.seed, args.duration, think)
+        return
+
+    db_file = prepare_db(args.src)
+    targets = load_targets(db_file)
+    csv_files = pick_ingest_files(args.data_dir, args.ingest_files, targets, args.seed) if args.ingest else []
+    # 적재 함수(ingest_csv_files)가 여는 연결도 잠금 대기를 재도록 교체 (이 프로세스 안에서만 적용)
+    db.get_connection = connect
+    print(f"[{args.target}] 가상 사용자 {args.users}명, 구간별 {args.duration:g}초, 규정 {len(targets)}개 ({db_file})")
+
+    phases = {}
+    for phase, files in [("baseline", [])] + ([("ingest", csv_files)] if args.ingest else []):
+        if args.target == "queries":
+            phases[phase] = run_query_phase(db_file, targets, args.users, args.duration, think, files, args.seed)
+        else:
+            phases[phase] = run_app_phase(db_file, args.users, args.duration, think, files, args.seed)
+        print_phase(phase, phases[phase])
+    if args.target == "app":
+        print("\n(app 대상의 조회 잠금 대기는 자식 프로세스의 busy timeout 안에서 처리되어 응답 시간에만 반영됨)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "target": args.target,
+                "users": args.users,
+                "duration_sec": args.duration,
+                "think_ms": args.think_ms,
+                "ingest_files": [os.path.basename(p) for p in csv_files],
+                "phases": phases,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n[저장] {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+파서 처리량 측정 및 골든 출력 회귀 검사
+'규정' 폴더의 모든 .txt(또는 --source hwp 이면 .hwp)를 병렬로 파싱하여, 파일별 처리 속도(rows/sec, MB/sec)와
+최대 메모리를 측정하고, 결과를 함께 커밋된 .csv(골든 출력)와 행 단위로 비교합니다.
+파서를 최적화했을 때 "더 빠르고 출력은 동일함"을 확인하는 용도입니다.
+
+사용 예:
+    python benchmark_parser.py                         # 전체 측정 + 비교
+    python benchmark_parser.py --jobs 4 --output parser_bench.json
+    python benchmark_parser.py --baseline parser_bench.json   # 이전 측정 대비 속도 비교
+    python benchmark_parser.py --source hwp                    # HWP -> 행 직접 파싱(hwp_reader) 측정
+    python benchmark_parser.py --cached                        # 파싱 캐시 적중 시 로드 속도 측정
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from regulation_parser import BASE_COLS, parse_file, parse_hwp
+
+DATA_DIR = "규정"
+MAX_DIFF_SAMPLES = 5
+
+# 원본 확장자별 파싱 함수 (.hwp는 TXT를 거치지 않고 본문 문단을 바로 파싱)
+PARSERS = {".txt": parse_file, ".hwp": parse_hwp}
+
+
+# ----------------------------------------------------------------------
+# 1. 파일 단위 측정 (워커 프로세스에서 실행)
+# ----------------------------------------------------------------------
+def read_golden(csv_path: Path) -> list:
+    golden = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    return golden.reindex(columns=BASE_COLS, fill_value="").values.tolist()
+
+def diff_rows(expected: list, actual: list) -> list:
+    """행 단위 비교. 다른 행의 (행 번호, 컬럼, 기대값, 실제값) 예시를 반환"""
+    samples = []
+    for i in range(max(len(expected), len(actual))):
+        exp = expected[i] if i < len(expected) else None
+        act = actual[i] if i < len(actual) else None
+        if exp == act: continue
+        if exp is None or act is None:
+            samples.append({"row": i, "column": None, "expected": exp, "actual": act})
+        else:
+            for col, e, a in zip(BASE_COLS, exp, act):
+                if e != a:
+                    samples.append({"row": i, "column": col, "expected": e, "actual": a})
+                    break
+        if len(samples) >= MAX_DIFF_SAMPLES: break
+    return samples
+
+def measure_file(src_path: str, track_memory: bool = True, cached: bool = False) -> dict:
+    """cached=False면 파싱 캐시를 쓰지 않고 항상 파싱, True면 캐시를 채운 뒤 캐시 로드를 측정"""
+    path = Path(src_path)
+    size_mb = path.stat().st_size / 1e6
+    parse = partial(PARSERS[path.suffix.lower()], use_cache=cached)
+    if cached: parse(src_path)
+
+    t0 = time.perf_counter()
+    df = parse(src_path)
+    elapsed = time.perf_counter() - t0
+
+    peak_mb = None
+    if track_memory:
+        # 시간 측정과 분리해 한 번 더 실행 (tracemalloc 오버헤드가 속도에 섞이지 않도록)
+        tracemalloc.start()
+        parse(src_path)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    rows = len(df)
+    result = {
+        "file": path.name,
+        "rows": rows,
+        "size_mb": round(size_mb, 3),
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "mb_per_sec": round(size_mb / elapsed, 3) if elapsed else None,
+        "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+        "golden": None,
+        "diffs": [],
+    }
+
+    csv_path = path.with_suffix(".csv")
+    if csv_path.exists():
+        expected = read_golden(csv_path)
+        actual = df.reindex(columns=BASE_COLS).astype(str).values.tolist()
+        result["diffs"] = diff_rows(expected, actual)
+        result["golden"] = "match" if not result["diffs"] else "mismatch"
+        result["golden_rows"] = len(expected)
+    return result
+
+
+# ----------------------------------------------------------------------
+# 2. 전체 실행 및 보고
+# ----------------------------------------------------------------------
+def run(src_files, jobs, track_memory, cached=False):
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(measure_file, map(str, src_files), [track_memory] * len(src_files),
+                                [cached] * len(src_files)))
+    wall = time.perf_counter() - t0
+    return results, wall
+
+def print_report(results, wall, baseline=None):
+    base_by_file = {r["file"]: r for r in (baseline or {}).get("files", [])}
+    print(f"{'파일':<60} {'행':>6} {'rows/s':>9} {'MB/s':>7} {'peakMB':>7} {'골든':>8}")
+    for r in sorted(results, key=lambda r: r["file"]):
+        line = (f"{r['file'][:60]:<60} {r['rows']:>6} {r['rows_per_sec'] or 0:>9.0f} "
+                f"{r['mb_per_sec'] or 0:>7.2f} {r['peak_mb'] if r['peak_mb'] is not None else '-':>7} {r['golden'] or '-':>8}")
+        base = base_by_file.get(r["file"])
+        if base and r["seconds"]:
+            line += f"  x{base['seconds'] / r['seconds']:.2f}"
+        print(line)
+
+    total_rows = sum(r["rows"] for r in results)
+    total_mb = sum(r["size_mb"] for r in results)
+    cpu_seconds = sum(r["seconds"] for r in results)
+    print(f"\n총 {len(results)}개 파일, {total_rows:,}행, {total_mb:.1f}MB")
+    print(f"  파싱 시간 합계 {cpu_seconds:.2f}s ({total_rows / cpu_seconds:,.0f} rows/s, {total_mb / cpu_seconds:.2f} MB/s), 벽시계 {wall:.2f}s")
+    if baseline:
+        base_seconds = sum(r["seconds"] for r in baseline.get("files", []))
+        print(f"  기준 대비 파싱 시간 x{base_seconds / cpu_seconds:.2f}")
+
+    mismatches = [r for r in results if r["golden"] == "mismatch"]
+    for r in mismatches:
+        print(f"\n[불일치] {r['file']} (골든 {r.get('golden_rows')}행 / 실제 {r['rows']}행)")
+        for d in r["diffs"]:
+            print(f"  행 {d['row']} [{d['column']}] 기대: {str(d['expected'])[:80]!r}")
+            print(f"  {'':>{len(str(d['row'])) + 4}}{'':>{len(str(d['column'])) + 2}} 실제: {str(d['actual'])[:80]!r}")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="파서 처리량 측정 및 골든 CSV 회귀 검사")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="TXT/CSV 폴더 (기본: 규정)")
+    parser.add_argument("--source", choices=["txt", "hwp"], default="txt", help="파싱할 원본 형식 (기본: txt)")
+    parser.add_argument("--pattern", help="대상 파일 패턴 (기본: *.<source>)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="병렬 프로세스 수")
+    parser.add_argument("--no-memory", action="store_true", help="최대 메모리 측정 생략")
+    parser.add_argument("--cached", action="store_true", help="파싱 대신 파싱 캐시(.parse_cache) 로드 속도 측정")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="속도 비교용 이전 결과 JSON")
+    args = parser.parse_args()
+
+    pattern = args.pattern or f"*.{args.source}"
+    src_files = sorted(Path(args.data_dir).glob(pattern))
+    if not src_files:
+        print(f"'{args.data_dir}' 폴더에 {pattern} 파일이 없습니다.")
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results, wall = run(src_files, args.jobs, not args.no_memory, args.cached)
+    mismatches = print_report(results, wall, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "jobs": args.jobs,
+                "wall_seconds": round(wall, 3),
+                "files": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n[저장] {args.output}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대시보드 조회 쿼리 벤치마크
+'규정' 폴더의 CSV로 벤치마크용 DB를 만들고(필요하면 스냅샷을 10배/100배로 복제),
+메뉴별 조회 쿼리(regulation_db)의 실행 시간과 EXPLAIN QUERY PLAN을 JSON으로 저장합니다.
+저장해 둔 기준(baseline) 결과와 비교해 느려진 쿼리를 표시합니다.
+
+사용 예:
+    python benchmark_queries.py                              # 1배 규모 측정
+    python benchmark_queries.py --scale 1 10 100 --save-baseline bench_baseline.json
+    python benchmark_queries.py --scale 1 10 --baseline bench_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import regulation_db as db
+from regulation_db import PREFERRED_REG_NAME, DEFAULT_ART_NO
+
+BENCH_DIR = ".bench"
+KEYWORDS = ["공매도", "증거금", "상장폐지"]
+
+# 기준 대비 이 비율 이상 느려지고, 차이가 MIN_DELTA_MS 이상일 때만 회귀로 판단 (측정 잡음 제외)
+DEFAULT_THRESHOLD = 1.25
+MIN_DELTA_MS = 2.0
+
+
+# ----------------------------------------------------------------------
+# 1. 벤치마크 DB 구성
+# ----------------------------------------------------------------------
+def synthetic_date(copy_no, reg_date):
+    """복제 스냅샷용 개정일. '0'으로 시작하므로 실제 개정일보다 항상 앞서 정렬되어 '최신 규정'은 바뀌지 않음"""
+    return f"0{copy_no:03d}{reg_date}"
+
+def build_bench_db(scale, data_dir, rebuild=False):
+    db_file = os.path.join(BENCH_DIR, f"bench_x{scale}.db")
+    if os.path.exists(db_file) and not rebuild:
+        return db_file
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix): os.remove(db_file + suffix)
+
+    print(f"[build] x{scale}: '{data_dir}' CSV 적재 중...")
+    db.load_files(data_dir=data_dir, db_file=db_file)
+
+    conn = db.get_connection(db_file)
+    snapshots = conn.execute("SELECT regulation_name, reg_date FROM regulation_catalog").fetchall()
+    for copy_no in range(1, scale):
+        for reg_name, reg_date in snapshots:
+            new_date = synthetic_date(copy_no, reg_date)
+            conn.execute('''
+                INSERT INTO regulation_history
+                (regulation_name, reg_date, unique_key, ref_no, article_title, content,
+                 level, chapter_no, chapter_title, section_no, section_title)
+                SELECT regulation_name, ?, unique_key, ref_no, article_title, content,
+                       level, chapter_no, chapter_title, section_no, section_title
+                FROM regulation_history WHERE regulation_name=? AND reg_date=? ORDER BY id
+            ''', (new_date, reg_name, reg_date))
+            db.rebuild_toc(conn.cursor(), reg_name, new_date)
+            db.update_catalog(conn.cursor(), reg_name, new_date)
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+    rows = conn.execute("SELECT COUNT(*) FROM regulation_history").fetchone()[0]
+    conn.close()
+    print(f"[build] x{scale}: {rows:,}행 ({os.path.getsize(db_file) / 1e6:.1f}MB)")
+    return db_file
+
+
+# ----------------------------------------------------------------------
+# 2. 측정 대상 (메뉴별 대표 파라미터)
+# ----------------------------------------------------------------------
+def build_cases(conn):
+    reg = PREFERRED_REG_NAME
+    names = db.fetch_regulation_names(conn)
+    if reg not in names and names: reg = names[0]
+    latest_date = db.fetch_regulation_dates(conn, reg)[0]
+    toc = db.fetch_toc(conn, reg, latest_date)
+    first = toc.iloc[min(1, len(toc) - 1)]
+
+    cases = [
+        ("1.names", lambda: db.fetch_regulation_names(conn)),
+        ("2.dates", lambda: db.fetch_regulation_dates(conn, reg)),
+        ("3.toc", lambda: db.fetch_toc(conn, reg, latest_date)),
+        ("3.toc_contents", lambda: db.fetch_toc_contents(conn, reg, latest_date, (first['chapter_no'], first['chapter_title']))),
+        ("4.history", lambda: db.fetch_article_history(conn, reg, DEFAULT_ART_NO)),
+        ("5.detail", lambda: db.fetch_article_detail(conn, reg, latest_date, DEFAULT_ART_NO)),
+    ]
+    for kw in KEYWORDS:
+        cases.append((f"6.keyword[{kw},latest]", lambda kw=kw: db.search_keyword(conn, kw, None, True)))
+        cases.append((f"6.keyword[{kw},all]", lambda kw=kw: db.search_keyword(conn, kw, None, False)))
+        cases.append((f"6.keyword[{kw},collapsed]", lambda kw=kw: db.search_keyword(conn, kw, None, False, True)))
+    cases.append(("6.keyword[공매도,reg]", lambda: db.search_keyword(conn, "공매도", reg, False)))
+    cases.append(("7.citation[latest]", lambda: db.find_citations(conn, reg, DEFAULT_ART_NO, True)))
+    cases.append(("7.citation[all]", lambda: db.find_citations(conn, reg, DEFAULT_ART_NO, False)))
+    return cases
+
+def result_rows(result):
+    if isinstance(result, dict):
+        return sum(len(v) for v in result.values() if hasattr(v, "__len__") and not isinstance(v, str))
+    if isinstance(result, tuple): result = result[0]
+    return len(result)
+
+
+# ----------------------------------------------------------------------
+# 3. 측정 및 실행 계획 수집
+# ----------------------------------------------------------------------
+def capture_plans(conn, fn):
+    """함수가 실행한 SELECT 계열 SQL을 추적해 EXPLAIN QUERY PLAN 결과를 수집"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try: fn()
+    finally: conn.set_trace_callback(None)
+
+    # 임시 테이블을 만드는 문장은 다시 실행해 두어야 뒤따르는 SELECT의 계획을 구할 수 있음
+    plans = []
+    try:
+        for sql in statements:
+            head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+            is_temp_create = head == "CREATE" and " TEMP " in sql.upper()
+            if head not in ("SELECT", "WITH") and not is_temp_create: continue
+            try:
+                detail = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                if is_temp_create: conn.execute(sql)
+            except sqlite3.Error as e:
+                detail = [f"(plan 실패: {e})"]
+            plans.append({"sql": " ".join(sql.split())[:300], "plan": detail})
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.hits")
+    return plans
+
+def run_case(conn, fn, repeat):
+    fn()  # 워밍업 (페이지 캐시 적재)
+    timings = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "rows": result_rows(result),
+    }
+
+def run_benchmark(scales, data_dir, repeat, rebuild):
+    results = {}
+    for scale in scales:
+        db_file = build_bench_db(scale, data_dir, rebuild)
+        conn = db.get_connection(db_file)
+        for name, fn in build_cases(conn):
+            stats = run_case(conn, fn, repeat)
+            stats["plans"] = capture_plans(conn, fn)
+            key = f"x{scale}/{name}"
+            results[key] = stats
+            print(f"  {key:<40} {stats['median_ms']:>10.2f} ms  ({stats['rows']}행)")
+        conn.close()
+    return results
+
+
+# ----------------------------------------------------------------------
+# 4. 기준 결과와 비교
+# ----------------------------------------------------------------------
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, stats in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base: continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        stats["baseline_ms"] = base["median_ms"]
+        stats["ratio"] = round(ratio, 3)
+        if ratio >= threshold and stats["median_ms"] - base["median_ms"] >= MIN_DELTA_MS:
+            regressions.append((key, base["median_ms"], stats["median_ms"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="규정 DB 조회 쿼리 벤치마크")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="스냅샷 복제 배수 (예: 1 10 100)")
+    parser.add_argument("--data-dir", default=db.DATA_DIR, help="CSV 폴더 (기본: 규정)")
+    parser.add_argument("--repeat", type=int, default=5, help="쿼리별 반복 측정 횟수")
+    parser.add_argument("--rebuild", action="store_true", help="벤치마크 DB를 다시 생성")
+    parser.add_argument("--output", default="bench_results.json", help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준 결과로 저장할 경로")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀 판단 배율 (기본 1.25)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scale, args.data_dir, args.repeat, args.rebuild)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "scales": args.scale,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "regressions": [key for key, *_ in regressions],
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[저장] {path}")
+
+    if regressions:
+        print(f"\n[회귀] 기준 대비 {args.threshold}배 이상 느려진 쿼리 {len(regressions)}개:")
+        for key, base_ms, now_ms, ratio in regressions:
+            print(f"  {key:<40} {base_ms:.2f} -> {now_ms:.2f} ms (x{ratio:.2f})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대시보드 시작 시간 및 재실행 오버헤드 측정
+새 프로세스에서 app.py를 Streamlit AppTest로 실행해 첫 화면 렌더링 시간(콜드 스타트)을 재고,
+이어서 메뉴별로 같은 화면을 다시 실행(버튼 클릭 1회와 같은 재실행)했을 때의 시간을 측정합니다.
+첫 화면을 그린 뒤에도 변환 전용 모듈(pyhwp, openpyxl, 파서 등)이 임포트되어 있으면 지연 임포트가
+깨진 것으로 보고 실패 처리합니다. 측정값이 예산(--budget-*)을 넘어도 종료 코드 1을 돌려줍니다.
+AppTest는 실행마다 app.py를 다시 컴파일하므로, 재실행 시간은 실제 서버(컴파일 결과를 재사용)보다 조금 크게 나옵니다.
+
+사용 예:
+    python benchmark_startup.py                          # 콜드 스타트 3회 + 메뉴별 재실행 5회
+    python benchmark_startup.py --budget-first-ms 1000 --budget-rerun-ms 30
+    python benchmark_startup.py --output startup_bench.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+APP_FILE = Path(__file__).with_name("app.py")
+
+# 대시보드 첫 화면에서 임포트되면 안 되는 모듈 (변환/내보내기 작업을 실행할 때만 필요)
+LAZY_MODULES = ["hwp5", "openpyxl", "olefile", "hwp_reader", "regulation_parser"]
+
+# 기본 예산 (1코어 기준 측정값 첫 화면 약 0.8s, 재실행 15~30ms에 여유를 둔 값)
+DEFAULT_BUDGET_FIRST_MS = 1500.0
+DEFAULT_BUDGET_RERUN_MS = 60.0
+
+
+# ----------------------------------------------------------------------
+# 1. 측정 (자식 프로세스에서 실행)
+# ----------------------------------------------------------------------
+def measure(repeat):
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    harness_ms = (time.perf_counter() - t0) * 1000
+
+    at = AppTest.from_file(str(APP_FILE), default_timeout=120)
+    t0 = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - t0) * 1000
+    errors = [str(e.value) for e in at.exception]
+    lazy_loaded = [m for m in LAZY_MODULES if m in sys.modules]
+
+    menus = {}
+    menu_radio = next(r for r in at.sidebar.radio if r.label == "메뉴 선택")
+    for menu in menu_radio.options:
+        times = []
+        # 첫 실행은 캐시를 채우는 비용이 섞이므로 제외하고, 이후 재실행만 측정
+        next(r for r in at.sidebar.radio if r.label == "메뉴 선택").set_value(menu).run()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            at.run()
+            times.append((time.perf_counter() - t0) * 1000)
+        errors += [f"{menu}: {e.value}" for e in at.exception]
+        menus[menu] = round(statistics.median(times), 2)
+
+    return {
+        "harness_import_ms": round(harness_ms, 1),
+        "first_render_ms": round(first_ms, 1),
+        "rerun_ms": menus,
+        "lazy_loaded": lazy_loaded,
+        "errors": errors,
+    }
+
+def measure_cold(repeat):
+    """콜드 스타트는 매번 새 인터프리터에서 측정 (이미 임포트된 모듈의 영향을 받지 않도록)"""
+    out = subprocess.run([sys.executable, __file__, "--child", "--repeat", str(repeat)],
+                         capture_output=True, text=True, check=True, cwd=APP_FILE.parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ----------------------------------------------------------------------
+# 2. 실행 및 보고
+# ----------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 콜드 스타트 및 재실행 시간 측정")
+    parser.add_argument("--cold-runs", type=int, default=3, help="콜드 스타트 측정 횟수 (중앙값 사용)")
+    parser.add_argument("--repeat", type=int, default=5, help="메뉴별 재실행 측정 횟수")
+    parser.add_argument("--budget-first-ms", type=float, default=DEFAULT_BUDGET_FIRST_MS, help="첫 화면 렌더링 예산(ms)")
+    parser.add_argument("--budget-rerun-ms", type=float, default=DEFAULT_BUDGET_RERUN_MS, help="메뉴별 재실행 예산(ms)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.repeat), ensure_ascii=False))
+        return
+
+    runs = [measure_cold(args.repeat) for _ in range(args.cold_runs)]
+    first_ms = statistics.median(r["first_render_ms"] for r in runs)
+    rerun_ms = {menu: statistics.median(r["rerun_ms"][menu] for r in runs) for menu in runs[0]["rerun_ms"]}
+    lazy_loaded = sorted({m for r in runs for m in r["lazy_loaded"]})
+    errors = sorted({e for r in runs for e in r["errors"]})
+
+    print(f"테스트 하네스 임포트: {statistics.median(r['harness_import_ms'] for r in runs):.0f}ms (streamlit 본체, 예산에서 제외)")
+    print(f"첫 화면 렌더링: {first_ms:.0f}ms (예산 {args.budget_first_ms:.0f}ms)")
+    print(f"\n{'메뉴':<30} {'재실행(ms)':>10}")
+    for menu, ms in rerun_ms.items():
+        flag = "  [예산 초과]" if ms > args.budget_rerun_ms else ""
+        print(f"{menu:<30} {ms:>10.1f}{flag}")
+
+    failures = []
+    if first_ms > args.budget_first_ms:
+        failures.append(f"첫 화면 렌더링 {first_ms:.0f}ms > 예산 {args.budget_first_ms:.0f}ms")
+    failures += [f"{menu} 재실행 {ms:.1f}ms > 예산 {args.budget_rerun_ms:.0f}ms"
+                 for menu, ms in rerun_ms.items() if ms > args.budget_rerun_ms]
+    if lazy_loaded:
+        failures.append(f"첫 화면에서 지연 임포트 대상 모듈이 로드됨: {', '.join(lazy_loaded)}")
+    failures += [f"예외: {e}" for e in errors]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "budget": {"first_render_ms": args.budget_first_ms, "rerun_ms": args.budget_rerun_ms},
+                "first_render_ms": first_ms,
+                "rerun_ms": rerun_ms,
+                "runs": runs,
+                "failures": failures,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n[저장] {args.output}")
+
+    if failures:
+        print("\n[실패]")
+        for msg in failures: print(f"  {msg}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+정의 용어 사전
+규정 본문에서 정의된 용어와 그 정의 행을 스냅샷(규정명, 개정일)마다 뽑아 glossary_terms 테이블에 색인하고,
+같은 과정에서 그 스냅샷 안의 용어 사용 조항 수를 함께 셉니다.
+"X는 어디서 정의되고, 정의가 개정마다 어떻게 바뀌었나"를 키워드 검색 없이 용어 색인 조회로 답합니다.
+
+    - 정의: '“X”라 함은', '“X”란' 형태의 문장과 정의 조(조명에 '정의')의 'X : ...' 항목
+    - 약칭: '(이하 “X”라 한다)'. '이하 이 조에서'처럼 범위가 붙으면 scope에 범위(조/항/호/절/장 등)를 기록
+    - 정의문: 일치한 문장 하나(<개정 ...> 같은 개정 이력 표기 제외). 개정일 사이의 비교는 이 문장으로 함
+    - 사용 조항 수: 스냅샷의 다른 행 중 용어가 들어 있는 행 수 (키워드 검색과 같은 부분 일치).
+      범위가 붙은 약칭은 같은 조 안에서만 셈
+    - 적재 시: regulation_db가 목차(regulation_toc)와 같이 적재한 스냅샷마다 rebuild_snapshot을 호출 (같은 트랜잭션)
+
+사용 예:
+    python glossary.py list --reg "유가증권시장 업무규정"    # 최신 개정본의 용어 목록
+    python glossary.py show 결제회원                          # 정의 위치와 개정별 정의문 변화
+    python glossary.py build --all                            # 모든 스냅샷 용어 사전 다시 생성
+"""
+
+import argparse
+import re
+from bisect import bisect_right
+
+import pandas as pd
+
+import perf_trace as perf
+
+_OPEN, _CLOSE = "“\"‘'", "”\"’'"
+_QUOTED = rf"[{_OPEN}]([^{_OPEN}{_CLOSE}\n]{{1,40}})[{_CLOSE}]"
+# 따옴표로 묶은 용어 + 정의 서술어 (라 함은 / 란 / 라 한다)
+DEFINE_RE = re.compile(_QUOTED + r"\s*(?:이?라\s*함은|이?란|이?라고?\s*한다)")
+QUOTED_RE = re.compile(_QUOTED)
+# 약칭의 적용 범위: (이하 이 조에서 “X”라 한다)
+SCOPE_RE = re.compile(r"이하\s*(?:이\s*([조항호목편장절]|별표)\s*(?:및\s*\S+\s*)?에서)?")
+# 정의 조의 'X : 설명' 항목 (앞의 '1.', '가.', '①' 번호는 건너뜀)
+COLON_RE = re.compile(r"^\s*(?:[가-하]\.|\d+\.|[①-⑳])?\s*((?!\d)[^\s:：()「」“”\"]{2,30}(?: [^\s:：()「」“”\"]{1,15})?)\s*[:：]")
+DEFINITION_TITLE = "정의"
+# 정의문 비교에서 뺄 개정 이력 표기: <개정 2009.1.28>, [전문개정 2009.1.28], <신설 ...>
+NOTE_RE = re.compile(r"\s*(?:<[^<>]*(?:개정|신설|삭제|이동)[^<>]*>|\[[^\[\]]*(?:개정|신설|삭제|이동)[^\[\]]*\])")
+SENTENCE_END_RE = re.compile(r"다\.(?=\s|$)")
+
+KINDS = {"definition": "정의", "abbreviation": "약칭"}
+TERM_COLUMNS = ["term", "kind", "scope", "row_id", "ref_no", "article_title", "definition", "usage_count"]
+
+LATEST_SQL = "SELECT regulation_name, MAX(reg_date) FROM regulation_catalog GROUP BY regulation_name"
+
+
+# ----------------------------------------------------------------------
+# 1. 정의 추출
+# ----------------------------------------------------------------------
+def _sentence(text, start, end):
+    """text[start:end]를 포함하는 문장 (개정 이력 표기 제외)"""
+    begin = 0
+    for m in SENTENCE_END_RE.finditer(text, 0, start):
+        begin = m.end()
+    m = SENTENCE_END_RE.search(text, end)
+    return NOTE_RE.sub("", text[begin:m.end() if m else len(text)]).strip()
+
+def _open_paren(text, pos):
+    """pos를 감싸는 가장 안쪽 여는 괄호 위치 (없으면 -1)"""
+    depth = 0
+    for i in range(pos - 1, -1, -1):
+        if text[i] == ")": depth += 1
+        elif text[i] == "(":
+            if depth == 0: return i
+            depth -= 1
+    return -1
+
+def extract_definitions(content, article_title=""):
+    """행 본문 -> [(용어, 종류, 범위, 정의문)]. 같은 행의 같은 용어는 한 번만"""
+    text = content or ""
+    found = {}
+    for m in DEFINE_RE.finditer(text):
+        paren = _open_paren(text, m.start())
+        scope = SCOPE_RE.match(text, paren + 1) if paren >= 0 else None
+        if scope and scope.group(0):
+            # (이하 “A” 또는 “B”라 한다): 괄호 안의 따옴표 용어 모두
+            terms = QUOTED_RE.findall(text, paren + 1, m.end())
+            kind, scope_name = "abbreviation", scope.group(1) or ""
+        else:
+            terms, kind, scope_name = [m.group(1)], "definition", ""
+        sentence = _sentence(text, m.start(), m.end())
+        for term in terms:
+            term = term.strip()
+            if term and term not in found: found[term] = (term, kind, scope_name, sentence)
+    if DEFINITION_TITLE in (article_title or "") and not found:
+        m = COLON_RE.match(text)
+        if m: found[m.group(1)] = (m.group(1), "definition", "", NOTE_RE.sub("", text).strip())
+    return list(found.values())
+
+def _article_of(unique_key):
+    """unique_key(장번호_조_항_호_목)의 조 단위 키"""
+    return tuple((unique_key or "").split("_")[:2])
+
+def snapshot_glossary(rows):
+    """스냅샷 행 [(id, unique_key, ref_no, article_title, content)] (원문 순서) -> 정의 목록 DataFrame(TERM_COLUMNS)
+    용어마다 본문을 한 번 훑어 사용 행을 찾고, 정의 행 자신은 사용 수에서 뺌"""
+    entries = []
+    for row_id, unique_key, ref_no, title, content in rows:
+        for term, kind, scope, sentence in extract_definitions(content, title):
+            entries.append((term, kind, scope, row_id, ref_no, title, sentence, unique_key))
+    if not entries: return pd.DataFrame(columns=TERM_COLUMNS)
+
+    # 행을 구분 문자로 이어 붙인 본문에서 용어 위치를 찾고, 행 시작 위치로 행 번호를 구함
+    texts = [r[4] or "" for r in rows]
+    starts, pos = [], 0
+    for t in texts:
+        starts.append(pos)
+        pos += len(t) + 1
+    joined = "\x00".join(texts)
+    row_index = {r[0]: i for i, r in enumerate(rows)}
+    articles = [_article_of(r[1]) for r in rows]
+
+    used = {}
+    for term in {e[0] for e in entries}:
+        used[term] = {bisect_right(starts, m.start()) - 1 for m in re.finditer(re.escape(term), joined)}
+
+    out = []
+    for term, kind, scope, row_id, ref_no, title, sentence, unique_key in entries:
+        own = row_index[row_id]
+        hits = used[term] - {own}
+        if scope: hits = {i for i in hits if articles[i] == articles[own]}
+        out.append((term, kind, scope, row_id, ref_no, title, sentence, len(hits)))
+    return pd.DataFrame(out, columns=TERM_COLUMNS)
+
+
+# ----------------------------------------------------------------------
+# 2. 저장 (적재 시 스냅샷 단위 갱신)
+# ----------------------------------------------------------------------
+def init_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS glossary_terms (
+            regulation_name TEXT,
+            reg_date TEXT,
+            term TEXT,
+            kind TEXT,
+            scope TEXT,
+            row_id INTEGER,
+            ref_no TEXT,
+            article_title TEXT,
+            definition TEXT,
+            usage_count INTEGER
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_glossary_term ON glossary_terms(term, regulation_name, reg_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_glossary_snapshot ON glossary_terms(regulation_name, reg_date)")
+
+def rebuild_snapshot(cursor, reg_name, reg_date):
+    """스냅샷 1개의 용어 사전을 다시 만듦. 저장한 정의 수 반환"""
+    rows = cursor.execute(
+        "SELECT id, unique_key, ref_no, article_title, content FROM regulation_history "
+        "WHERE regulation_name=? AND reg_date=? ORDER BY id", (reg_name, reg_date)).fetchall()
+    terms = snapshot_glossary(rows)
+    cursor.execute("DELETE FROM glossary_terms WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    cursor.executemany("INSERT INTO glossary_terms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       [(reg_name, reg_date, *r) for r in terms.itertuples(index=False)])
+    return len(terms)
+
+def update_glossary(cursor, rebuild_all=False):
+    """용어 사전이 없는 스냅샷(rebuild_all이면 전체)의 사전을 만듦. 처리한 스냅샷 수 반환
+    (정의가 하나도 없는 스냅샷은 행이 남지 않으므로 매번 다시 확인하지만, 그런 스냅샷은 드물고 작음)"""
+    init_tables(cursor)
+    sql = "SELECT regulation_name, reg_date FROM regulation_catalog"
+    if not rebuild_all:
+        sql += " c WHERE NOT EXISTS (SELECT 1 FROM glossary_terms g WHERE g.regulation_name = c.regulation_name AND g.reg_date = c.reg_date)"
+    targets = cursor.execute(sql).fetchall()
+    with perf.span("glossary_build", snapshots=len(targets)):
+        for reg_name, reg_date in targets:
+            rebuild_snapshot(cursor, reg_name, reg_date)
+    return len(targets)
+
+
+# ----------------------------------------------------------------------
+# 3. 조회 (대시보드, CLI)
+# ----------------------------------------------------------------------
+def _frame(conn, sql, params=()):
+    with perf.span("sql", sql=sql, params=params):
+        cursor = conn.execute(sql, params)
+        rows = cursor.fetchall()
+    return pd.DataFrame.from_records(rows, columns=[d[0] for d in cursor.description])
+
+def fetch_terms(conn, reg_name=None):
+    """최신 개정본에 정의된 용어 목록 (term, regulations: 정의한 규정 수, usage_count: 사용 조항 수 합계)"""
+    sql = f"""
+        SELECT term, COUNT(DISTINCT regulation_name) AS regulations, SUM(usage_count) AS usage_count
+        FROM glossary_terms WHERE (regulation_name, reg_date) IN ({LATEST_SQL})
+    """
+    params = ()
+    if reg_name is not None:
+        sql += " AND regulation_name = ?"
+        params = (reg_name,)
+    return _frame(conn, sql + " GROUP BY term ORDER BY term", params)
+
+def merge_terms(frames):
+    """DB별(샤드별) 용어 목록 합치기. 한 규정은 한 DB에만 있으므로 규정 수와 사용 수는 더하면 됨"""
+    df = pd.concat(frames, ignore_index=True)
+    return df.groupby("term", as_index=False)[["regulations", "usage_count"]].sum()
+
+def fetch_definitions(conn, term, reg_name=None):
+    """용어의 모든 스냅샷 정의 행 (규정명, 개정일 최신 순). seq는 규정의 개정본 순번 (개정 이력의 연속 구간 판정용)"""
+    sql = f"""
+        SELECT regulation_name, reg_date, {', '.join(TERM_COLUMNS[1:])}, seq
+        FROM glossary_terms
+        JOIN (SELECT regulation_name, reg_date, ROW_NUMBER() OVER (PARTITION BY regulation_name ORDER BY reg_date) AS seq
+              FROM regulation_catalog) USING (regulation_name, reg_date)
+        WHERE term = ?
+    """
+    params = [term]
+    if reg_name is not None:
+        sql += " AND regulation_name = ?"
+        params.append(reg_name)
+    return _frame(conn, sql + " ORDER BY regulation_name, reg_date DESC, row_id", params)
+
+def definition_history(definitions):
+    """정의 행 -> 규정·범위·정의문이 같은 행이 연속된 개정본에 나온 구간별로 묶은 개정 이력
+    (first_date ~ last_date 동안 같은 정의문, snapshots: 구간의 개정본 수, 구간 마지막 개정본의 조항 번호와 사용 조항 수).
+    정의문이 바뀌었다가 다시 돌아오면(A→B→A) 구간이 나뉘므로, 각 행의 다음 행이 바로 이전 시기의 정의문임"""
+    columns = ["regulation_name", "kind", "scope", "definition", "first_date", "last_date", "snapshots", "ref_no", "usage_count"]
+    if definitions.empty: return pd.DataFrame(columns=columns)
+    keys = ["regulation_name", "kind", "scope", "definition"]
+    df = definitions.sort_values(["regulation_name", "reg_date"], ascending=[True, False], kind="stable")
+    # 구간 번호: 개정본 순번 - 같은 정의문 안의 순번 (한 개정본에 같은 정의문이 여러 번 있어도 순번은 하나)
+    df = df.assign(island=df["seq"] - df.groupby(keys, sort=False)["seq"].rank(method="dense"))
+    grouped = df.groupby(keys + ["island"], sort=False)
+    history = grouped.agg(first_date=("reg_date", "min"), last_date=("reg_date", "max"),
+                          snapshots=("reg_date", "nunique"), ref_no=("ref_no", "first"),
+                          usage_count=("usage_count", "first")).reset_index()
+    return history.sort_values(["regulation_name", "last_date", "first_date"], ascending=[True, False, False],
+                               kind="stable").reset_index(drop=True)[columns]
+
+
+# ----------------------------------------------------------------------
+# 4. CLI
+# ----------------------------------------------------------------------
+def main():
+    # regulation_db가 적재 시 이 모듈을 쓰므로 DB/샤드 모듈은 CLI에서만 임포트
+    import regulation_db as db
+    import regulation_shards as shards
+
+    parser = argparse.ArgumentParser(description="정의 용어 사전 생성 및 조회")
+    parser.add_argument("command", choices=["build", "list", "show"])
+    parser.add_argument("term", nargs="?", help="show할 용어")
+    parser.add_argument("--reg", help="대상 규정 (기본: 전체)")
+    parser.add_argument("--all", action="store_true", help="build: 모든 스냅샷 용어 사전을 다시 생성")
+    parser.add_argument("--db", help=f"대상 DB (기본: 샤드 구성이 있으면 샤드 전체, 없으면 {db.DB_FILE})")
+    args = parser.parse_args()
+    if args.command == "show" and not args.term:
+        parser.error("show에는 용어가 필요합니다.")
+
+    files = [args.db] if args.db else (shards.shard_files() if shards.is_enabled() else [db.DB_FILE])
+    frames = []
+    for f in files:
+        if args.command == "build": db.init_db(f)
+        conn = db.get_connection(f)
+        try:
+            if args.command == "build":
+                n = update_glossary(conn.cursor(), args.all)
+                if n: db.bump_data_version(conn.cursor())
+                conn.commit()
+                print(f"{f}: {n}개 스냅샷 용어 사전 생성")
+            elif args.command == "list":
+                frames.append(fetch_terms(conn, args.reg))
+            else:
+                frames.append(fetch_definitions(conn, args.term, args.reg))
+        finally:
+            conn.close()
+    if args.command == "build": return
+
+    if args.command == "list":
+        df = merge_terms(frames)
+        for _, r in df.iterrows():
+            print(f"{r['term']}  (규정 {r['regulations']}개, 사용 {r['usage_count']}곳)")
+        print(f"\n용어 {len(df)}개")
+        return
+
+    history = definition_history(pd.concat(frames, ignore_index=True))
+    if history.empty:
+        print(f"'{args.term}'의 정의를 찾지 못했습니다.")
+        return
+    for _, r in history.iterrows():
+        scope = f" · 이 {r['scope']}에서" if r["scope"] else ""
+        print(f"[{r['regulation_name']}] {r['ref_no']} ({KINDS[r['kind']]}{scope}) "
+              f"{r['first_date']} ~ {r['last_date']} · 개정본 {r['snapshots']}개 · 사용 {r['usage_count']}곳")
+        print(f"    {r['definition'][:300]}")
+
+
+if __name__ == "__main__":
+    main()
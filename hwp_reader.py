@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HWP5 본문 텍스트 추출 모듈
+HWP5 복합 파일(OLE)에서 BodyText/Section* 스트림을 풀고(raw deflate) 문단 레코드를 직접 읽어
+pyhwp의 hwp5txt와 같은 규칙으로 텍스트를 만듭니다. hwp5txt처럼 XML 모델과 XSLT를 거치지 않고
+TXT 파일도 만들지 않으므로, 문단 단위로 바로 regulation_parser에 넘길 수 있습니다.
+
+hwp5txt(plaintext.xsl)와 동일한 출력 규칙:
+    - 최상위 문단마다 텍스트 + 줄바꿈
+    - 제어 문자(탭, 줄바꿈 문자, 묶음 빈칸 등)는 출력하지 않음
+    - 표는 "\\n<표>\\n", 그리기 개체는 "\\n<그림>\\n"으로만 표시 (내부 텍스트 생략)
+    - 그 밖의 확장 컨트롤(머리말/꼬리말, 각주 등)은 안쪽 문단을 제자리에 출력
+
+배포용 문서와 암호가 걸린 문서는 지원하지 않으며 HwpFormatError를 발생시킵니다.
+"""
+
+import os
+import re
+import struct
+import zlib
+
+try:
+    import olefile
+    HAS_OLEFILE = True
+except ImportError:
+    HAS_OLEFILE = False
+
+# FileHeader 속성 비트
+FLAG_COMPRESSED = 0x01
+FLAG_PASSWORD = 0x02
+FLAG_DISTRIBUTION = 0x04
+
+# 레코드 태그 (HWPTAG_BEGIN = 0x10)
+TAG_PARA_HEADER = 0x10 + 50
+TAG_PARA_TEXT = 0x10 + 51
+TAG_CTRL_HEADER = 0x10 + 55
+
+# 8 WCHAR 크기의 제어 문자 (나머지 0x00~0x1f는 1 WCHAR)
+INLINE_CONTROLS = {0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x13, 0x14}
+EXTENDED_CONTROLS = {0x01, 0x02, 0x03, 0x0b, 0x0c, 0x0e, 0x0f, 0x10, 0x11, 0x12, 0x15, 0x16, 0x17}
+
+# 확장 컨트롤 id -> 대체 텍스트 (hwp5txt의 TableControl / GShapeObjectControl)
+CONTROL_PLACEHOLDERS = {
+    b"tbl ": "\n<표>\n",
+    b"gso ": "\n<그림>\n",
+}
+
+_CONTROL_CHAR = re.compile(rb"[\x00-\x1f]\x00")
+
+
+class HwpFormatError(Exception):
+    """이 모듈로 읽을 수 없는 HWP 파일 (HWP5가 아니거나 배포용/암호 문서)"""
+
+
+# ----------------------------------------------------------------------
+# 1. 레코드 파싱
+# ----------------------------------------------------------------------
+class _Record:
+    __slots__ = ("tag", "data", "children")
+
+    def __init__(self, tag, data):
+        self.tag = tag
+        self.data = data
+        self.children = []
+
+def _read_records(data):
+    """섹션 스트림 -> 레코드 트리. 레코드 헤더의 level로 부모-자식 관계를 만듦"""
+    root = _Record(None, b"")
+    stack = [(-1, root)]
+    pos, end = 0, len(data)
+    while pos + 4 <= end:
+        header, = struct.unpack_from("<I", data, pos)
+        pos += 4
+        tag, level, size = header & 0x3FF, (header >> 10) & 0x3FF, header >> 20
+        if size == 0xFFF:
+            size, = struct.unpack_from("<I", data, pos)
+            pos += 4
+        record = _Record(tag, data[pos:pos + size])
+        pos += size
+
+        while stack[-1][0] >= level: stack.pop()
+        stack[-1][1].children.append(record)
+        stack.append((level, record))
+    return root
+
+
+# ----------------------------------------------------------------------
+# 2. 문단 텍스트 구성
+# ----------------------------------------------------------------------
+def _paragraph_text(para):
+    """문단 레코드 -> 텍스트 (확장 컨트롤은 제어 문자 위치에 인라인으로 펼침)"""
+    text_rec = next((c for c in para.children if c.tag == TAG_PARA_TEXT), None)
+    if text_rec is None: return ""
+    controls = iter([c for c in para.children if c.tag == TAG_CTRL_HEADER])
+
+    data = text_rec.data
+    parts = []
+    pos = 0
+    for m in _CONTROL_CHAR.finditer(data):
+        i = m.start()
+        if i & 1 or i < pos: continue   # WCHAR 경계가 아니거나 앞 제어 문자의 인자 영역
+        if i > pos: parts.append(data[pos:i].decode("utf-16-le", errors="replace"))
+        code = data[i]
+        if code in EXTENDED_CONTROLS:
+            ctrl = next(controls, None)
+            if ctrl is not None: parts.append(_control_text(ctrl))
+            pos = i + 16
+        elif code in INLINE_CONTROLS:
+            pos = i + 16
+        else:
+            pos = i + 2
+    if pos < len(data): parts.append(data[pos:].decode("utf-16-le", errors="replace"))
+    return "".join(parts)
+
+def _control_text(ctrl):
+    ctrl_id = ctrl.data[:4][::-1]
+    if ctrl_id in CONTROL_PLACEHOLDERS:
+        return CONTROL_PLACEHOLDERS[ctrl_id]
+    return "".join(_paragraph_text(p) + "\n" for p in _paragraphs_under(ctrl))
+
+def _paragraphs_under(node):
+    """컨트롤 안쪽의 문단 (더 안쪽 컨트롤의 문단은 그 컨트롤을 펼칠 때 처리)"""
+    for child in node.children:
+        if child.tag == TAG_PARA_HEADER:
+            yield child
+        elif child.tag != TAG_CTRL_HEADER:
+            yield from _paragraphs_under(child)
+
+
+# ----------------------------------------------------------------------
+# 3. 파일 읽기
+# ----------------------------------------------------------------------
+def _section_streams(ole):
+    sections = [e for e in ole.listdir() if len(e) == 2 and e[0] == "BodyText" and e[1].startswith("Section")]
+    return sorted(sections, key=lambda e: int(e[1][len("Section"):]))
+
+def iter_hwp_text(filename):
+    """최상위 문단마다 '텍스트 + 줄바꿈' 조각을 반환 (이어 붙이면 hwp5txt 출력과 같음)"""
+    if not HAS_OLEFILE:
+        raise ImportError("olefile 라이브러리가 설치되어 있지 않습니다. 'pip install olefile'을 실행해주세요.")
+    filename = os.fspath(filename)
+    if not olefile.isOleFile(filename):
+        raise HwpFormatError(f'"{filename}"은(는) HWP5 파일이 아닙니다.')
+
+    with olefile.OleFileIO(filename) as ole:
+        header = ole.openstream("FileHeader").read()
+        if not header.startswith(b"HWP Document File"):
+            raise HwpFormatError(f'"{filename}"은(는) HWP5 파일이 아닙니다.')
+        flags, = struct.unpack_from("<I", header, 36)
+        if flags & (FLAG_PASSWORD | FLAG_DISTRIBUTION):
+            raise HwpFormatError(f'"{filename}"은(는) 배포용 또는 암호가 설정된 문서입니다.')
+
+        for entry in _section_streams(ole):
+            data = ole.openstream(entry).read()
+            if flags & FLAG_COMPRESSED:
+                data = zlib.decompress(data, -15)
+            for para in _read_records(data).children:
+                if para.tag == TAG_PARA_HEADER:
+                    yield _paragraph_text(para) + "\n"
+
+def iter_hwp_lines(filename):
+    """본문을 줄 단위로 반환 (TXT로 저장한 뒤 다시 읽은 것과 같은 줄 구분)"""
+    for chunk in iter_hwp_text(filename):
+        yield from chunk.splitlines()
+
+def extract_text(filename):
+    return "".join(iter_hwp_text(filename))
@@ -1,12 +1,14 @@
 import os
 import glob
 import sys
+from pathlib import Path
 
-# pyhwp 라이브러리 내부 모듈 임포트
-try:
-    import hwp5.hwp5txt
-except ImportError:
-    print("오류: pyhwp 라이브러리가 설치되어 있지 않습니다. 'pip install pyhwp'를 실행해주세요.")
+from hwp_reader import HAS_OLEFILE
+from jobs import convert_hwp_file
+
+# 내장 추출기(hwp_reader)는 olefile이 필요함 (pyhwp 설치 시 함께 설치됨)
+if not HAS_OLEFILE:
+    print("오류: olefile 라이브러리가 설치되어 있지 않습니다. 'pip install pyhwp'를 실행해주세요.")
     sys.exit(1)
 
 def convert_all_hwp_to_txt():
@@ -41,25 +43,12 @@ def convert_all_hwp_to_txt():
 
         print(f"변환 중: {file_name} -> {os.path.basename(txt_path)}")
         
-        # 5. 파이썬 내부 모듈(hwp5txt)을 직접 호출 (subprocess 미사용)
-        # hwp5txt.main()이 인자를 읽을 수 있도록 sys.argv를 임시로 세팅합니다.
-        original_argv = sys.argv
-        sys.argv = ['hwp5txt', '--output', txt_path, hwp_path]
-        
+        # 5. 내장 추출기로 본문 문단을 직접 읽어 저장 (배포용 문서 등은 pyhwp의 hwp5txt로 대체)
         try:
-            hwp5.hwp5txt.main()
-        except SystemExit as e:
-            # hwp5txt.main()은 작업 완료 시 sys.exit()을 호출하는 구조이므로, 
-            # 이를 예외로 잡아내어 스크립트가 완전히 종료되는 것을 방지합니다.
-            if e.code == 0 or e.code is None:
-                print("  └─ 성공")
-            else:
-                print(f"  └─ 실패 (에러 코드: {e.code})")
+            convert_hwp_file(Path(hwp_path))
+            print("  └─ 성공")
         except Exception as e:
-            print(f"  └─ 알 수 없는 오류: {e}")
-        finally:
-            # 다음 파일 변환을 위해 sys.argv를 원래 상태로 복구
-            sys.argv = original_argv
+            print(f"  └─ 실패: {e}")
 
     print("\n모든 작업이 완료되었습니다.")
 
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+개정 영향 보고서
+규정의 새 개정본이 적재되면 직전 개정본과 조(條) 단위로 비교해 바뀐 조를 찾고, 최신 규정 전체에서
+그 조를 인용하는 조항(시행세칙, 다른 규정, 같은 규정 안)을 인용의 인용까지 depth 단계만큼 따라가 보고서로 저장합니다.
+
+    - 인용 그래프: 최신 스냅샷의 모든 행을 한 번만 읽어 '제N조(의M)' 언급을 정규식으로 찾고, 앞의 「규정명」,
+      'OO규정/세칙', '법/시행령/부칙' 같은 한정어와 '및/부터/제N항' 같은 연결어를 보고 어느 규정의 조인지 판단
+      (조 번호마다 LIKE 검색을 3번씩 하는 인용 검색 메뉴와 달리 '제2조'가 '제20조'에 걸리지 않음)
+    - 변경 조: 같은 조 번호가 다시 나오는 부칙은 제외하고 본문 조만 비교 (공백 차이는 무시)
+    - 적재 시: regulation_db 적재 함수가 같은 트랜잭션에서 update_reports를 호출해, 최신 스냅샷 중
+      보고서가 없거나 다시 적재된 스냅샷의 보고서만 새로 만듦 (이전 개정본의 보고서는 그대로 보관)
+
+결과는 impact_reports / impact_changes / impact_citations 테이블(샤드 구성이면 catalog.db)에 저장되며,
+대시보드의 '개정 영향 보고서' 메뉴에서 바로 열거나 엑셀로 내려받을 수 있습니다.
+인용 단계(depth)의 기본값은 환경 변수 REG_IMPACT_DEPTH로 바꿀 수 있습니다.
+
+사용 예:
+    python impact_report.py build                              # 보고서가 없거나 오래된 최신 스냅샷만 생성
+    python impact_report.py build --depth 3 --all              # 모든 최신 스냅샷 보고서를 3단계로 다시 생성
+    python impact_report.py list
+    python impact_report.py export "유가증권시장 업무규정" --output impact.xlsx
+"""
+
+import argparse
+import io
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+
+import perf_trace as perf
+
+# 인용을 따라갈 단계 수 (1: 바뀐 조를 직접 인용하는 조항만)
+DEFAULT_DEPTH = int(os.environ.get("REG_IMPACT_DEPTH", "2"))
+MAX_DEPTH = 5
+
+# 조 언급과 그 바로 앞의 한정어: 「규정명」 / 'OO규정', 'OO세칙' / 법령·부칙 (이 보고서에서는 제외)
+# 한정어는 언급마다 앞쪽 QUALIFIER_WINDOW 글자에서만 찾음 (본문 전체에 선택적 접두어 패턴을 걸면 매 글자에서 다시 시도해 느림)
+MENTION_RE = re.compile(r"제\d+조(?:의\d+)?")
+QUALIFIER_RE = re.compile(r"(?:「([^」]+)」|(\S*(?:규정|세칙))|(\S*(?:법|령|규칙|부칙)))\s*$")
+QUALIFIER_WINDOW = 40
+# 앞 언급과의 사이가 이것뿐이면 앞 언급과 같은 규정의 조로 봄 (예: 「A」 제5조 및 제6조, 제3조제1항부터 제5조까지)
+CONNECTOR_RE = re.compile(r"(?:\s|[,·ㆍ~]|및|또는|내지|부터|까지|와|과|제\d+(?:항|호|목)|의\d+)*")
+_LEADING_MARKS = re.compile(r"^[^가-힣]+")
+
+RELATIONS = {"internal": "같은 규정", "partner": "짝 규정(세칙)", "external": "다른 규정"}
+CHANGE_TYPES = {"modified": "개정", "added": "신설", "deleted": "삭제"}
+
+LATEST_SQL = "SELECT regulation_name, MAX(reg_date) FROM regulation_catalog GROUP BY regulation_name"
+CORPUS_COLUMNS = ["regulation_name", "reg_date", "unique_key", "ref_no", "article_title", "content"]
+
+
+# ----------------------------------------------------------------------
+# 1. 조 단위 비교
+# ----------------------------------------------------------------------
+def main_articles(unique_keys):
+    """행별 조 번호. 본문 조가 아닌 행(조 번호 없음, 부칙처럼 앞에서 이미 나온 조 번호가 다시 시작)은 None"""
+    labels, seen, prev, current = [], set(), None, None
+    for key in unique_keys:
+        chapter, label = (key.split("_") + [""])[:2]
+        if label in ("", "nan", "0"):
+            labels.append(None)
+            continue
+        if (chapter, label) != prev:
+            current = None if label in seen else label
+            seen.add(label)
+            prev = (chapter, label)
+        labels.append(current)
+    return labels
+
+def article_texts(rows):
+    """스냅샷 행 [(unique_key, article_title, content)] -> {조 번호: (조명, 본문)} (본문 조만, 행 순서 유지)"""
+    articles = {}
+    for label, (_, title, content) in zip(main_articles([r[0] for r in rows]), rows):
+        if label is None: continue
+        prev_title, text = articles.get(label, (None, []))
+        text.append(content or "")
+        articles[label] = (prev_title or title, text)
+    return {label: (title, "\n".join(text)) for label, (title, text) in articles.items()}
+
+def _normalized(text):
+    return re.sub(r"\s+", "", text)
+
+def changed_articles(old_rows, new_rows):
+    """직전/새 스냅샷 행 -> 바뀐 조 DataFrame (article, change_type, article_title, old_text, new_text). 새 개정본 순서, 삭제된 조는 끝에"""
+    old, new = article_texts(old_rows), article_texts(new_rows)
+    changes = []
+    for label, (title, text) in new.items():
+        if label not in old:
+            changes.append((label, "added", title, "", text))
+        elif _normalized(old[label][1]) != _normalized(text):
+            changes.append((label, "modified", title, old[label][1], text))
+    changes += [(label, "deleted", title, text, "") for label, (title, text) in old.items() if label not in new]
+    return pd.DataFrame(changes, columns=["article", "change_type", "article_title", "old_text", "new_text"])
+
+
+# ----------------------------------------------------------------------
+# 2. 인용 그래프
+# ----------------------------------------------------------------------
+class CitationGraph:
+    """최신 스냅샷 전체의 조 인용 관계. cited_by[(규정명, 조 번호)] = [(행 위치, 관계)]"""
+
+    def __init__(self, corpus, catalog):
+        self.rows = corpus.reset_index(drop=True)
+        names = {name for name, _ in catalog}
+        self.partner = {name: partner for name, partner in catalog if partner in names}
+        self._by_compact = {re.sub(r"\s+", "", name): name for name, _ in catalog}
+        self.row_article = []
+        for _, group in self.rows.groupby(["regulation_name", "reg_date"], sort=False):
+            self.row_article += main_articles(group["unique_key"].tolist())
+        self.cited_by = defaultdict(list)
+        for pos, (reg_name, content, own) in enumerate(zip(self.rows["regulation_name"], self.rows["content"], self.row_article)):
+            for target, label in self.mentions(reg_name, content or ""):
+                relation = "internal" if target == reg_name else "partner" if target == self.partner.get(reg_name) else "external"
+                # 조 안에서 자기 조의 항/호를 가리키는 언급은 인용으로 보지 않음
+                if relation == "internal" and label == own: continue
+                self.cited_by[(target, label)].append((pos, relation))
+
+    def resolve(self, reg_name, qualifier):
+        """한정어(「규정명」 또는 'OO규정') -> 규정명. 최신 규정 목록에 없으면 None"""
+        compact = re.sub(r"\s+", "", _LEADING_MARKS.sub("", qualifier))
+        is_rule = reg_name.endswith("세칙")
+        if compact in ("규정", "이규정"):
+            return self.partner.get(reg_name) if is_rule else reg_name
+        if compact in ("세칙", "이세칙", "시행세칙"):
+            return reg_name if is_rule else self.partner.get(reg_name)
+        if compact in self._by_compact: return self._by_compact[compact]
+        # 시장 이름을 뺀 'OO규정'은 같은 시장의 규정으로 봄 (예: 유가증권시장 업무규정 시행세칙의 '상장규정' -> 유가증권시장 상장규정)
+        market = reg_name.split()[0]
+        candidates = [name for c, name in self._by_compact.items() if c.endswith(compact)]
+        same_market = [name for name in candidates if name.startswith(market)]
+        if len(same_market) == 1: return same_market[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def mentions(self, reg_name, content):
+        """본문의 조 언급 [(규정명, 조 번호)] (법령/부칙 및 알 수 없는 규정의 조는 제외)"""
+        out, target, prev_end = [], reg_name, None
+        for m in MENTION_RE.finditer(content):
+            q = QUALIFIER_RE.search(content, max(m.start() - QUALIFIER_WINDOW, prev_end or 0), m.start())
+            bracket, word, law = q.groups() if q else (None, None, None)
+            label = m.group(0)
+            if bracket is not None or word is not None:
+                target = self.resolve(reg_name, bracket if bracket is not None else word)
+            elif law is not None:
+                target = None
+            elif prev_end is None or not CONNECTOR_RE.fullmatch(content, prev_end, m.start()):
+                target = reg_name
+            prev_end = m.end()
+            if target is not None: out.append((target, label))
+        return out
+
+    def impacted(self, seeds, depth):
+        """바뀐 조 seeds [(규정명, 조 번호)]를 depth 단계까지 인용하는 행
+        -> DataFrame (depth, cited_regulation, cited_article, relation, 행 정보). 행마다 가장 가까운 단계 한 번만"""
+        frontier, found = list(dict.fromkeys(seeds)), []
+        seeds = set(frontier)
+        seen_nodes, seen_rows = set(seeds), set()
+        for level in range(1, depth + 1):
+            next_frontier = []
+            for node in frontier:
+                for pos, relation in self.cited_by.get(node, ()):
+                    if pos in seen_rows: continue
+                    own = (self.rows.at[pos, "regulation_name"], self.row_article[pos])
+                    # 바뀐 조 자신의 행은 변경 목록에 이미 있으므로 제외
+                    if own in seeds: continue
+                    seen_rows.add(pos)
+                    found.append((level, *node, relation, pos))
+                    if own[1] is not None and own not in seen_nodes:
+                        seen_nodes.add(own)
+                        next_frontier.append(own)
+            frontier = next_frontier
+            if not frontier: break
+        hits = pd.DataFrame(found, columns=["depth", "cited_regulation", "cited_article", "relation", "pos"])
+        rows = self.rows.loc[hits["pos"], ["regulation_name", "reg_date", "ref_no", "article_title", "content"]]
+        return pd.concat([hits.drop(columns="pos"), rows.reset_index(drop=True)], axis=1)
+
+
+# ----------------------------------------------------------------------
+# 3. 저장 (적재 시 증분 갱신)
+# ----------------------------------------------------------------------
+def init_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS impact_reports (
+            regulation_name TEXT,
+            reg_date TEXT,
+            prev_date TEXT,
+            depth INTEGER,
+            changed_count INTEGER,
+            impacted_count INTEGER,
+            impacted_regulations INTEGER,
+            source_ingested_at TEXT,
+            created_at TEXT,
+            PRIMARY KEY(regulation_name, reg_date)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS impact_changes (
+            regulation_name TEXT,
+            reg_date TEXT,
+            article TEXT,
+            change_type TEXT,
+            article_title TEXT,
+            old_text TEXT,
+            new_text TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS impact_citations (
+            regulation_name TEXT,
+            reg_date TEXT,
+            depth INTEGER,
+            cited_regulation TEXT,
+            cited_article TEXT,
+            relation TEXT,
+            item_regulation TEXT,
+            item_date TEXT,
+            ref_no TEXT,
+            article_title TEXT,
+            content TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_impact_changes ON impact_changes(regulation_name, reg_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_impact_citations ON impact_citations(regulation_name, reg_date, depth)")
+
+def latest_snapshots(conns):
+    """최신 스냅샷 [(규정명, 개정일, 직전 개정일, 적재 시각)]. conns는 통합 DB 연결(커서) 1개 또는 샤드 연결들"""
+    out = []
+    for conn in conns:
+        out += conn.execute(f'''
+            SELECT c.regulation_name, c.reg_date,
+                   (SELECT MAX(p.reg_date) FROM regulation_catalog p WHERE p.regulation_name = c.regulation_name AND p.reg_date < c.reg_date),
+                   c.ingested_at
+            FROM regulation_catalog c WHERE (c.regulation_name, c.reg_date) IN ({LATEST_SQL})
+        ''').fetchall()
+    return out
+
+def stale_snapshots(conns, cursor, depth=DEFAULT_DEPTH):
+    """직전 개정본이 있는 최신 스냅샷 중 보고서가 없거나, 보고서를 만든 뒤 다시 적재되었거나, 단계 수가 다른 스냅샷"""
+    reports = {(r[0], r[1]): r[2:] for r in cursor.execute(
+        "SELECT regulation_name, reg_date, prev_date, depth, source_ingested_at FROM impact_reports")}
+    return [s for s in latest_snapshots(conns) if s[2] is not None and reports.get(s[:2]) != (s[2], depth, s[3])]
+
+def snapshot_rows(conns, reg_name, reg_date):
+    for conn in conns:
+        rows = conn.execute("SELECT unique_key, article_title, content FROM regulation_history "
+                            "WHERE regulation_name=? AND reg_date=? ORDER BY id", (reg_name, reg_date)).fetchall()
+        if rows: return rows
+    return []
+
+def load_graph(conns):
+    frames, catalog = [], []
+    for conn in conns:
+        frames.append(pd.DataFrame.from_records(conn.execute(f'''
+            SELECT h.{", h.".join(CORPUS_COLUMNS)} FROM regulation_history h
+            WHERE (h.regulation_name, h.reg_date) IN ({LATEST_SQL}) ORDER BY h.regulation_name, h.id
+        ''').fetchall(), columns=CORPUS_COLUMNS))
+        catalog += conn.execute("SELECT DISTINCT regulation_name, partner_name FROM regulation_catalog").fetchall()
+    return CitationGraph(pd.concat(frames, ignore_index=True), catalog)
+
+def build_report(conns, graph, reg_name, reg_date, prev_date, depth=DEFAULT_DEPTH):
+    """(바뀐 조, 영향받는 조항) DataFrame"""
+    changes = changed_articles(snapshot_rows(conns, reg_name, prev_date), snapshot_rows(conns, reg_name, reg_date))
+    citations = graph.impacted([(reg_name, a) for a in changes["article"]], depth)
+    return changes, citations
+
+def store_report(cursor, reg_name, reg_date, prev_date, depth, source_ingested_at, changes, citations):
+    for table in ("impact_reports", "impact_changes", "impact_citations"):
+        cursor.execute(f"DELETE FROM {table} WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    cursor.execute('''
+        INSERT INTO impact_reports (regulation_name, reg_date, prev_date, depth, changed_count, impacted_count,
+                                    impacted_regulations, source_ingested_at, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (reg_name, reg_date, prev_date, depth, len(changes), len(citations),
+          citations["regulation_name"].nunique(), source_ingested_at, datetime.now().isoformat(timespec="seconds")))
+    cursor.executemany("INSERT INTO impact_changes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       [(reg_name, reg_date, *r) for r in changes.itertuples(index=False)])
+    cursor.executemany("INSERT INTO impact_citations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       [(reg_name, reg_date, *r) for r in citations.itertuples(index=False)])
+
+def update_reports(conns, cursor, depth=DEFAULT_DEPTH, rebuild_all=False):
+    """보고서가 필요한 최신 스냅샷의 보고서를 만들어 cursor 쪽 DB에 저장. 만든 보고서 수 반환.
+    conns: 규정 본문을 읽을 연결 목록 (통합 DB면 적재 트랜잭션 중인 cursor 자신, 샤드면 샤드 연결들)"""
+    init_tables(cursor)
+    targets = [s for s in latest_snapshots(conns) if s[2] is not None] if rebuild_all else stale_snapshots(conns, cursor, depth)
+    if not targets: return 0
+    with perf.span("impact_graph"):
+        graph = load_graph(conns)
+    for reg_name, reg_date, prev_date, ingested_at in targets:
+        with perf.span("impact_report", regulation=reg_name):
+            changes, citations = build_report(conns, graph, reg_name, reg_date, prev_date, depth)
+            store_report(cursor, reg_name, reg_date, prev_date, depth, ingested_at, changes, citations)
+    return len(targets)
+
+
+# ----------------------------------------------------------------------
+# 4. 조회 및 내보내기 (대시보드, CLI)
+# ----------------------------------------------------------------------
+def _frame(conn, sql, params=()):
+    with perf.span("sql", sql=sql, params=params):
+        cursor = conn.execute(sql, params)
+        rows = cursor.fetchall()
+    return pd.DataFrame.from_records(rows, columns=[d[0] for d in cursor.description])
+
+def fetch_reports(conn):
+    """보고서 목록 (한 번도 만들지 않았으면 None). 최근 개정일 순"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='impact_reports'").fetchone():
+        return None
+    return _frame(conn, "SELECT * FROM impact_reports ORDER BY reg_date DESC, regulation_name")
+
+def fetch_report(conn, reg_name, reg_date):
+    """보고서 1개 {'summary': 요약 dict, 'changes': 바뀐 조, 'citations': 영향받는 조항}"""
+    summary = _frame(conn, "SELECT * FROM impact_reports WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    changes = _frame(conn, """
+        SELECT article, change_type, article_title, old_text, new_text FROM impact_changes
+        WHERE regulation_name=? AND reg_date=? ORDER BY rowid
+    """, (reg_name, reg_date))
+    citations = _frame(conn, """
+        SELECT depth, cited_regulation, cited_article, relation, item_regulation, item_date, ref_no, article_title, content
+        FROM impact_citations WHERE regulation_name=? AND reg_date=? ORDER BY depth, rowid
+    """, (reg_name, reg_date))
+    return {"summary": summary.iloc[0].to_dict() if not summary.empty else None, "changes": changes, "citations": citations}
+
+def report_frames(report):
+    """엑셀/CSV용 한글 열 이름 표 (요약, 바뀐 조, 영향 조항)"""
+    s = report["summary"]
+    summary = pd.DataFrame([("규정", s["regulation_name"]), ("개정일", s["reg_date"]), ("직전 개정일", s["prev_date"]),
+                            ("인용 단계", s["depth"]), ("바뀐 조", s["changed_count"]), ("영향 조항", s["impacted_count"]),
+                            ("영향 규정 수", s["impacted_regulations"]), ("생성 시각", s["created_at"])], columns=["항목", "값"])
+    changes = report["changes"].assign(change_type=report["changes"]["change_type"].map(CHANGE_TYPES)).rename(columns={
+        "article": "조", "change_type": "구분", "article_title": "조명", "old_text": "개정 전", "new_text": "개정 후"})
+    citations = report["citations"].assign(relation=report["citations"]["relation"].map(RELATIONS)).rename(columns={
+        "depth": "단계", "cited_regulation": "인용 대상 규정", "cited_article": "인용 대상 조", "relation": "관계",
+        "item_regulation": "규정", "item_date": "개정일", "ref_no": "조항", "article_title": "조명", "content": "내용"})
+    return {"요약": summary, "바뀐 조": changes, "영향 조항": citations}
+
+def export_excel(report):
+    """보고서 엑셀 바이트 (시트: 요약, 바뀐 조, 영향 조항)"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for sheet, df in report_frames(report).items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+    return output.getvalue()
+
+
+# ----------------------------------------------------------------------
+# 5. CLI
+# ----------------------------------------------------------------------
+def main():
+    # regulation_db가 적재 시 이 모듈을 쓰므로 DB/샤드 모듈은 CLI에서만 임포트
+    import regulation_db as db
+    import regulation_shards as shards
+
+    parser = argparse.ArgumentParser(description="개정 영향 보고서 생성, 목록, 내보내기")
+    parser.add_argument("command", choices=["build", "list", "export"])
+    parser.add_argument("regulation", nargs="?", help="export할 규정명")
+    parser.add_argument("--date", help="export할 개정일 (기본: 그 규정의 최신 보고서)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help=f"인용을 따라갈 단계 수 (기본 {DEFAULT_DEPTH}, 최대 {MAX_DEPTH})")
+    parser.add_argument("--all", action="store_true", help="build: 최신 스냅샷 보고서를 모두 다시 생성")
+    parser.add_argument("--db", help=f"대상 DB (기본: 샤드 구성이 있으면 샤드 전체, 없으면 {db.DB_FILE})")
+    parser.add_argument("--output", help="export 파일 경로 (.xlsx 또는 .csv, 기본: 규정명_개정일_영향.xlsx)")
+    args = parser.parse_args()
+    if not 1 <= args.depth <= MAX_DEPTH:
+        parser.error(f"--depth는 1~{MAX_DEPTH} 사이여야 합니다.")
+
+    use_shards = shards.is_enabled() and args.db is None
+    conn = shards.connect_catalog() if use_shards else db.get_connection(args.db)
+    try:
+        if args.command == "build":
+            sources = [db.get_connection(f) for f in shards.shard_files()] if use_shards else [conn]
+            try:
+                built = update_reports(sources, conn.cursor(), args.depth, args.all)
+                if built: db.bump_data_version(conn.cursor())
+                conn.commit()
+            finally:
+                if use_shards:
+                    for c in sources: c.close()
+            print(f"보고서 {built}개 생성 (인용 {args.depth}단계)")
+
+        reports = fetch_reports(conn)
+        if reports is None or reports.empty:
+            print("보고서가 없습니다. 규정의 새 개정본을 적재하거나 'python impact_report.py build'를 실행하세요.")
+            return
+        if args.command in ("build", "list"):
+            print(f"{'개정일':<10} {'직전':<10} {'바뀐 조':>6} {'영향 조항':>8} {'영향 규정':>8}  규정")
+            for _, r in reports.iterrows():
+                print(f"{r['reg_date']:<10} {r['prev_date']:<10} {r['changed_count']:>6} {r['impacted_count']:>8} "
+                      f"{r['impacted_regulations']:>8}  {r['regulation_name']}")
+            return
+
+        if not args.regulation:
+            parser.error("export에는 규정명이 필요합니다.")
+        matched = reports[reports["regulation_name"] == args.regulation]
+        if args.date: matched = matched[matched["reg_date"] == args.date]
+        if matched.empty:
+            parser.error(f"'{args.regulation}' {args.date or ''} 보고서가 없습니다.")
+        reg_date = matched["reg_date"].iloc[0]
+        report = fetch_report(conn, args.regulation, reg_date)
+    finally:
+        conn.close()
+
+    output = args.output or f"{args.regulation}_{reg_date}_영향.xlsx"
+    if output.lower().endswith(".csv"):
+        # CSV는 표 하나만 담을 수 있으므로 영향 조항 표만 저장
+        report_frames(report)["영향 조항"].to_csv(output, index=False, encoding="utf-8-sig")
+    else:
+        with open(output, "wb") as f:
+            f.write(export_excel(report))
+    print(f"[저장] {output} (바뀐 조 {len(report['changes'])}개, 영향 조항 {len(report['citations'])}건)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+백그라운드 작업 실행 모듈
+사이드바의 HWP->TXT 변환, TXT->Parquet 변환, DB 업데이트, 엑셀 내보내기를 Streamlit 스크립트 실행과
+분리된 스레드에서 돌립니다. 작업 상태와 진행률은 별도 SQLite 파일(regulation_jobs.db)에 기록되므로
+버튼을 누른 세션이 새로고침되거나 닫혀도 작업은 끝까지 진행되고, 다른 세션에서도 진행 상황과 결과를 볼 수 있습니다.
+
+작업 종류별로 동시에 하나만 실행됩니다(single-flight). 이미 실행 중인 작업이 있으면 submit()은
+새 작업을 만들지 않고 기존 작업 id를 돌려줍니다. 실행하던 프로세스가 죽어 남은 '실행 중' 기록은
+다음 submit() 때 실패로 정리됩니다.
+"""
+
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+import perf_trace as perf
+import regulation_db as db
+import regulation_shards as shards
+import release_db as release
+
+# 변환 모듈(hwp_reader, regulation_parser, pyhwp)은 변환 작업을 실행할 때 임포트함.
+# 대시보드는 이 모듈을 항상 임포트하므로, 변환을 하지 않는 세션의 시작 시간에 포함되지 않도록 함
+
+JOBS_DB = "regulation_jobs.db"
+EXPORT_DIR = "exports"
+
+JOB_LABELS = {
+    "hwp_to_txt": "HWP -> TXT 변환",
+    "txt_to_parquet": "TXT -> Parquet 변환",
+    "db_update": "DB 업데이트",
+    "excel_export": "엑셀 내보내기",
+}
+
+# 진행률은 이 간격보다 자주 기록하지 않음 (파일 수가 많아도 상태 DB 쓰기가 병목이 되지 않도록)
+PROGRESS_INTERVAL_SEC = 0.5
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+# ----------------------------------------------------------------------
+# 1. 작업 상태 저장소
+# ----------------------------------------------------------------------
+_schema_ready = False
+
+def _connect():
+    global _schema_ready
+    conn = sqlite3.connect(JOBS_DB, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if _schema_ready: return conn
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT,
+            status TEXT,
+            progress REAL DEFAULT 0,
+            message TEXT DEFAULT '',
+            result TEXT,
+            error TEXT,
+            owner_pid INTEGER,
+            created_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type ON jobs(job_type, id)")
+    _schema_ready = True
+    return conn
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def _to_dict(row):
+    if row is None: return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def _update(job_id, **fields):
+    conn = _connect()
+    try:
+        cols = ", ".join(f"{k}=?" for k in fields)
+        conn.execute(f"UPDATE jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+def get_job(job_id):
+    conn = _connect()
+    try: return _to_dict(conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+    finally: conn.close()
+
+def latest_jobs():
+    """작업 종류별 가장 최근 작업 {job_type: job} (이름이 바뀌어 없어진 작업 종류의 기록은 제외)"""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT * FROM jobs WHERE id IN (SELECT MAX(id) FROM jobs GROUP BY job_type)").fetchall()
+    finally:
+        conn.close()
+    return {row["job_type"]: _to_dict(row) for row in rows if row["job_type"] in JOB_LABELS}
+
+
+# ----------------------------------------------------------------------
+# 2. 작업 정의 (progress(비율, 메시지) 콜백을 받아 결과 dict를 반환)
+# ----------------------------------------------------------------------
+def hwp_converter_available():
+    """내장 추출기(olefile) 또는 pyhwp가 설치되어 있는지 (모듈을 임포트하지 않고 확인)"""
+    return any(importlib.util.find_spec(name) is not None for name in ("olefile", "hwp5"))
+
+def _convert_with_pyhwp(hwp_path, txt_path):
+    """pyhwp의 hwp5txt를 직접 호출 (내장 추출기가 읽지 못하는 배포용/암호 문서용)"""
+    try:
+        import hwp5.hwp5txt
+    except ImportError:
+        raise RuntimeError("이 문서는 pyhwp가 필요합니다. 'pip install pyhwp'를 실행해주세요.")
+
+    original_argv = sys.argv
+    sys.argv = ['hwp5txt', '--output', str(txt_path), str(hwp_path)]
+    try:
+        with perf.span("hwp_convert", file=hwp_path.name):
+            hwp5.hwp5txt.main()
+    except SystemExit as e:
+        # hwp5txt.main()은 완료 시 sys.exit()을 호출하므로 에러 코드로만 실패를 판단
+        if e.code not in (0, None):
+            raise RuntimeError(f"변환 실패 (에러 코드: {e.code})")
+    finally:
+        sys.argv = original_argv
+
+def _tee_lines(chunks, f):
+    """hwp_reader의 문단 조각을 TXT 파일에 쓰면서 줄 단위로 넘김"""
+    for chunk in chunks:
+        f.write(chunk)
+        yield from chunk.splitlines()
+
+def convert_hwp_file(hwp_path):
+    """HWP 1개를 같은 이름의 TXT로 변환. 내장 추출기(hwp_reader)를 쓰고, 읽지 못하는 문서만 pyhwp로 변환"""
+    from hwp_reader import HwpFormatError, iter_hwp_text
+    txt_path = hwp_path.with_suffix(".txt")
+    tmp_path = txt_path.with_name(txt_path.name + ".tmp")
+    try:
+        with perf.span("hwp_extract", file=hwp_path.name):
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                f.writelines(iter_hwp_text(hwp_path))
+        os.replace(tmp_path, txt_path)
+    except (ImportError, HwpFormatError):
+        _convert_with_pyhwp(hwp_path, txt_path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+    return txt_path
+
+def write_parquet(df, src_path):
+    """파싱 결과를 원본과 같은 이름의 Parquet으로 저장 (원본 해시와 파서 버전을 메타데이터로 기록)"""
+    import regulation_parquet
+    from regulation_parser import PARSER_VERSION, source_hash
+    out_path = src_path.with_suffix(regulation_parquet.PARQUET_SUFFIX)
+    with perf.span("parquet_write", rows=len(df)):
+        regulation_parquet.write_table(df, out_path, src_path.name, source_hash(src_path), PARSER_VERSION)
+    return out_path
+
+def convert_hwp_to_parquet(hwp_path):
+    """HWP -> TXT, Parquet을 한 번에 처리. 문단을 읽으면서 TXT에 쓰고, 같은 줄을 바로 파서에 넘김"""
+    from hwp_reader import HwpFormatError, iter_hwp_text
+    from regulation_parser import parse_hwp
+    txt_path = hwp_path.with_suffix(".txt")
+    tmp_path = txt_path.with_name(txt_path.name + ".tmp")
+    try:
+        with perf.span("parse", file=hwp_path.name):
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                df = parse_hwp(hwp_path, lines=_tee_lines(iter_hwp_text(hwp_path), f))
+        os.replace(tmp_path, txt_path)
+    except (ImportError, HwpFormatError):
+        _convert_with_pyhwp(hwp_path, txt_path)
+        return convert_txt_file(txt_path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+    return write_parquet(df, hwp_path)
+
+def convert_txt_file(txt_path):
+    """TXT 1개를 파싱해 같은 이름의 Parquet으로 저장"""
+    from regulation_parser import parse_file
+    # 파일 읽기와 파싱은 줄 단위 스트리밍으로 함께 진행되므로 하나의 단계로 측정
+    with perf.span("parse", file=txt_path.name):
+        df = parse_file(str(txt_path))
+    return write_parquet(df, txt_path)
+
+def _convert_folder(pattern, out_suffix, convert, progress):
+    """'규정' 폴더에서 출력 파일이 없는 원본만 변환. 파일별 오류는 모아서 결과로 반환"""
+    target_dir = Path(db.DATA_DIR)
+    if not target_dir.is_dir():
+        return {"converted": -1, "skipped": 0, "errors": [], "message": f"'{db.DATA_DIR}' 폴더가 없습니다."}
+    files = sorted(target_dir.glob(pattern))
+    if not files:
+        return {"converted": 0, "skipped": 0, "errors": [], "message": f"'{db.DATA_DIR}' 폴더 내에 {pattern[1:]} 파일이 없습니다."}
+
+    converted, skipped, errors = 0, 0, []
+    for idx, src in enumerate(files):
+        progress(idx / len(files), f"처리 중: {src.name}")
+        if src.with_suffix(out_suffix).exists():
+            skipped += 1
+            continue
+        try:
+            convert(src)
+            converted += 1
+        except Exception as e:
+            errors.append(f"'{src.name}' 처리 중 오류: {e}")
+    return {"converted": converted, "skipped": skipped, "errors": errors, "message": "완료"}
+
+def hwp_to_txt_job(progress):
+    return _convert_folder("*.hwp", ".txt", convert_hwp_file, progress)
+
+def txt_to_parquet_job(progress):
+    return _convert_folder("*.txt", ".parquet", convert_txt_file, progress)
+
+def db_update_job(progress):
+    # 샤드 구성이 있으면 시장별(규정별) 샤드에 나누어 적재
+    load = shards.load_files if shards.is_enabled() else db.load_files
+    cnt, skip = load(progress=lambda frac, name: progress(frac, f"적재 중: {name}"))
+    return {"loaded": cnt, "skipped": skip}
+
+def excel_export_job(progress):
+    db_file, readonly = None, False
+    if shards.is_enabled(): db_file = shards.shard_files()
+    elif release.is_enabled(): db_file, readonly = db.RELEASE_DB_FILE, True
+    data = db.export_db_to_excel(db_file, progress=lambda frac, name: progress(frac, f"테이블 저장 중: {name}"), readonly=readonly)
+    if data is None:
+        raise RuntimeError("엑셀 파일 생성 중 오류가 발생했습니다.")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"regulation_db_dump_{datetime.now():%Y%m%d_%H%M%S}.xlsx")
+    with open(path, "wb") as f:
+        f.write(data)
+    return {"path": path, "size": len(data)}
+
+JOB_FUNCTIONS = {
+    "hwp_to_txt": hwp_to_txt_job,
+    "txt_to_parquet": txt_to_parquet_job,
+    "db_update": db_update_job,
+    "excel_export": excel_export_job,
+}
+
+
+# ----------------------------------------------------------------------
+# 3. 실행기
+# ----------------------------------------------------------------------
+_threads = {}   # 이 프로세스에서 실행 중인 작업: job_id -> Thread
+_threads_lock = threading.Lock()
+
+def _is_alive(job):
+    if job["owner_pid"] == os.getpid():
+        # 등록은 되었지만 아직 start() 전인 스레드도 실행 중으로 봄 (_run이 끝날 때 제거)
+        with _threads_lock:
+            return job["id"] in _threads
+    try:
+        os.kill(job["owner_pid"], 0)
+    except OSError:
+        return False
+    return True
+
+def submit(job_type):
+    """작업 시작. (job_id, 새로 시작했는지) 반환. 같은 종류가 실행 중이면 그 작업 id를 돌려줌"""
+    if job_type not in JOB_FUNCTIONS:
+        raise ValueError(f"알 수 없는 작업 종류: {job_type}")
+
+    conn = _connect()
+    try:
+        # 확인과 등록 사이에 다른 세션/프로세스가 끼어들지 않도록 쓰기 잠금을 먼저 잡음
+        conn.execute("BEGIN IMMEDIATE")
+        running = conn.execute("SELECT * FROM jobs WHERE job_type=? AND status=? ORDER BY id DESC",
+                               (job_type, STATUS_RUNNING)).fetchall()
+        for job in running:
+            if _is_alive(job):
+                conn.execute("COMMIT")
+                return job["id"], False
+            conn.execute("UPDATE jobs SET status=?, error=?, finished_at=? WHERE id=?",
+                         (STATUS_FAILED, "실행하던 프로세스가 종료되어 중단되었습니다.", _now(), job["id"]))
+
+        cursor = conn.execute("INSERT INTO jobs (job_type, status, owner_pid, created_at) VALUES (?, ?, ?, ?)",
+                              (job_type, STATUS_RUNNING, os.getpid(), _now()))
+        job_id = cursor.lastrowid
+        thread = threading.Thread(target=_run, args=(job_id, job_type), name=f"job-{job_type}-{job_id}", daemon=True)
+        with _threads_lock:
+            _threads[job_id] = thread
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction: conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    thread.start()
+    return job_id, True
+
+class _ProgressReporter:
+    """progress(비율, 메시지) 콜백. PROGRESS_INTERVAL_SEC 간격으로만 상태 DB에 기록"""
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.last = 0.0
+    def __call__(self, fraction, message=""):
+        now = time.monotonic()
+        if now - self.last < PROGRESS_INTERVAL_SEC: return
+        self.last = now
+        _update(self.job_id, progress=round(min(max(fraction, 0.0), 1.0), 4), message=message)
+
+def _run(job_id, job_type):
+    try:
+        with perf.request(job_type, job_id=job_id):
+            result = JOB_FUNCTIONS[job_type](_ProgressReporter(job_id))
+        _update(job_id, status=STATUS_DONE, progress=1.0, message="완료",
+                result=json.dumps(result, ensure_ascii=False), finished_at=_now())
+    except Exception as e:
+        traceback.print_exc()
+        _update(job_id, status=STATUS_FAILED, error=str(e), finished_at=_now())
+    finally:
+        with _threads_lock:
+            _threads.pop(job_id, None)
+
+def wait(job_id, timeout=None, interval=0.2):
+    """작업이 끝날 때까지 대기 (CLI/테스트용). 끝난 작업 기록 반환"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job["status"] != STATUS_RUNNING: return job
+        if deadline is not None and time.monotonic() >= deadline: return job
+        time.sleep(interval)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시장 간 유사 조항 군집 분석 (MinHash LSH)
+유가증권/코스닥/코넥스 업무규정과 시행세칙처럼 거의 같은 조항이 개정을 거치며 조금씩 달라지는 경우를 찾기 위해,
+전체 이력의 모든 행을 문자 3-gram 집합으로 보고 MinHash 서명과 LSH 버킷으로 유사한 행끼리 묶습니다.
+모든 행 쌍을 비교하지 않고 같은 버킷에 들어간 후보만 서명 일치율(자카드 유사도 추정치)로 확인합니다.
+
+    - 같은 본문은 한 번만 계산 (이력 대부분은 개정되지 않은 동일 본문)
+    - 버킷 대표와 일치율이 THRESHOLD 이상이면 같은 군집으로 합치고, 연쇄로 합쳐져 군집 대표와 멀어진 행은 다시 분리
+    - 2개 이상 규정에 걸친 군집만 저장하고, 최신 스냅샷에서 규정별 본문(개정 주석, 목록 기호, 공백 제외)이 서로 다르면 '달라짐'으로 표시
+
+결과는 duplicate_clusters / duplicate_members 테이블(샤드 구성이면 catalog.db)에 저장되며 대시보드에서 조회합니다.
+적재할 때마다 자동으로 실행되지 않는 오프라인 분석이므로, 새 개정본을 적재한 뒤 다시 실행하세요.
+
+사용 예:
+    python near_duplicates.py build                   # 분석 후 저장
+    python near_duplicates.py build --threshold 0.8   # 더 엄격한 기준
+    python near_duplicates.py report                  # 최신 스냅샷에서 달라진 군집 요약
+"""
+
+import argparse
+import difflib
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import regulation_db as db
+import regulation_shards as shards
+import similarity
+
+# MinHash 서명 길이와 LSH 밴드 구성 (16밴드 x 8행: 자카드 유사도 약 0.7부터 후보가 될 확률이 높아짐)
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+# 너무 짧은 행('삭제', 호 제목 등)은 서로 우연히 비슷하므로 제외
+MIN_TEXT_LEN = 30
+SEED = 20240601
+
+_PRIME = np.uint64(4294967311)  # 2^32보다 큰 소수 (32비트 특징 해시용)
+# 최신본 비교 시 무시할 부분: 개정/신설 주석, 목록 기호(가. 1. ①), 공백
+_ANNOTATION = re.compile(r"<[^>]*>|\[[^\]]*\]|^\s*(?:[가-힣]\.|\d+\.|[①-⑳])|\s+")
+
+ROW_COLUMNS = ["regulation_name", "reg_date", "ref_no", "article_title", "content"]
+
+
+# ----------------------------------------------------------------------
+# 1. MinHash 서명과 LSH 군집
+# ----------------------------------------------------------------------
+def compare_key(text):
+    """최신본 비교용 본문: 개정 주석(<개정 2016.12.28>, [본조신설 2020.4.29]), 앞의 목록 기호, 공백 제거"""
+    return _ANNOTATION.sub("", text or "")
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=SEED):
+    """텍스트별 MinHash 서명 (len(texts) x num_perm, uint32). 해시 함수는 (a*x + b) mod p"""
+    indptr, features, _ = similarity.vectorize(texts, sizes=(SHINGLE_SIZE,), bits=32)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+    x = features.astype(np.uint64)
+    sig = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for i in range(num_perm):
+        sig[:, i] = np.minimum.reduceat((a[i] * x + b[i]) % _PRIME, indptr[:-1])
+    return sig
+
+def lsh_clusters(sig, bands=BANDS, threshold=THRESHOLD):
+    """서명 행렬 -> 행별 군집 번호(군집 대표 행 번호). 같은 밴드 값을 가진 행을 버킷 대표와 비교해 합침"""
+    n, rows_per_band = len(sig), sig.shape[1] // bands
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for j in range(bands):
+        band = np.ascontiguousarray(sig[:, j * rows_per_band:(j + 1) * rows_per_band])
+        _, bucket = np.unique(band.view(np.dtype((np.void, band.itemsize * rows_per_band))).ravel(), return_inverse=True)
+        order = np.argsort(bucket, kind="stable")
+        head = order[np.searchsorted(bucket[order], bucket[order])]
+        cand = head != order
+        x, y = head[cand], order[cand]
+        similar = (sig[x] == sig[y]).mean(axis=1) >= threshold
+        for u, v in zip(x[similar], y[similar]):
+            ru, rv = find(u), find(v)
+            if ru != rv: parent[rv] = ru
+
+    roots = np.array([find(i) for i in range(n)])
+    # 연쇄로 합쳐져 대표와의 일치율이 기준 미만인 행은 단독 군집으로 분리
+    return np.where((sig == sig[roots]).mean(axis=1) >= threshold, roots, np.arange(n))
+
+
+# ----------------------------------------------------------------------
+# 2. 분석 및 저장
+# ----------------------------------------------------------------------
+def read_rows(conns):
+    frames = [pd.DataFrame.from_records(conn.execute(f"SELECT {', '.join(ROW_COLUMNS)} FROM regulation_history").fetchall(),
+                                        columns=ROW_COLUMNS) for conn in conns]
+    rows = pd.concat(frames, ignore_index=True)
+    rows["is_latest"] = rows["reg_date"] == rows.groupby("regulation_name")["reg_date"].transform("max")
+    return rows
+
+def find_clusters(rows, threshold=THRESHOLD):
+    """행 DataFrame -> (군집 요약, 군집 구성원) DataFrame. 2개 이상 규정에 걸친 군집만 반환"""
+    rows = rows.assign(text=[similarity.row_text("", c) for c in rows["content"]])
+    rows = rows[rows["text"].str.len() >= MIN_TEXT_LEN]
+    texts, text_no = np.unique(rows["text"].to_numpy(), return_inverse=True)
+    roots = lsh_clusters(minhash_signatures(list(texts)), threshold=threshold)
+    rows = rows.assign(cluster=roots[text_no])
+
+    cross = rows.groupby("cluster")["regulation_name"].transform("nunique") >= 2
+    rows = rows[cross].copy()
+    rows["cluster_id"] = pd.factorize(rows["cluster"], sort=True)[0] + 1
+    rows["compare_key"] = rows["text"].map(compare_key)
+
+    # 구성원: (군집, 규정, 조항, 본문)별로 처음/마지막으로 나온 개정일과 스냅샷 수로 요약
+    members = (rows.groupby(["cluster_id", "regulation_name", "ref_no", "text"], sort=True)
+               .agg(article_title=("article_title", "last"), content=("content", "last"),
+                    first_date=("reg_date", "min"), last_date=("reg_date", "max"),
+                    snapshot_count=("reg_date", "nunique"), is_latest=("is_latest", "max"))
+               .reset_index().drop(columns="text"))
+    members["is_latest"] = members["is_latest"].astype(int)
+
+    latest = rows[rows["is_latest"]]
+    per_reg = latest.groupby(["cluster_id", "regulation_name"])["compare_key"].agg(lambda v: tuple(sorted(set(v))))
+    summary = rows.groupby("cluster_id").agg(regulation_count=("regulation_name", "nunique"), member_count=("text", "size"),
+                                             label=("text", "first"))
+    summary["latest_regulations"] = per_reg.groupby("cluster_id").size()
+    summary["latest_variants"] = latest.groupby("cluster_id")["compare_key"].nunique()
+    # 최신본이 남아 있는 규정이 2개 이상이고, 규정별 본문 집합이 서로 다르면 '달라짐'
+    summary["diverged"] = per_reg.groupby("cluster_id").nunique() > 1
+    summary = summary.fillna({"latest_regulations": 0, "latest_variants": 0, "diverged": False})
+    summary = summary.astype({"latest_regulations": int, "latest_variants": int, "diverged": int})
+    summary["label"] = summary["label"].str.slice(0, 80)
+    return summary.reset_index(), members
+
+def init_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS duplicate_clusters (
+            cluster_id INTEGER PRIMARY KEY,
+            regulation_count INTEGER,
+            member_count INTEGER,
+            latest_regulations INTEGER,
+            latest_variants INTEGER,
+            diverged INTEGER,
+            label TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS duplicate_members (
+            cluster_id INTEGER,
+            regulation_name TEXT,
+            ref_no TEXT,
+            article_title TEXT,
+            content TEXT,
+            first_date TEXT,
+            last_date TEXT,
+            snapshot_count INTEGER,
+            is_latest INTEGER
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dup_member_cluster ON duplicate_members(cluster_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dup_member_reg ON duplicate_members(regulation_name, cluster_id)")
+
+def build(db_file=None, threshold=THRESHOLD, log=print):
+    """통합 DB(또는 샤드 전체)를 분석해 결과를 통합 DB(또는 catalog.db)에 저장. 군집 요약 DataFrame 반환"""
+    started = time.perf_counter()
+    use_shards = shards.is_enabled() and db_file is None
+    sources = shards.shard_files() if use_shards else [db_file]
+    conns = [db.get_connection(f) for f in sources]
+    try: rows = read_rows(conns)
+    finally:
+        for conn in conns: conn.close()
+    log(f"행 {len(rows):,}개 읽음 ({time.perf_counter() - started:.1f}s)")
+
+    summary, members = find_clusters(rows, threshold)
+    log(f"규정 간 군집 {len(summary):,}개, 최신본에서 달라진 군집 {int(summary['diverged'].sum()):,}개 "
+        f"({time.perf_counter() - started:.1f}s)")
+
+    conn = shards.connect_catalog() if use_shards else db.get_connection(db_file)
+    try:
+        init_tables(conn)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM duplicate_clusters")
+        cursor.execute("DELETE FROM duplicate_members")
+        summary.to_sql("duplicate_clusters", conn, if_exists="append", index=False)
+        members.to_sql("duplicate_members", conn, if_exists="append", index=False)
+        cursor.executemany("INSERT OR REPLACE INTO db_meta (key, value) VALUES (?, ?)", [
+            ("duplicates_built_at", datetime.now().isoformat(timespec="seconds")),
+            ("duplicates_threshold", str(threshold)),
+        ])
+        db.bump_data_version(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+    return summary
+
+
+# ----------------------------------------------------------------------
+# 3. 조회 (대시보드)
+# ----------------------------------------------------------------------
+def fetch_clusters(conn, reg_name=None, diverged_only=True):
+    """군집 목록 (분석을 한 번도 실행하지 않았으면 None). 최신본 규정 수, 구성원 수 순"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='duplicate_clusters'").fetchone():
+        return None
+    q = "SELECT * FROM duplicate_clusters c WHERE 1=1"
+    p = []
+    if diverged_only: q += " AND diverged = 1"
+    if reg_name:
+        q += " AND EXISTS (SELECT 1 FROM duplicate_members m WHERE m.cluster_id = c.cluster_id AND m.regulation_name = ?)"
+        p.append(reg_name)
+    return db.read_frame(q + " ORDER BY latest_regulations DESC, member_count DESC, cluster_id", conn, params=p)
+
+def fetch_cluster_members(conn, cluster_id):
+    return db.read_frame("""
+        SELECT regulation_name, ref_no, article_title, content, first_date, last_date, snapshot_count, is_latest
+        FROM duplicate_members WHERE cluster_id = ?
+        ORDER BY is_latest DESC, regulation_name, last_date DESC
+    """, conn, params=(cluster_id,))
+
+def fetch_build_info(conn):
+    return dict(conn.execute("SELECT key, value FROM db_meta WHERE key IN ('duplicates_built_at', 'duplicates_threshold')"))
+
+def word_diff(base, other):
+    """두 본문의 어절 단위 차이 [(구분, 어절 문자열)]. 구분은 'equal', 'delete'(base에만), 'insert'(other에만)"""
+    a, b = base.split(), other.split()
+    out = []
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == "equal": out.append(("equal", " ".join(a[i1:i2])))
+        if op in ("delete", "replace"): out.append(("delete", " ".join(a[i1:i2])))
+        if op in ("insert", "replace"): out.append(("insert", " ".join(b[j1:j2])))
+    return out
+
+
+# ----------------------------------------------------------------------
+# 4. CLI
+# ----------------------------------------------------------------------
+def print_report(db_file=None, limit=20):
+    conn = shards.connect_catalog() if shards.is_enabled() and db_file is None else db.get_connection(db_file)
+    try:
+        clusters = fetch_clusters(conn)
+        if clusters is None:
+            print("분석 결과가 없습니다. 'python near_duplicates.py build'를 먼저 실행하세요.")
+            return
+        info = fetch_build_info(conn)
+        print(f"분석 시각: {info.get('duplicates_built_at')}, 기준 유사도: {info.get('duplicates_threshold')}, "
+              f"최신본에서 달라진 군집: {len(clusters):,}개\n")
+        for _, c in clusters.head(limit).iterrows():
+            print(f"[군집 {c['cluster_id']}] 규정 {c['latest_regulations']}개, 최신본 {c['latest_variants']}종: {c['label']}")
+            members = fetch_cluster_members(conn, int(c["cluster_id"]))
+            for _, m in members[members["is_latest"] == 1].iterrows():
+                print(f"    {m['regulation_name']} {m['ref_no']}: {m['content'][:70]}")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="시장 간 유사 조항 군집 분석 (MinHash LSH)")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--db", help=f"분석할 DB (기본: 샤드 구성이 있으면 샤드 전체, 없으면 {db.DB_FILE})")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="같은 군집으로 볼 자카드 유사도 (기본 0.7)")
+    parser.add_argument("--limit", type=int, default=20, help="report에서 출력할 군집 수")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.db, args.threshold)
+    print_report(args.db, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+파싱 결과 캐시 (열 단위 압축 모델 + 바이너리 디스크 캐시)
+파서가 만든 행을 행마다 딕셔너리로 두지 않고 열 단위로 보관하며(ParsedDocument),
+그 결과를 원본 파일 해시 + 파서 버전을 키로 .parse_cache/ 폴더에 저장합니다.
+원본이 바뀌지 않았으면 TXT/HWP 변환과 CSV 적재가 파싱 없이 캐시 파일 1개를 읽고 끝납니다.
+
+    - ParsedDocument: 값이 반복되는 열(구분/장/절/조/항/호/목 등)은 고유 값 목록 + 행별 코드 배열(array 'I'),
+      행마다 다른 열(참조번호/내용 등)은 문자열 목록으로 보관. 같은 값은 문자열 객체 1개를 공유
+    - 캐시 파일: MAGIC + zlib(본문 길이 + JSON 본문(열 이름, 고유 값, 문자열 목록) + 코드 배열 바이트)
+    - 키: "<원본 sha256>.<종류>-<버전>.bin". 파서 코드가 바뀌어 버전이 달라지면 새 키로 다시 파싱
+
+환경 변수 REG_PARSE_CACHE로 캐시 폴더를 바꾸거나, 0/off로 끕니다.
+
+사용 예:
+    python parse_cache.py stats      # 캐시 파일 수와 크기
+    python parse_cache.py clear      # 캐시 삭제
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+from array import array
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get("REG_PARSE_CACHE", ".parse_cache")
+MAGIC = b"RPC1"
+_DISABLED = ("", "0", "off")
+_LEN = struct.Struct("<I")
+
+
+# ----------------------------------------------------------------------
+# 1. 열 단위 압축 모델
+# ----------------------------------------------------------------------
+class ParsedDocument:
+    """파싱 결과 (열 단위). plain에 없는 열은 고유 값 목록 + 코드 배열로 보관"""
+
+    __slots__ = ("columns", "plain", "n_rows", "_values", "_codes", "_index", "_cells")
+
+    def __init__(self, columns, plain=()):
+        self.columns = list(columns)
+        self.plain = [c for c in self.columns if c in plain]
+        self.n_rows = 0
+        self._values = {c: [] for c in self.columns if c not in plain}
+        self._codes = {c: array("I") for c in self._values}
+        self._index = {c: {} for c in self._values}
+        self._cells = {c: [] for c in self.plain}
+
+    def __len__(self):
+        return self.n_rows
+
+    def append(self, row):
+        """row: columns 순서의 값 튜플"""
+        for col, value in zip(self.columns, row):
+            cells = self._cells.get(col)
+            if cells is not None:
+                cells.append(value)
+                continue
+            index = self._index[col]
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(self._values[col])
+                self._values[col].append(value)
+            self._codes[col].append(code)
+        self.n_rows += 1
+
+    def column(self, col):
+        cells = self._cells.get(col)
+        if cells is not None: return cells
+        return list(map(self._values[col].__getitem__, self._codes[col]))
+
+    def rows(self):
+        return zip(*(self.column(c) for c in self.columns))
+
+    def to_frame(self):
+        return pd.DataFrame({c: self.column(c) for c in self.columns}, columns=self.columns)
+
+    # --- 직렬화 ---
+    def to_bytes(self):
+        encoded = [c for c in self.columns if c in self._values]
+        body = json.dumps({"columns": self.columns, "plain": self.plain, "n_rows": self.n_rows,
+                           "values": [self._values[c] for c in encoded],
+                           "cells": [self._cells[c] for c in self.plain]},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        codes = b"".join(self._codes[c].tobytes() for c in encoded)
+        return MAGIC + zlib.compress(_LEN.pack(len(body)) + body + codes, 1)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:len(MAGIC)] != MAGIC: raise ValueError("캐시 파일 형식이 아닙니다.")
+        payload = zlib.decompress(data[len(MAGIC):])
+        (body_len,) = _LEN.unpack_from(payload)
+        meta = json.loads(payload[_LEN.size:_LEN.size + body_len].decode("utf-8"))
+        doc = cls(meta["columns"], meta["plain"])
+        doc.n_rows = meta["n_rows"]
+        offset = _LEN.size + body_len
+        for col, values in zip(doc._values, meta["values"]):
+            codes = array("I")
+            codes.frombytes(payload[offset:offset + doc.n_rows * codes.itemsize])
+            offset += doc.n_rows * codes.itemsize
+            doc._values[col], doc._codes[col] = values, codes
+        doc._cells = dict(zip(doc.plain, meta["cells"]))
+        # 불러온 문서는 읽기 전용으로 쓰므로 append용 색인은 만들지 않음
+        doc._index = None
+        return doc
+
+
+# ----------------------------------------------------------------------
+# 2. 디스크 캐시
+# ----------------------------------------------------------------------
+def enabled():
+    return CACHE_DIR.lower() not in _DISABLED
+
+def cache_path(kind, source_hash, version):
+    return Path(CACHE_DIR) / f"{source_hash}.{kind}-{version}.bin"
+
+def load(kind, source_hash, version):
+    """캐시에 있으면 ParsedDocument, 없거나 읽을 수 없으면 None"""
+    if not enabled() or not source_hash: return None
+    try:
+        return ParsedDocument.from_bytes(cache_path(kind, source_hash, version).read_bytes())
+    except (OSError, ValueError, KeyError, zlib.error, struct.error):
+        return None
+
+def store(kind, source_hash, version, doc):
+    """임시 파일에 쓴 뒤 교체. 캐시는 보조 수단이므로 쓰기 실패는 무시"""
+    if not enabled() or not source_hash: return
+    path = cache_path(kind, source_hash, version)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(doc.to_bytes())
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path.exists(): tmp_path.unlink()
+
+def cache_files():
+    return sorted(Path(CACHE_DIR).glob("*.bin")) if enabled() else []
+
+
+# ----------------------------------------------------------------------
+# 3. CLI
+# ----------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="파싱 결과 캐시 관리")
+    parser.add_argument("command", choices=["stats", "clear"], help="stats: 캐시 현황, clear: 캐시 삭제")
+    args = parser.parse_args()
+
+    files = cache_files()
+    if args.command == "stats":
+        kinds = {}
+        for p in files:
+            kind = p.name.split(".")[1].split("-")[0]
+            count, size = kinds.get(kind, (0, 0))
+            kinds[kind] = (count + 1, size + p.stat().st_size)
+        print(f"캐시 폴더: {CACHE_DIR} ({'사용' if enabled() else '꺼짐'})")
+        for kind, (count, size) in sorted(kinds.items()):
+            print(f"  {kind}: {count}개, {size / 1e6:.1f} MB")
+    else:
+        for p in files: p.unlink()
+        print(f"캐시 파일 {len(files)}개를 삭제했습니다.")
+
+
+if __name__ == "__main__":
+    main()
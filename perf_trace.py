@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+단계별 실행 시간 측정 모듈
+파일 읽기, 파싱, CSV 저장, DB 적재 배치, SQL 쿼리, DataFrame 생성 등 각 단계를 span으로 감싸
+요청(Streamlit 재실행 1회 또는 CLI 작업 1건) 단위로 모읍니다.
+완료된 요청은 JSON Lines 로그(perf_trace.jsonl)에 기록되고, 최근 N건과 느린 쿼리 샘플은
+메모리에 보관되어 사이드바 "성능" 패널에서 볼 수 있습니다.
+
+측정은 환경 변수 REG_PERF_TRACE=1 또는 enable(True)로 켭니다.
+꺼져 있을 때 span()은 공유 no-op 객체를 돌려주므로 오버헤드는 함수 호출 1회 수준입니다.
+
+요청 기록은 스레드별(threading.local)이므로, 작업 스레드(샤드 fan-out, 인용 분석 등)에 넘기는 함수는
+wrap()으로 감싸 호출한 요청과 span에 이어 붙입니다. 병렬로 실행된 span의 시간 합은 호출한 쪽의 실제 경과 시간보다
+클 수 있으므로, 부모의 자기 시간(self_ms)과 렌더링 시간은 0 아래로 내려가지 않게 함
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+LOG_FILE = os.environ.get("REG_PERF_LOG", "perf_trace.jsonl")
+MAX_REQUESTS = 20
+MAX_SLOW_QUERIES = 20
+SLOW_QUERY_MS = 200.0
+
+_enabled = os.environ.get("REG_PERF_TRACE", "") not in ("", "0")
+_local = threading.local()
+_lock = threading.Lock()
+_recent = deque(maxlen=MAX_REQUESTS)
+_slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+def is_enabled():
+    return _enabled
+
+
+# ----------------------------------------------------------------------
+# 1. span
+# ----------------------------------------------------------------------
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, **attrs): pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("stage", "attrs", "start", "child_ms", "parent", "record")
+
+    def __init__(self, stage, attrs):
+        self.stage = stage
+        self.attrs = attrs
+        self.child_ms = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.record = getattr(_local, "request", None)
+        self.parent = getattr(_local, "span", None)
+        _local.span = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        _local.span = self.parent
+        # 부모가 다른 스레드(wrap)에 있을 수 있으므로 잠금 안에서 더함
+        with _lock:
+            if self.parent is not None: self.parent.child_ms += ms
+            elif self.record is not None: self.record["_child_ms"] += ms
+
+        attrs = self.attrs
+        if "sql" in attrs:
+            attrs["sql"] = " ".join(attrs["sql"].split())[:300]
+        if "params" in attrs:
+            attrs["params"] = [str(p)[:50] for p in attrs["params"]]
+        entry = {"stage": self.stage, "ms": round(ms, 3), "self_ms": round(max(ms - self.child_ms, 0.0), 3),
+                 "depth": _depth(self.parent), **attrs}
+        if self.record is not None:
+            self.record["spans"].append(entry)
+        if self.stage == "sql" and ms >= SLOW_QUERY_MS:
+            with _lock:
+                _slow_queries.append({"ts": _now(), "ms": round(ms, 1), **attrs})
+        return False
+
+def _depth(parent):
+    depth = 0
+    while parent is not None:
+        depth += 1
+        parent = parent.parent
+    return depth
+
+def _now():
+    return datetime.now().isoformat(timespec="milliseconds")
+
+def span(stage, **attrs):
+    """with perf_trace.span("sql", sql=...): 형태로 단계 시간을 측정"""
+    if not _enabled: return _NULL_SPAN
+    return _Span(stage, attrs)
+
+
+# ----------------------------------------------------------------------
+# 2. 요청 단위 수집
+# ----------------------------------------------------------------------
+def begin_request(name, **attrs):
+    """현재 스레드(= Streamlit 세션 실행)의 요청 기록 시작. 끝나지 않은 이전 기록은 버림"""
+    _local.span = None
+    if not _enabled:
+        _local.request = None
+        return
+    _local.request = {"ts": _now(), "request": name, "_start": time.perf_counter(), "_child_ms": 0.0, "spans": [], **attrs}
+
+def annotate(**attrs):
+    """진행 중인 요청 기록에 속성 추가 (예: 선택된 메뉴 이름)"""
+    record = getattr(_local, "request", None)
+    if record is not None: record.update(attrs)
+
+def end_request():
+    record = getattr(_local, "request", None)
+    _local.request = None
+    if record is None: return None
+
+    total_ms = (time.perf_counter() - record.pop("_start")) * 1000
+    record["total_ms"] = round(total_ms, 3)
+    # 어떤 span에도 속하지 않은 시간 = 위젯 생성 및 화면 렌더링
+    record["render_ms"] = round(max(total_ms - record.pop("_child_ms"), 0.0), 3)
+    with _lock:
+        _recent.append(record)
+        try:
+            with open(LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+    return record
+
+class attach:
+    """작업 스레드에서 with perf_trace.attach(record, parent): 로 다른 스레드의 요청 기록과 span에 이어서 측정
+    (record, parent는 호출한 스레드에서 current()로 얻음). 끝나면 작업 스레드의 이전 상태로 되돌림"""
+    def __init__(self, record, parent=None):
+        self.record = record
+        self.parent = parent
+    def __enter__(self):
+        self.saved = (getattr(_local, "request", None), getattr(_local, "span", None))
+        _local.request, _local.span = self.record, self.parent
+        return self
+    def __exit__(self, *exc):
+        _local.request, _local.span = self.saved
+        return False
+
+def current():
+    """현재 스레드의 (요청 기록, 열린 span). 작업 스레드에 넘겨 attach()에 사용"""
+    return getattr(_local, "request", None), getattr(_local, "span", None)
+
+def wrap(fn):
+    """fn을 작업 스레드에서 실행해도 지금 요청과 span 아래에 기록되도록 감쌈 (측정 중이 아니면 fn 그대로)"""
+    record, parent = current()
+    if record is None: return fn
+    def traced(*args, **kwargs):
+        with attach(record, parent): return fn(*args, **kwargs)
+    return traced
+
+class request:
+    """CLI 작업 등에서 with perf_trace.request("load_files"): 로 요청 단위를 지정"""
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+    def __enter__(self):
+        begin_request(self.name, **self.attrs)
+        return self
+    def __exit__(self, *exc):
+        self.record = end_request()
+        return False
+
+
+# ----------------------------------------------------------------------
+# 3. 패널용 조회
+# ----------------------------------------------------------------------
+def recent_requests():
+    with _lock: return list(_recent)
+
+def slow_queries():
+    with _lock: return list(_slow_queries)
+
+def stage_breakdown(record):
+    """요청 1건의 단계별 자기 시간(self_ms) 합계. 렌더링 시간은 'render'로 포함"""
+    totals = {}
+    for s in record["spans"]:
+        totals[s["stage"]] = totals.get(s["stage"], 0.0) + s["self_ms"]
+    totals["render"] = record["render_ms"]
+    return totals
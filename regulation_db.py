@@ -0,0 +1,810 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+규정 DB 모듈
+SQLite 스키마 생성, '규정' 폴더 중간 파일(Parquet/CSV) 적재, 메뉴별 조회 쿼리를 모아 둔 모듈입니다.
+Streamlit에 의존하지 않으므로 app.py 외에 벤치마크 등 CLI 스크립트에서도 그대로 사용합니다.
+(조회 함수는 모두 sqlite3 connection을 첫 인자로 받습니다.)
+"""
+
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import glossary
+import impact_report
+import parse_cache
+import perf_trace as perf
+import similarity
+import text_index
+from parse_cache import ParsedDocument
+
+# =========================================================
+# 1. 설정 및 상수 정의
+# =========================================================
+# 환경 변수 REG_DB_FILE로 다른 DB 파일을 쓸 수 있음 (부하 테스트 등에서 복사본 사용)
+DB_FILE = os.environ.get("REG_DB_FILE", "regulation_master.db")
+# 배포용 읽기 전용 DB (release_db.py build로 생성). 파일이 있으면 대시보드가 이 파일을 읽기 전용으로 엶
+RELEASE_DB_FILE = os.environ.get("REG_RELEASE_DB", "regulation_release.db")
+# 쓰기 잠금 대기 시간(초). 데몬(watch_folder)과 사이드바 DB 업데이트가 같은 DB에 쓸 수 있고, 전체 적재의
+# 교체 트랜잭션은 수 초 동안 잠금을 잡으므로 sqlite 기본값(5초)보다 넉넉하게 기다림 (WAL이라 읽기는 막히지 않음)
+BUSY_TIMEOUT_SEC = float(os.environ.get("REG_DB_BUSY_TIMEOUT_SEC", "120"))
+# 배포용 DB를 열 때 메모리 매핑할 최대 크기 (파일 전체가 들어가도록 넉넉하게)
+RELEASE_MMAP_BYTES = 1 << 30
+
+# 엑셀 내보내기에서 제외할 파생 테이블 (압축된 바이너리라 시트로 보면 의미가 없음)
+EXPORT_SKIP_TABLES = {"similarity_vectors", "text_postings"}
+DATA_DIR = "규정"
+
+PREFERRED_REG_NAME = "유가증권시장 업무규정"
+DEFAULT_ART_NO = "제20조의2"
+
+# CSV 계층 컬럼 -> DB 컬럼 매핑 (구분/장/절)
+HIERARCHY_COLUMNS = {
+    "구분": "level",
+    "장번호": "chapter_no",
+    "장명": "chapter_title",
+    "절번호": "section_no",
+    "절명": "section_title",
+}
+
+# CSV 읽기 결과(read_csv_rows) 캐시의 열과 버전. 행 변환 규칙(generate_key, cell_text 등)을 바꾸면 버전을 올림
+CSV_ROW_COLUMNS = ["unique_key", "참조번호", "조명", "내용", *HIERARCHY_COLUMNS]
+CSV_CACHE_VERSION = f"2.pd{pd.__version__}"
+# 적재할 중간 파일 확장자. 같은 이름의 파일이 둘 다 있으면 앞의 것(Parquet)을 읽음
+DATA_SUFFIXES = (".parquet", ".csv")
+# unique_key 표기 버전 (db_meta). 1: pandas가 추측한 값 그대로('1.0', 'nan'), 2: 원래 문자열('1', '')
+UNIQUE_KEY_FORMAT = "2"
+
+# 키워드 검색 결과 패싯(좁히기) 항목: (패싯 키, 표시명)
+SEARCH_FACETS = [
+    ("regulation_name", "규정"),
+    ("reg_date", "개정일"),
+    ("chapter", "장"),
+    ("level", "구분"),
+]
+LEVEL_ORDER = ["조", "항", "호", "목"]
+
+# 스냅샷 교체용 임시(staging) 테이블. 연결마다 따로 있는 temp DB에 만들어 본 DB를 잠그지 않고 행을 준비함
+HISTORY_COLUMNS = ["regulation_name", "reg_date", "unique_key", "ref_no", "article_title", "content", *HIERARCHY_COLUMNS.values()]
+STAGING_TABLE_SQL = f"CREATE TEMP TABLE IF NOT EXISTS staging_history ({', '.join(HISTORY_COLUMNS)})"
+# 준비된 스냅샷을 원문 순서(rowid) 그대로 옮김. 한 파일 안에서 키가 겹치면 첫 행을 남김
+SWAP_HISTORY_SQL = f'''
+    INSERT INTO regulation_history ({", ".join(HISTORY_COLUMNS)})
+    SELECT {", ".join(HISTORY_COLUMNS)} FROM temp.staging_history
+    WHERE regulation_name=? AND reg_date=? ORDER BY rowid
+    ON CONFLICT(regulation_name, reg_date, unique_key) DO NOTHING
+'''
+# 스냅샷(규정명, 개정일)별 행을 가진 테이블. 스냅샷을 삭제할 때 함께 지움 (최신 스냅샷 파생 테이블은 update_derived가 정리)
+SNAPSHOT_TABLES = ("regulation_history", "regulation_toc", "glossary_terms", "regulation_catalog")
+
+LATEST_SNAPSHOTS_SQL = """
+    SELECT regulation_name, MAX(reg_date)
+    FROM regulation_catalog
+    GROUP BY regulation_name
+"""
+
+# 전체 개정본 검색 결과(hits)에서 같은 (규정, unique_key, 본문) 행이 연속된 개정본에 나온 구간을 하나로 묶음.
+# 구간은 규정의 개정본 순번(seq)에서 같은 본문 안의 순번을 뺀 값(island)이 같은 행들로, 본문이 바뀌었다가
+# 다시 돌아오면(A→B→A) 다른 구간이 됨. 구간의 마지막 개정본 행을 남기고 처음 개정일, 개정본 수,
+# 그 다음 개정일(이 본문이 바뀌거나 빠진 개정일)을 붙임
+COLLAPSE_HITS_SQL = """
+    CREATE TEMP TABLE hit_groups AS
+    WITH seq AS (
+        SELECT regulation_name, reg_date, ROW_NUMBER() OVER (PARTITION BY regulation_name ORDER BY reg_date) AS seq
+        FROM regulation_catalog
+    ), islands AS (
+        SELECT h.*, s.seq - ROW_NUMBER() OVER (PARTITION BY h.regulation_name, h.unique_key, h.content ORDER BY h.reg_date) AS island
+        FROM hits h JOIN seq s ON s.regulation_name = h.regulation_name AND s.reg_date = h.reg_date
+    )
+    SELECT g.id, g.regulation_name, g.reg_date, g.ref_no, g.article_title, g.content, g.level, g.chapter,
+           g.first_date, g.snapshots,
+           (SELECT MIN(c.reg_date) FROM regulation_catalog c
+            WHERE c.regulation_name = g.regulation_name AND c.reg_date > g.reg_date) AS next_date
+    FROM (
+        SELECT i.*, MIN(reg_date) OVER w AS first_date, COUNT(*) OVER w AS snapshots,
+               ROW_NUMBER() OVER (PARTITION BY regulation_name, unique_key, content, island ORDER BY reg_date DESC) AS rn
+        FROM islands i
+        WINDOW w AS (PARTITION BY regulation_name, unique_key, content, island)
+    ) g
+    WHERE g.rn = 1
+"""
+
+RULE_SUFFIX = "시행세칙"
+# 인용 분석 종류 (표시 순서). 종류마다 따로 조회하므로 대시보드는 각각 다른 연결에서 동시에 실행함
+CITATION_KINDS = ("internal", "partner", "external")
+# 인용 분석 시간 제한을 확인할 SQLite 가상 머신 명령 간격
+CITATION_PROGRESS_STEPS = 10000
+
+# regulation_catalog 컬럼 (샤드 카탈로그 동기화 등에서 같은 순서로 사용)
+CATALOG_COLUMNS = ["regulation_name", "reg_date", "row_count", "article_count", "source_file", "source_hash",
+                   "ingested_at", "is_rule", "partner_name"]
+
+
+# =========================================================
+# 2. 연결 및 스키마
+# =========================================================
+def get_connection(db_file=None):
+    conn = sqlite3.connect(db_file or DB_FILE, timeout=BUSY_TIMEOUT_SEC, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    return conn
+
+def is_locked_error(e):
+    """다른 프로세스가 쓰기 잠금을 놓지 않아 대기 시간이 지난 오류 (나중에 다시 시도하면 되는 오류)"""
+    return isinstance(e, sqlite3.OperationalError) and "locked" in str(e)
+
+def get_readonly_connection(db_file=None):
+    """배포용 DB 연결. 바뀌지 않는 파일(immutable)로 열어 잠금과 WAL 확인을 생략하고 mmap으로 읽음
+    (파일을 교체할 때는 덮어쓰지 말고 새 파일을 rename해야 열려 있는 연결이 깨지지 않음)"""
+    uri = Path(db_file or RELEASE_DB_FILE).resolve().as_uri() + "?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size={RELEASE_MMAP_BYTES};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    return conn
+
+def init_db(db_file=None):
+    conn = get_connection(db_file)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            regulation_name TEXT,
+            reg_date TEXT,
+            unique_key TEXT,
+            ref_no TEXT,
+            article_title TEXT,
+            content TEXT,
+            level TEXT,
+            chapter_no TEXT,
+            chapter_title TEXT,
+            section_no TEXT,
+            section_title TEXT,
+            UNIQUE(regulation_name, reg_date, unique_key)
+        )
+    ''')
+
+    # 구버전 DB에는 계층(구분/장/절) 컬럼이 없으므로 누락된 컬럼만 추가
+    existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(regulation_history)")}
+    for col in HIERARCHY_COLUMNS.values():
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE regulation_history ADD COLUMN {col} TEXT")
+
+    # 스냅샷(규정명, 개정일)별 목차: 장/절 단위로 첫 조항, 마지막 조항, 행 수를 보관
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_toc (
+            regulation_name TEXT,
+            reg_date TEXT,
+            chapter_no TEXT,
+            chapter_title TEXT,
+            section_no TEXT,
+            section_title TEXT,
+            first_id INTEGER,
+            first_ref TEXT,
+            last_ref TEXT,
+            row_count INTEGER,
+            PRIMARY KEY(regulation_name, reg_date, chapter_no, chapter_title, section_no, section_title)
+        )
+    ''')
+
+    # 데이터 버전 등 DB 메타 정보. 적재가 끝날 때마다 data_version을 올려 조회 캐시를 무효화함
+    cursor.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value TEXT)")
+    migrate_unique_keys(cursor)
+
+    # 스냅샷(규정명, 개정일) 카탈로그: 적재할 때 함께 갱신하며, 메뉴 목록과 증분 적재 판단은
+    # regulation_history 전체를 훑지 않고 이 테이블(스냅샷 수만큼의 행)만 읽음
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_catalog (
+            regulation_name TEXT,
+            reg_date TEXT,
+            row_count INTEGER,
+            article_count INTEGER,
+            source_file TEXT,
+            source_hash TEXT,
+            ingested_at TEXT,
+            is_rule INTEGER,
+            partner_name TEXT,
+            PRIMARY KEY(regulation_name, reg_date)
+        )
+    ''')
+    if cursor.execute("SELECT 1 FROM regulation_catalog LIMIT 1").fetchone() is None:
+        backfill_catalog(cursor)
+
+    # 유사 조항 검색용 최신 스냅샷 벡터 (similarity.py). 행별 n-gram 빈도를 CSR 배열로 압축해 스냅샷당 1행으로 보관
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS similarity_vectors (
+            regulation_name TEXT,
+            reg_date TEXT,
+            row_count INTEGER,
+            first_id INTEGER,
+            row_ids BLOB,
+            indptr BLOB,
+            features BLOB,
+            counts BLOB,
+            PRIMARY KEY(regulation_name, reg_date)
+        )
+    ''')
+    if cursor.execute("SELECT 1 FROM similarity_vectors LIMIT 1").fetchone() is None:
+        similarity.update_vectors(cursor)
+
+    # 고급 검색용 최신 스냅샷 본문 위치 역색인 (text_index.py). 음절 2-gram별 위치 배열을 압축해 스냅샷당 1행으로 보관
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_postings (
+            regulation_name TEXT,
+            reg_date TEXT,
+            row_count INTEGER,
+            first_id INTEGER,
+            row_ids BLOB,
+            gram_keys BLOB,
+            gram_counts BLOB,
+            positions BLOB,
+            PRIMARY KEY(regulation_name, reg_date)
+        )
+    ''')
+    if cursor.execute("SELECT 1 FROM text_postings LIMIT 1").fetchone() is None:
+        text_index.update_postings(cursor)
+
+    # 정의 용어 사전 (glossary.py). 목차처럼 모든 스냅샷에 대해 용어, 정의 행, 사용 조항 수를 보관
+    glossary.init_tables(cursor)
+    if cursor.execute("SELECT 1 FROM glossary_terms LIMIT 1").fetchone() is None:
+        glossary.update_glossary(cursor)
+
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_reg_name ON regulation_history(regulation_name);",
+        "CREATE INDEX IF NOT EXISTS idx_reg_date ON regulation_history(reg_date);",
+        "CREATE INDEX IF NOT EXISTS idx_ref_no ON regulation_history(ref_no);",
+        "CREATE INDEX IF NOT EXISTS idx_name_date ON regulation_history(regulation_name, reg_date);",
+        "CREATE INDEX IF NOT EXISTS idx_name_date_chapter ON regulation_history(regulation_name, reg_date, chapter_no, section_no);"
+    ]
+    for idx_sql in indexes: cursor.execute(idx_sql)
+    conn.commit()
+    conn.close()
+
+def get_data_version(conn):
+    """적재가 끝날 때마다 1씩 증가하는 데이터 버전 (테이블이 없으면 0)"""
+    try:
+        row = conn.execute("SELECT value FROM db_meta WHERE key='data_version'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0]) if row else 0
+
+def _key_part(part):
+    """구버전 unique_key 조각을 원래 문자열로: 'nan' -> '', '1.0' -> '1'"""
+    if part == "nan": return ""
+    if part.endswith(".0") and part[:-2].isdigit(): return part[:-2]
+    return part
+
+def migrate_unique_keys(cursor):
+    """pandas가 추측한 자료형 그대로 만든 구버전 unique_key('1.0_제1조_①_0_0', 'nan_제1조_0_0_0')를
+    generate_key의 표기('1_제1조_①_0_0', '_제1조_0_0_0')로 한 번 고침. 같은 조항의 키가 개정본마다 달라지지 않도록 함"""
+    row = cursor.execute("SELECT value FROM db_meta WHERE key='unique_key_format'").fetchone()
+    if row and row[0] == UNIQUE_KEY_FORMAT: return
+    updates = []
+    for row_id, key in cursor.execute("SELECT id, unique_key FROM regulation_history"):
+        fixed = "_".join(_key_part(part) for part in (key or "").split("_"))
+        if key is not None and fixed != key: updates.append((fixed, row_id))
+    cursor.executemany("UPDATE regulation_history SET unique_key=? WHERE id=?", updates)
+    cursor.execute("INSERT OR REPLACE INTO db_meta (key, value) VALUES ('unique_key_format', ?)", (UNIQUE_KEY_FORMAT,))
+    if updates: bump_data_version(cursor)
+
+def bump_data_version(cursor):
+    cursor.execute('''
+        INSERT INTO db_meta (key, value) VALUES ('data_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    ''')
+
+
+# =========================================================
+# 3. 중간 파일(Parquet/CSV) 적재
+# =========================================================
+def parse_filename_info(filename):
+    base_name = os.path.basename(filename)
+    name_without_ext = os.path.splitext(base_name)[0]
+
+    # Mac(NFD)과 Windows(NFC)의 한글 인코딩 차이를 NFC(결합형)로 통일
+    name_without_ext = unicodedata.normalize('NFC', name_without_ext)
+
+    date_match = re.search(r'(\d{8})', name_without_ext)
+    reg_date = date_match.group(1) if date_match else None
+
+    if '_전문_' in name_without_ext:
+        reg_name = name_without_ext.split('_전문_')[0]
+    elif reg_date:
+        reg_name = name_without_ext.replace(reg_date, '').strip('_')
+    else:
+        reg_name = name_without_ext
+    return reg_name, reg_date
+
+def generate_key(row):
+    return "_".join(cell_text(row[col]) for col in ("장번호", "조", "항", "호", "목"))
+
+def cell_text(value):
+    """pd.read_csv가 NaN/float(1.0)으로 읽은 계층 값을 원래 문자열로 되돌림"""
+    if value is None or pd.isna(value): return ""
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value)
+
+def rebuild_toc(cursor, reg_name, reg_date):
+    cursor.execute("DELETE FROM regulation_toc WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    cursor.execute('''
+        INSERT INTO regulation_toc
+        (regulation_name, reg_date, chapter_no, chapter_title, section_no, section_title, first_id, first_ref, last_ref, row_count)
+        SELECT g.regulation_name, g.reg_date, g.chapter_no, g.chapter_title, g.section_no, g.section_title, g.first_id,
+               (SELECT ref_no FROM regulation_history WHERE id = g.first_id),
+               (SELECT ref_no FROM regulation_history WHERE id = g.last_id),
+               g.row_count
+        FROM (
+            SELECT regulation_name, reg_date, chapter_no, chapter_title, section_no, section_title,
+                   MIN(id) AS first_id, MAX(id) AS last_id, COUNT(*) AS row_count
+            FROM regulation_history
+            WHERE regulation_name=? AND reg_date=?
+            GROUP BY chapter_no, chapter_title, section_no, section_title
+        ) g
+    ''', (reg_name, reg_date))
+
+def partner_regulation(reg_name):
+    """(시행세칙 여부, 짝이 되는 규정/시행세칙 이름). 예: 'A 시행세칙' <-> 'A'"""
+    is_rule = RULE_SUFFIX in reg_name
+    if is_rule: return True, reg_name.replace(f" {RULE_SUFFIX}", "").replace(RULE_SUFFIX, "").strip()
+    return False, f"{reg_name} {RULE_SUFFIX}"
+
+def file_sha256(filepath):
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def count_articles(unique_keys):
+    """행 순서대로 (장번호, 조)가 바뀌는 지점의 수. 부칙처럼 같은 조 번호가 다시 나와도 별도 조로 셈"""
+    count, prev = 0, None
+    for key in unique_keys:
+        article = tuple(key.split("_")[:2])
+        if article[1] not in ("", "nan") and article != prev: count += 1
+        prev = article
+    return count
+
+def update_catalog(cursor, reg_name, reg_date, source_file=None, source_hash=None):
+    """적재된 행에서 스냅샷의 행 수, 조 수를 다시 세어 카탈로그에 기록"""
+    keys = [k for (k,) in cursor.execute(
+        "SELECT unique_key FROM regulation_history WHERE regulation_name=? AND reg_date=? ORDER BY id", (reg_name, reg_date))]
+    is_rule, partner_name = partner_regulation(reg_name)
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO regulation_catalog ({", ".join(CATALOG_COLUMNS)})
+        VALUES ({", ".join("?" * len(CATALOG_COLUMNS))})
+    ''', (reg_name, reg_date, len(keys), count_articles(keys), source_file, source_hash,
+          datetime.now().isoformat(timespec="seconds"), int(is_rule), partner_name))
+
+def backfill_catalog(cursor):
+    """카탈로그가 생기기 전의 DB: 이미 적재된 스냅샷으로 카탈로그를 채움 (원본 해시는 알 수 없으므로 NULL)"""
+    snapshots = cursor.execute("SELECT DISTINCT regulation_name, reg_date FROM regulation_history").fetchall()
+    for reg_name, reg_date in snapshots:
+        update_catalog(cursor, reg_name, reg_date)
+
+def _row_value(value):
+    """캐시에 담을 값: NaN은 None(DB에서 NULL), 나머지는 문자열 (TEXT 컬럼에 저장되는 값과 같음)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)): return None
+    return str(value)
+
+def read_csv_rows(filepath, reg_name, reg_date, src_hash=None):
+    """CSV 1개를 적재할 행(HISTORY_COLUMNS 순서의 튜플) 목록으로 변환
+    같은 CSV(해시)를 읽은 결과가 파싱 캐시에 있으면 pandas로 다시 읽지 않음"""
+    with perf.span("csv_read", file=os.path.basename(filepath)):
+        src_hash = src_hash or (file_sha256(filepath) if parse_cache.enabled() else None)
+        doc = parse_cache.load("csv", src_hash, CSV_CACHE_VERSION)
+        if doc is None:
+            df = pd.read_csv(filepath)
+            df['unique_key'] = df.apply(generate_key, axis=1)
+
+            doc = ParsedDocument(CSV_ROW_COLUMNS, plain=("unique_key", "참조번호", "내용"))
+            for _, row in df.iterrows():
+                doc.append((
+                    row['unique_key'], _row_value(row.get('참조번호', '')), _row_value(row.get('조명', '')),
+                    str(row.get('내용', '')), *(cell_text(row.get(col)) for col in HIERARCHY_COLUMNS)
+                ))
+            parse_cache.store("csv", src_hash, CSV_CACHE_VERSION, doc)
+        rows = [(reg_name, reg_date, *row) for row in doc.rows()]
+    return rows
+
+def read_parquet_rows(filepath, reg_name, reg_date):
+    """Parquet 1개(regulation_parquet)를 적재할 행(HISTORY_COLUMNS 순서의 튜플) 목록으로 변환
+    모든 열이 문자열로 저장되어 있으므로 자료형 보정 없이 열 단위로 읽어 그대로 묶음"""
+    import regulation_parquet   # pyarrow는 Parquet을 적재할 때만 임포트 (대시보드 시작 시간에 포함하지 않음)
+    with perf.span("parquet_read", file=os.path.basename(filepath)):
+        cols = regulation_parquet.read_columns(filepath)
+        keys = ["_".join(parts) for parts in zip(cols["장번호"], cols["조"], cols["항"], cols["호"], cols["목"])]
+        rows = [(reg_name, reg_date, key, ref_no or None, title or None, *rest) for key, ref_no, title, *rest in
+                zip(keys, cols["참조번호"], cols["조명"], cols["내용"], *(cols[col] for col in HIERARCHY_COLUMNS))]
+    return rows
+
+def read_rows(filepath, reg_name, reg_date, src_hash=None):
+    """중간 파일(Parquet/CSV) 1개를 적재할 행 목록으로 변환"""
+    if filepath.lower().endswith(".parquet"): return read_parquet_rows(filepath, reg_name, reg_date)
+    return read_csv_rows(filepath, reg_name, reg_date, src_hash)
+
+def data_files(data_dir):
+    """폴더의 적재 대상 파일. 같은 스냅샷의 Parquet과 CSV가 함께 있으면 Parquet만 (CSV는 내보내기/구버전 파일)"""
+    by_stem = {}
+    for name in sorted(os.listdir(data_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in DATA_SUFFIXES: continue
+        prev = by_stem.get(stem)
+        if prev is None or DATA_SUFFIXES.index(ext.lower()) < DATA_SUFFIXES.index(os.path.splitext(prev)[1].lower()):
+            by_stem[stem] = name
+    return [os.path.join(data_dir, name) for name in sorted(by_stem.values())]
+
+def fetch_loaded_snapshots(conn):
+    """카탈로그의 스냅샷 {(규정명, 개정일): 원본 파일 해시}. 카탈로그 도입 전에 적재된 스냅샷의 해시는 None"""
+    return {(name, date): src_hash for name, date, src_hash in
+            conn.execute("SELECT regulation_name, reg_date, source_hash FROM regulation_catalog")}
+
+def has_legacy_rows(conn, reg_name, reg_date):
+    """계층(구분/장/절) 컬럼이 비어 있는 구버전 행이 남아 있는지"""
+    return conn.execute("SELECT 1 FROM regulation_history WHERE regulation_name=? AND reg_date=? AND level IS NULL LIMIT 1",
+                        (reg_name, reg_date)).fetchone() is not None
+
+def load_files(data_dir=None, db_file=None, progress=None):
+    """'규정' 폴더의 Parquet/CSV 중 아직 적재되지 않은 스냅샷만 적재. progress(비율, 메시지) 콜백으로 진행률 보고"""
+    data_dir = data_dir or DATA_DIR
+    init_db(db_file)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        return -1, 0
+    return load_csv_paths(data_files(data_dir), db_file, progress)
+
+def update_impact_reports(cursor):
+    """새로 최신이 된 스냅샷의 개정 영향 보고서 생성 (적재 트랜잭션 안에서 호출)"""
+    with perf.span("impact_report_build"):
+        impact_report.update_reports([cursor], cursor)
+
+def load_csv_paths(files, db_file=None, progress=None, impact=True):
+    """지정한 중간 파일(Parquet/CSV) 중 카탈로그에 없거나 원본이 바뀐 스냅샷만 적재. (적재 수, 건너뜀 수) 반환
+    바뀐 파일은 먼저 임시 테이블에 읽어 두고(stage_snapshot), 교체는 마지막에 한 트랜잭션으로 처리함(swap_staged)
+    (impact=False: 개정 영향 보고서를 만들지 않음. 샤드 적재는 모든 샤드를 적재한 뒤 카탈로그 DB에 따로 만듦)"""
+    init_db(db_file)
+    conn = get_connection(db_file)
+    try:
+        catalog = fetch_loaded_snapshots(conn)
+        count = skipped = 0
+        staged, known_hashes = [], []
+
+        for idx, filepath in enumerate(files):
+            if progress: progress(idx / len(files), os.path.basename(filepath))
+            reg_name, reg_date = parse_filename_info(filepath)
+            if not reg_date: continue
+
+            # 카탈로그에 같은 원본(해시)으로 적재된 스냅샷은 건너뛰고, 원본 파일이 바뀐 스냅샷만 다시 적재
+            src_hash = file_sha256(filepath)
+            known = catalog.get((reg_name, reg_date), False)
+            if known is None and not has_legacy_rows(conn, reg_name, reg_date):
+                # 카탈로그 도입 전에 적재된 스냅샷: 계층 컬럼까지 채워져 있으면 해시만 기록하고 그대로 사용
+                known_hashes.append((os.path.basename(filepath), src_hash, reg_name, reg_date))
+                known = src_hash
+            if known == src_hash:
+                skipped += 1
+                continue
+
+            try:
+                stage_snapshot(conn, read_rows(filepath, reg_name, reg_date, src_hash))
+                staged.append((reg_name, reg_date, os.path.basename(filepath), src_hash))
+                count += 1
+            except Exception:
+                pass
+
+        if staged or known_hashes: swap_staged(conn, staged, impact, known_hashes)
+    finally:
+        conn.close()
+    return count, skipped
+
+def ingest_csv_files(csv_paths, db_file=None, impact=True):
+    """지정한 중간 파일(Parquet/CSV)만 적재. 이미 있는 스냅샷은 교체하며(변경된 파일 반영),
+    모든 파일을 임시 테이블에 읽어 둔 뒤 한 트랜잭션으로 교체하고 끝에 data_version을 올림. 적재한 (규정명, 개정일, 행 수) 목록 반환"""
+    init_db(db_file)
+    conn = get_connection(db_file)
+    try:
+        staged, counts = [], []
+        for filepath in csv_paths:
+            reg_name, reg_date = parse_filename_info(filepath)
+            if not reg_date: continue
+            src_hash = file_sha256(filepath)
+            rows = read_rows(filepath, reg_name, reg_date, src_hash)
+            stage_snapshot(conn, rows)
+            staged.append((reg_name, reg_date, os.path.basename(filepath), src_hash))
+            counts.append((reg_name, reg_date, len(rows)))
+        if staged: swap_staged(conn, staged, impact)
+    finally:
+        conn.close()
+    return counts
+
+
+# ---------------------------------------------------------
+# 스냅샷 단위 교체/삭제
+# ---------------------------------------------------------
+def stage_snapshot(conn, rows):
+    """적재할 행(read_rows 결과)을 이 연결의 임시 테이블(temp.staging_history)에 넣음.
+    temp DB에만 쓰므로 본 DB의 쓰기 잠금을 잡지 않으며, 교체 트랜잭션은 준비된 행을 SQL 한 번으로 옮기기만 함"""
+    conn.execute(STAGING_TABLE_SQL)
+    with perf.span("stage", rows=len(rows)):
+        conn.executemany(f"INSERT INTO temp.staging_history VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})", rows)
+
+def swap_snapshot(cursor, reg_name, reg_date, source_file=None, source_hash=None):
+    """준비된 스냅샷으로 기존 행을 교체하고 그 스냅샷의 목차, 카탈로그, 용어 사전만 다시 만듦. 트랜잭션 경계는 호출 측에서 지정"""
+    cursor.execute("DELETE FROM regulation_history WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    with perf.span("ingest_batch", regulation=reg_name):
+        cursor.execute(SWAP_HISTORY_SQL, (reg_name, reg_date))
+    with perf.span("toc_build", snapshots=1):
+        rebuild_toc(cursor, reg_name, reg_date)
+        update_catalog(cursor, reg_name, reg_date, source_file, source_hash)
+    with perf.span("glossary_build", snapshots=1):
+        glossary.rebuild_snapshot(cursor, reg_name, reg_date)
+    invalidate_impact_reports(cursor, reg_name, reg_date)
+
+def remove_snapshot(cursor, reg_name, reg_date):
+    """스냅샷의 행과 스냅샷별 파생 테이블(목차, 용어 사전, 카탈로그, 영향 보고서) 삭제. 트랜잭션 경계는 호출 측에서 지정"""
+    for table in SNAPSHOT_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    drop_impact_reports(cursor, reg_name, reg_date)
+
+def invalidate_impact_reports(cursor, reg_name, reg_date):
+    """이 스냅샷을 직전 개정본으로 비교했거나 영향받는 조항으로 인용한 보고서를 다시 만들도록 표시
+    (그 보고서의 스냅샷이 최신이면 다음 갱신(update_reports)에서 새로 만듦)"""
+    impact_report.init_tables(cursor)
+    cursor.execute('''
+        UPDATE impact_reports SET source_ingested_at=NULL
+        WHERE (regulation_name = ? AND prev_date = ?)
+           OR (regulation_name, reg_date) IN (SELECT regulation_name, reg_date FROM impact_citations WHERE item_regulation=? AND item_date=?)
+    ''', (reg_name, reg_date, reg_name, reg_date))
+
+def drop_impact_reports(cursor, reg_name, reg_date):
+    """삭제한 스냅샷의 영향 보고서를 지우고, 그 스냅샷과 비교한 보고서는 다시 만들도록 표시"""
+    impact_report.init_tables(cursor)
+    for table in ("impact_reports", "impact_changes", "impact_citations"):
+        cursor.execute(f"DELETE FROM {table} WHERE regulation_name=? AND reg_date=?", (reg_name, reg_date))
+    invalidate_impact_reports(cursor, reg_name, reg_date)
+
+def update_derived(cursor, impact=True):
+    """최신 스냅샷 기준 파생 테이블(유사 조항 벡터, 본문 위치 색인, 영향 보고서)을 갱신하고 data_version을 올림
+    각 갱신은 최신 여부가 바뀌었거나 다시 적재된 스냅샷만 처리하므로 비용은 바뀐 스냅샷 크기에 비례함"""
+    with perf.span("similarity_build"):
+        similarity.update_vectors(cursor)
+    with perf.span("text_index_build"):
+        text_index.update_postings(cursor)
+    if impact: update_impact_reports(cursor)
+    bump_data_version(cursor)
+
+def swap_staged(conn, staged, impact=True, known_hashes=()):
+    """준비된 스냅샷 [(규정명, 개정일, 원본 파일명, 해시)]을 한 트랜잭션(BEGIN IMMEDIATE)으로 교체하고 파생 테이블을 갱신.
+    WAL이므로 읽는 쪽은 커밋 전까지 이전 스냅샷을 그대로 보고, 쓰기 잠금은 읽어 둔 행을 옮기는 동안만 잡음
+    (known_hashes: 카탈로그에 원본 해시만 기록할 [(원본 파일명, 해시, 규정명, 개정일)])"""
+    conn.commit()   # 임시 테이블에 쓰던 암묵적 트랜잭션 종료
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.executemany("UPDATE regulation_catalog SET source_file=?, source_hash=? WHERE regulation_name=? AND reg_date=?",
+                           known_hashes)
+        with perf.span("snapshot_swap", snapshots=len(staged)):
+            for reg_name, reg_date, source_file, src_hash in staged:
+                swap_snapshot(cursor, reg_name, reg_date, source_file, src_hash)
+        if staged: update_derived(cursor, impact)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.staging_history")
+
+def delete_snapshots(snapshots, db_file=None, impact=True):
+    """스냅샷 [(규정명, 개정일)]을 한 트랜잭션으로 삭제하고 파생 테이블을 갱신. 실제로 삭제한 목록 반환
+    최신 스냅샷을 지우면 직전 개정본이 최신이 되며, 그 스냅샷의 벡터, 색인, 영향 보고서만 새로 만듦"""
+    init_db(db_file)
+    conn = get_connection(db_file)
+    try:
+        loaded = fetch_loaded_snapshots(conn)
+        targets = [(reg_name, reg_date) for reg_name, reg_date in snapshots if (reg_name, reg_date) in loaded]
+        if not targets: return []
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for reg_name, reg_date in targets:
+                remove_snapshot(cursor, reg_name, reg_date)
+            update_derived(cursor, impact)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    return targets
+
+def export_db_to_excel(db_file=None, progress=None, readonly=False):
+    """DB의 모든 테이블을 시트별로 저장한 엑셀 바이트. db_file이 파일 목록(샤드)이면 같은 이름의 테이블을 이어 붙임
+    (readonly: 배포용 DB처럼 저널 모드를 바꾸면 안 되는 파일은 읽기 전용으로 엶)"""
+    db_files = db_file if isinstance(db_file, (list, tuple)) else [db_file]
+    connect = get_readonly_connection if readonly else get_connection
+    conns = [connect(f) for f in db_files]
+    tables = []
+    for conn in conns:
+        for (t_name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"):
+            if t_name not in tables and t_name not in EXPORT_SKIP_TABLES: tables.append(t_name)
+
+    output = io.BytesIO()
+    try:
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            for idx, t_name in enumerate(tables):
+                if progress: progress(idx / len(tables), t_name)
+                frames = [pd.read_sql(f"SELECT * FROM {t_name}", conn) for conn in conns
+                          if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (t_name,)).fetchone()]
+                df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+                df.to_excel(writer, sheet_name=t_name, index=False)
+    except Exception:
+        return None
+    finally:
+        for conn in conns: conn.close()
+
+    return output.getvalue()
+
+
+# =========================================================
+# 4. 메뉴별 조회 쿼리
+# =========================================================
+def read_frame(sql, conn, params=()):
+    """pd.read_sql과 같은 용도. SQL 실행과 DataFrame 생성 시간을 각각 span으로 측정"""
+    with perf.span("sql", sql=sql, params=params):
+        cursor = conn.execute(sql, params)
+        rows = cursor.fetchall()
+    with perf.span("dataframe", rows=len(rows)):
+        return pd.DataFrame.from_records(rows, columns=[d[0] for d in cursor.description])
+
+def fetch_regulation_names(conn):
+    df = read_frame("SELECT DISTINCT regulation_name FROM regulation_catalog ORDER BY regulation_name", conn)
+    return df['regulation_name'].tolist()
+
+def fetch_regulation_dates(conn, reg_name):
+    dates = read_frame("SELECT reg_date FROM regulation_catalog WHERE regulation_name=? ORDER BY reg_date DESC", conn, params=(reg_name,))
+    return dates['reg_date'].tolist()
+
+def fetch_catalog(conn):
+    """카탈로그 전체 (규정명, 최신 개정일 순)"""
+    return read_frame(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM regulation_catalog ORDER BY regulation_name, reg_date DESC", conn)
+
+def fetch_toc(conn, reg_name, reg_date):
+    return read_frame("""
+        SELECT chapter_no, chapter_title, section_no, section_title, first_ref, last_ref, row_count
+        FROM regulation_toc
+        WHERE regulation_name=? AND reg_date=?
+        ORDER BY first_id
+    """, conn, params=(reg_name, reg_date))
+
+def fetch_toc_contents(conn, reg_name, reg_date, chapter, section=None):
+    """목차에서 선택한 장(또는 장 안의 절)의 본문만 인덱스로 조회. chapter/section은 (번호, 제목) 튜플"""
+    q = """
+        SELECT ref_no as '조항', article_title as '조명', content as '내용'
+        FROM regulation_history
+        WHERE regulation_name=? AND reg_date=? AND chapter_no=? AND chapter_title=?
+    """
+    p = [reg_name, reg_date, *chapter]
+    if section is not None:
+        q += " AND section_no=? AND section_title=?"
+        p.extend(section)
+    return read_frame(q + " ORDER BY id", conn, params=p)
+
+def fetch_article_history(conn, reg_name, ref):
+    return read_frame(
+        "SELECT reg_date, ref_no, article_title, content, unique_key FROM regulation_history WHERE regulation_name=? AND ref_no LIKE ? ORDER BY unique_key, reg_date",
+        conn, params=(reg_name, f"%{ref}%"))
+
+def fetch_article_detail(conn, reg_name, reg_date, ref):
+    return read_frame("""
+        SELECT ref_no AS '조항', article_title AS '조명', content AS '내용'
+        FROM regulation_history
+        WHERE regulation_name=? AND reg_date=? AND ref_no LIKE ?
+    """, conn, params=(reg_name, reg_date, f"%{ref}%"))
+
+def search_keyword(conn, keyword, target=None, latest=True, collapse=False):
+    """키워드 검색 결과와 패싯별 건수를 함께 반환
+
+    본문 LIKE 스캔은 한 번만 수행해 임시 테이블에 담고, 패싯 건수는 그 임시 테이블에 대한
+    하나의 GROUP BY 쿼리로 구함. 패싯 선택(좁히기)은 호출 측에서 결과를 메모리에서 필터링함.
+    collapse=True면 (규정, unique_key, 본문)이 같은 행을 연속된 개정본 구간별로 SQL에서 하나로 묶어, 구간의 마지막 개정본 행에
+    first_date(처음 나온 개정일), snapshots(나온 개정본 수), next_date(마지막 개정본 다음 개정일, 최신이면 None)를 붙여 반환.
+    개정되지 않은 조항이 개정본 수만큼 반복되지 않으며, 패싯 건수도 묶은 행 기준 (개정일 패싯은 마지막 개정일)
+    """
+    q = f"""
+        CREATE TEMP TABLE hits AS
+        SELECT id, regulation_name, reg_date, ref_no, article_title, content,
+               COALESCE(level, '') AS level,
+               CASE WHEN COALESCE(chapter_no, '') = '' THEN '' ELSE '제' || chapter_no || '장 ' || chapter_title END AS chapter
+               {", unique_key" if collapse else ""}
+        FROM regulation_history WHERE (content LIKE ? OR article_title LIKE ?)
+    """
+    p = [f"%{keyword}%", f"%{keyword}%"]
+    if target is not None:
+        q += " AND regulation_name = ?"
+        p.append(target)
+    if latest:
+        q += f" AND (regulation_name, reg_date) IN ({LATEST_SNAPSHOTS_SQL})"
+
+    table = "hit_groups" if collapse else "hits"
+    facet_q = " UNION ALL ".join(
+        f"SELECT '{key}' AS facet, {key} AS value, COUNT(*) AS hits FROM {table} GROUP BY {key}"
+        for key, _ in SEARCH_FACETS
+    )
+
+    conn.execute("DROP TABLE IF EXISTS temp.hits")
+    conn.execute("DROP TABLE IF EXISTS temp.hit_groups")
+    with perf.span("sql", sql=q, params=p):
+        conn.execute(q, p)
+    try:
+        if collapse:
+            with perf.span("sql", sql=COLLAPSE_HITS_SQL):
+                conn.execute(COLLAPSE_HITS_SQL)
+        df = read_frame(f"SELECT * FROM {table} ORDER BY regulation_name, reg_date DESC, id", conn)
+        facets = read_frame(facet_q, conn)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.hits")
+        conn.execute("DROP TABLE IF EXISTS temp.hit_groups")
+    return df, facets
+
+def facet_counts(df):
+    """검색 결과 DataFrame -> search_keyword와 같은 형식의 패싯별 건수 (고급 검색 결과용)"""
+    frames = [df.groupby(key, sort=False).size().rename("hits").rename_axis("value").reset_index().assign(facet=key)
+              for key, _ in SEARCH_FACETS]
+    return pd.concat(frames, ignore_index=True)[["facet", "value", "hits"]]
+
+def citation_terms(target_reg, target_art):
+    """인용 분석의 짝 규정 이름과 종류별 검색어 (내부 / 파트너 규정(세칙) / 타 규정)"""
+    is_rule, partner_reg_name = partner_regulation(target_reg)
+    return {
+        "partner_reg_name": partner_reg_name,
+        "term_internal": target_art,
+        "term_partner": f"세칙 {target_art}" if is_rule else f"규정 {target_art}",
+        "term_external": f"「{target_reg}」 {target_art}",
+    }
+
+def find_citation_rows(conn, kind, target_reg, target_art, latest_only=True, deadline=None):
+    """인용 분석 한 종류(CITATION_KINDS)의 행. 대상 규정은 작은 카탈로그에서 먼저 고르고 본문은 그 규정만 읽음
+    (내부 참조는 규정 1개만 읽으므로 가장 빨리 끝남). 검색어 일치는 instr로 대소문자까지 그대로 비교
+    deadline(time.monotonic 기준)을 넘기면 SQLite 실행을 중단하고 TimeoutError"""
+    terms = citation_terms(target_reg, target_art)
+    where, params = {
+        "internal": ("regulation_name = ?", [target_reg]),
+        "partner": ("regulation_name != ? AND instr(regulation_name, ?) > 0", [target_reg, terms["partner_reg_name"]]),
+        "external": ("regulation_name != ? AND instr(regulation_name, ?) = 0", [target_reg, terms["partner_reg_name"]]),
+    }[kind]
+    query = f"""
+        WITH regs AS (
+            SELECT regulation_name, MAX(reg_date) AS max_date FROM regulation_catalog
+            WHERE {where} GROUP BY regulation_name
+        )
+        SELECT h.regulation_name, h.reg_date, h.ref_no, h.article_title, h.content
+        FROM regs JOIN regulation_history h
+          ON h.regulation_name = regs.regulation_name {"AND h.reg_date = regs.max_date" if latest_only else ""}
+        WHERE instr(h.content, ?) > 0
+        ORDER BY h.regulation_name, h.id
+    """
+    if deadline is not None:
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, CITATION_PROGRESS_STEPS)
+    try:
+        with perf.span("citation", kind=kind):
+            return read_frame(query, conn, params=[*params, terms[f"term_{kind}"]])
+    except sqlite3.OperationalError:
+        if deadline is not None and time.monotonic() > deadline: raise TimeoutError(f"인용 분석 시간 초과: {kind}")
+        raise
+    finally:
+        if deadline is not None: conn.set_progress_handler(None, 0)
+
+def find_citations(conn, target_reg, target_art, latest_only=True):
+    """조항 인용(역참조) 분석: 내부 / 파트너 규정(세칙) / 타 규정 참조 행을 나누어 반환 (한 연결에서 차례로 실행)"""
+    result = citation_terms(target_reg, target_art)
+    for kind in CITATION_KINDS:
+        result[kind] = find_citation_rows(conn, kind, target_reg, target_art, latest_only)
+    return result
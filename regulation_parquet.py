@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+규정 중간 파일(Parquet) 모듈
+TXT/HWP 파싱 결과(12컬럼)를 utf-8-sig CSV 대신 열 단위로 압축한 Parquet 파일로 저장하고 읽습니다.
+CSV는 pd.read_csv가 열마다 자료형을 추측하므로(장번호 1 -> 1.0, 빈 칸 -> NaN) 파일마다 값이 달라지고,
+텍스트 파싱과 행 단위 변환 비용이 적재 시간의 대부분을 차지했습니다.
+
+    - 스키마 고정: 12컬럼 모두 NOT NULL 문자열 (빈 값은 ""). 반복 값이 많은 계층 열은 사전(dictionary) 인코딩
+    - 압축: zstd. 같은 내용이면 같은 바이트가 나오도록 작성 시각 등은 기록하지 않음
+    - 메타데이터: 포맷 버전, 원본 파일 이름과 해시, 파서 버전 (info 명령으로 확인)
+    - 적재(regulation_db.load_files)는 같은 이름의 Parquet이 있으면 CSV 대신 Parquet을 열 단위로 읽음
+
+CSV는 내보내기 용도로 계속 만들 수 있습니다 (export-csv). 기존 CSV는 convert로 한 번에 옮깁니다.
+
+사용 예:
+    python regulation_parquet.py convert              # '규정' 폴더 CSV -> Parquet (이미 있으면 건너뜀)
+    python regulation_parquet.py export-csv           # '규정' 폴더 Parquet -> CSV (utf-8-sig)
+    python regulation_parquet.py info 규정/파일.parquet  # 스키마, 행 수, 메타데이터
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 파서 출력 12컬럼 (regulation_parser.BASE_COLS와 같은 순서)
+COLUMNS = ["구분", "장번호", "장명", "절번호", "절명", "참조번호", "조명", "조", "항", "호", "목", "내용"]
+SCHEMA = pa.schema([pa.field(col, pa.string(), nullable=False) for col in COLUMNS])
+# 행마다 값이 달라 사전 인코딩하지 않는 열
+PLAIN_COLUMNS = ("참조번호", "내용")
+
+PARQUET_SUFFIX = ".parquet"
+FORMAT_VERSION = "v4"
+COMPRESSION = os.environ.get("REG_PARQUET_COMPRESSION", "zstd")
+META_PREFIX = "regulation."
+
+
+# ----------------------------------------------------------------------
+# 1. 쓰기
+# ----------------------------------------------------------------------
+def to_table(df, source_file=None, source_hash=None, parser_version=None):
+    """파서 DataFrame -> 고정 스키마 Arrow 테이블. NaN/None은 "", 숫자는 문자열로 맞춤"""
+    missing = [col for col in COLUMNS if col not in df.columns]
+    if missing: raise ValueError(f"필수 컬럼이 없습니다: {', '.join(missing)}")
+    arrays = [pa.array(df[col].map(_text).tolist(), type=pa.string()) for col in COLUMNS]
+    meta = {"format": FORMAT_VERSION, "source_file": source_file, "source_hash": source_hash, "parser_version": parser_version}
+    return pa.Table.from_arrays(arrays, schema=SCHEMA.with_metadata(
+        {f"{META_PREFIX}{k}": str(v) for k, v in meta.items() if v is not None}))
+
+def _text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)): return ""
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value)
+
+def write_table(df, path, source_file=None, source_hash=None, parser_version=None):
+    """DataFrame을 Parquet으로 저장 (임시 파일에 쓴 뒤 교체하므로 적재 중인 쪽이 반쯤 쓴 파일을 읽지 않음)"""
+    path = Path(path)
+    table = to_table(df, source_file, source_hash, parser_version)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        pq.write_table(table, tmp_path, compression=COMPRESSION,
+                       use_dictionary=[col for col in COLUMNS if col not in PLAIN_COLUMNS])
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+    return path
+
+
+# ----------------------------------------------------------------------
+# 2. 읽기
+# ----------------------------------------------------------------------
+def read_columns(path, columns=None):
+    """{컬럼: 문자열 목록}. 열 단위로 읽으므로 필요한 컬럼만 지정하면 나머지는 풀지 않음"""
+    table = pq.read_table(path, columns=columns or COLUMNS)
+    return {col: table.column(col).to_pylist() for col in table.column_names}
+
+def read_frame(path):
+    return pq.read_table(path, columns=COLUMNS).to_pandas()
+
+def read_metadata(path):
+    """파일에 기록된 메타데이터 {format, source_file, source_hash, parser_version}와 행 수"""
+    meta = pq.read_metadata(path)
+    kv = {k.decode(): v.decode() for k, v in (meta.metadata or {}).items() if k.decode().startswith(META_PREFIX)}
+    info = {k[len(META_PREFIX):]: v for k, v in kv.items()}
+    info["rows"] = meta.num_rows
+    return info
+
+
+# ----------------------------------------------------------------------
+# 3. CSV 변환 (기존 파일 이전, 내보내기)
+# ----------------------------------------------------------------------
+def csv_to_parquet(csv_path, parquet_path=None):
+    """기존 CSV -> Parquet. 자료형 추측 없이 문자열 그대로 읽으므로 값이 바뀌지 않음"""
+    from regulation_db import file_sha256
+    csv_path = Path(csv_path)
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    return write_table(df, parquet_path or csv_path.with_suffix(PARQUET_SUFFIX), csv_path.name, file_sha256(csv_path))
+
+def export_csv(parquet_path, csv_path=None):
+    """Parquet -> CSV (v4 포맷과 같은 utf-8-sig 12컬럼)"""
+    parquet_path = Path(parquet_path)
+    csv_path = csv_path or parquet_path.with_suffix(".csv")
+    read_frame(parquet_path).to_csv(csv_path, index=False, encoding="utf-8-sig")
+    return csv_path
+
+def _convert_folder(data_dir, src_suffix, out_suffix, convert, overwrite=False):
+    converted = skipped = 0
+    for src in sorted(Path(data_dir).glob(f"*{src_suffix}")):
+        if src.with_suffix(out_suffix).exists() and not overwrite:
+            skipped += 1
+            continue
+        try:
+            convert(src)
+            converted += 1
+            print(f"  {src.name} -> {src.with_suffix(out_suffix).name}")
+        except Exception as e:
+            print(f"  [오류] {src.name}: {e}")
+    print(f"완료: {converted}개 변환, {skipped}개 건너뜀")
+
+
+# ----------------------------------------------------------------------
+# 4. CLI
+# ----------------------------------------------------------------------
+def main():
+    from regulation_db import DATA_DIR
+    parser = argparse.ArgumentParser(description="규정 중간 파일(Parquet) 변환과 확인")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("convert", help="폴더의 CSV를 Parquet으로 변환")
+    p.add_argument("--data-dir", default=DATA_DIR, help="규정 폴더 (기본: 규정)")
+    p.add_argument("--overwrite", action="store_true", help="이미 있는 Parquet도 다시 만듦")
+    p = sub.add_parser("export-csv", help="폴더의 Parquet을 CSV로 내보내기")
+    p.add_argument("--data-dir", default=DATA_DIR, help="규정 폴더 (기본: 규정)")
+    p.add_argument("--overwrite", action="store_true", help="이미 있는 CSV도 다시 만듦")
+    p = sub.add_parser("info", help="Parquet 파일의 스키마와 메타데이터")
+    p.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        _convert_folder(args.data_dir, ".csv", PARQUET_SUFFIX, csv_to_parquet, args.overwrite)
+    elif args.command == "export-csv":
+        _convert_folder(args.data_dir, PARQUET_SUFFIX, ".csv", export_csv, args.overwrite)
+    elif args.command == "info":
+        print(pq.read_schema(args.path).remove_metadata())
+        for k, v in read_metadata(args.path).items():
+            print(f"{k}: {v}")
+        print(f"파일 크기: {os.path.getsize(args.path):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+한국거래소 규정/세칙 파서 모듈
+TXT 원문을 읽어 장/절/조/항/호/목 단위의 12컬럼 DataFrame으로 변환합니다.
+파싱 결과는 원본 해시 + 파서 버전을 키로 캐시하므로(parse_cache), 바뀌지 않은 원본은 다시 파싱하지 않습니다.
+app.py(사이드바 TXT -> Parquet 변환)와 규정_txt_to_csv.py(CLI)가 함께 사용합니다.
+"""
+
+import codecs
+import hashlib
+import mmap
+import os
+import re
+import unicodedata
+from collections import deque
+from pathlib import Path
+
+import parse_cache
+from hwp_reader import iter_hwp_lines
+from parse_cache import ParsedDocument
+
+# CSV v4 포맷 (12컬럼)
+BASE_COLS = ["구분", "장번호", "장명", "절번호", "절명", "참조번호", "조명", "조", "항", "호", "목", "내용"]
+# 행마다 값이 달라 열 단위 모델에서 코드화하지 않는 열
+PLAIN_COLS = ("참조번호", "내용")
+
+# 파싱 결과 캐시 키에 쓰는 파서 버전. 파서 코드(이 모듈과 hwp_reader)의 해시를 붙여
+# 코드를 고치면 이전 캐시를 쓰지 않고 다시 파싱함
+PARSER_VERSION = "4." + hashlib.sha1(b"".join(
+    (Path(__file__).parent / name).read_bytes() for name in ("regulation_parser.py", "hwp_reader.py"))).hexdigest()[:12]
+
+
+# ----------------------------------------------------------------------
+# 1. 원문 읽기 (mmap + BOM/샘플 기반 인코딩 판별 + 증분 디코딩)
+# ----------------------------------------------------------------------
+ENCODINGS_TO_TRY = ["utf-8", "cp949", "euc-kr"]
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+SAMPLE_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+# str.splitlines()가 줄바꿈으로 취급하는 문자 중 '\r'은 다음 청크의 '\n'과 짝일 수 있어 보류함
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def detect_encoding(data) -> str:
+    """BOM이 있으면 BOM으로, 없으면 앞부분 샘플만 디코딩해 보고 인코딩을 고름"""
+    for bom, enc in BOM_ENCODINGS:
+        if data[:len(bom)] == bom:
+            return enc
+    sample = data[:SAMPLE_SIZE]
+    for enc in ENCODINGS_TO_TRY:
+        try:
+            # final=False: 샘플 끝에서 잘린 멀티바이트 문자는 오류로 보지 않음
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def iter_source_lines(filename: str, encoding: str = None, errors: str = "strict"):
+    """파일을 mmap으로 열어 청크 단위로 디코딩하며 (한글 자모는 NFC로 합친) 줄을 하나씩 반환
+
+    전체 문자열을 메모리에 만들지 않으므로 큰 파일도 일정한 메모리로 처리합니다.
+    샘플로 고른 인코딩이 파일 뒷부분에서 실패하면 UnicodeDecodeError가 발생하며,
+    parse_file()이 다음 인코딩으로 다시 시도합니다.
+    """
+    path = Path(filename)
+    if not path.exists():
+        raise FileNotFoundError(f'"{filename}" 파일을 찾을 수 없습니다.')
+
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            encoding = encoding or detect_encoding(mm) or "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors)
+            pending = ""
+            for pos in range(0, len(mm), CHUNK_SIZE):
+                chunk = mm[pos:pos + CHUNK_SIZE]
+                pending += decoder.decode(chunk, final=pos + CHUNK_SIZE >= len(mm))
+                lines = pending.splitlines(keepends=True)
+                # 마지막 줄은 아직 끝나지 않았을 수 있으므로 다음 청크와 합쳐서 처리
+                pending = lines.pop() if lines and (lines[-1][-1] not in _LINE_BREAKS or lines[-1][-1] == "\r") else ""
+                for line in lines:
+                    yield _normalize_line(line)
+            for line in pending.splitlines(keepends=True):
+                yield _normalize_line(line)
+
+
+# 풀어쓴 한글 자모(NFD, 주로 macOS에서 저장된 파일)만 NFC로 합침.
+# 줄 전체를 NFC로 바꾸면 원문의 CJK 호환 한자(예: U+F967)까지 바뀌어 기존 CSV와 달라지므로 자모 구간만 정규화
+_JAMO_RUN = re.compile(r"[\u1100-\u11ff\ua960-\ua97f\ud7b0-\ud7ff]+")
+
+def _normalize_line(line: str) -> str:
+    line = line.rstrip(_LINE_BREAKS) if line[-1:] in _LINE_BREAKS else line
+    if _JAMO_RUN.search(line):
+        line = _JAMO_RUN.sub(lambda m: unicodedata.normalize("NFC", m.group()), line)
+    return line
+
+
+def read_source_text(filename: str) -> str:
+    """파일 전체를 문자열로 읽음 (인코딩 판별은 iter_source_lines와 동일)"""
+    return "\n".join(iter_source_lines(filename))
+
+
+# ----------------------------------------------------------------------
+# 2. 파싱용 정규표현식 및 유틸 함수 (변경 없음)
+# ----------------------------------------------------------------------
+ARTICLE_ID_PATTERN = re.compile(r"^(제\d+조(?:의\d+)?)")
+HO_PATTERN = re.compile(r"(^|\n)\s*(\d+(?:의\d+)*)\.\s*", re.MULTILINE)
+HANG_PATTERN = re.compile(r"(^|\n)\s*([①-⑳])", re.MULTILINE)
+MOK_PATTERN = re.compile(r"(^|\n)\s*([가-하])\.\s*", re.MULTILINE)
+CHAPTER_PATTERN = re.compile(r"^제(\d+)장\s*(.+)")
+SECTION_PATTERN = re.compile(r"^제(\d+)절\s*(.+)")
+
+
+def clean_text(s: str) -> str:
+    if s is None:
+        return ""
+    s = s.replace("\t", " ")
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+
+# 조문 파싱 결과의 각 행: (참조번호, 조, 조명, 항, 호, 목, 내용) 튜플
+def parse_moks(base_ref: str, article_id: str, title: str, hang: str, ho: str, ho_text: str):
+    rows = []
+    mok_matches = list(MOK_PATTERN.finditer(ho_text))
+    if not mok_matches:
+        return rows
+
+    for i, m in enumerate(mok_matches):
+        mok_char = m.group(2)
+        start = m.start(2)
+        end = mok_matches[i + 1].start(2) if i + 1 < len(mok_matches) else len(ho_text)
+        mok_text = ho_text[start:end].strip()
+        base_ref_mok = f"{base_ref}{mok_char}목"
+
+        rows.append((base_ref_mok, article_id, title, hang, ho, mok_char, mok_text))
+    return rows
+
+
+def parse_h_block(article_id: str, title: str, h_char: str, block_raw: str):
+    rows = []
+    ho_matches = list(HO_PATTERN.finditer(block_raw))
+
+    if not ho_matches:
+        content = block_raw.strip()
+        rows.append((f"{article_id}제{h_char}항", article_id, title, h_char, "0", "0", content))
+    else:
+        hang_main = block_raw[: ho_matches[0].start(0)].strip()
+        if hang_main:
+            rows.append((f"{article_id}제{h_char}항", article_id, title, h_char, "0", "0", hang_main))
+
+    for i, match in enumerate(ho_matches):
+        start = match.start(2)
+        end = ho_matches[i + 1].start(0) if i + 1 < len(ho_matches) else len(block_raw)
+        ho_text = block_raw[start:end].strip()
+
+        m2 = re.match(r"(\d+(?:의\d+)*)\.\s*(.*)", ho_text, flags=re.S)
+        if m2:
+            ho_num = m2.group(1)
+            remainder = m2.group(2)
+        else:
+            ho_num = match.group(2)
+            remainder = ho_text
+
+        mok_matches = list(MOK_PATTERN.finditer(remainder))
+        if mok_matches:
+            ho_main = remainder[: mok_matches[0].start(0)].strip()
+        else:
+            ho_main = remainder.strip()
+
+        base_ref = f"{article_id}제{ho_num}호"
+        rows.append((base_ref, article_id, title, h_char, ho_num, "0", ho_main))
+        rows.extend(parse_moks(base_ref, article_id, title, h_char, ho_num, remainder))
+
+    return rows
+
+
+def parse_article_with_hang(article_id: str, title: str, body_text: str):
+    rows = []
+    hang_matches = list(HANG_PATTERN.finditer(body_text))
+    for i, hm in enumerate(hang_matches):
+        h_char = hm.group(2)
+        start = hm.start(2)
+        end = hang_matches[i + 1].start(2) if i + 1 < len(hang_matches) else len(body_text)
+        block_raw = body_text[start:end].strip()
+        rows.extend(parse_h_block(article_id, title, h_char, block_raw))
+    return rows
+
+
+def parse_article_no_hang(article_id: str, title: str, body_text: str):
+    rows = []
+    ho_matches = list(HO_PATTERN.finditer(body_text))
+
+    if not ho_matches:
+        content = body_text.strip()
+        rows.append((article_id, article_id, title, "0", "0", "0", content))
+        return rows
+
+    base_text = body_text[: ho_matches[0].start(0)].strip()
+    if base_text:
+        rows.append((article_id, article_id, title, "0", "0", "0", base_text))
+
+    for i, match in enumerate(ho_matches):
+        start = match.start(2)
+        end = ho_matches[i + 1].start(0) if i + 1 < len(ho_matches) else len(body_text)
+        ho_text = body_text[start:end].strip()
+
+        m2 = re.match(r"(\d+(?:의\d+)*)\.\s*(.*)", ho_text, flags=re.S)
+        if m2:
+            ho_num = m2.group(1)
+            remainder = m2.group(2)
+        else:
+            ho_num = match.group(2)
+            remainder = ho_text
+
+        mok_matches = list(MOK_PATTERN.finditer(remainder))
+        if mok_matches:
+            ho_main = remainder[: mok_matches[0].start(0)].strip()
+        else:
+            ho_main = remainder.strip()
+
+        base_ref = f"{article_id}제{ho_num}호"
+        rows.append((base_ref, article_id, title, "0", ho_num, "0", ho_main))
+        rows.extend(parse_moks(base_ref, article_id, title, "0", ho_num, remainder))
+    return rows
+
+
+def parse_article(article_text: str):
+    rows = []
+    lines_local = article_text.splitlines()
+    if not lines_local:
+        return rows
+
+    header_line = lines_local[0]
+    m = ARTICLE_ID_PATTERN.match(header_line)
+    if not m:
+        return rows
+    article_id = m.group(1)
+
+    after = header_line[m.end() :]
+    after_strip = after.lstrip()
+
+    if after_strip.startswith("삭제"):
+        rows.append((article_id, article_id, "삭제", "0", "0", "0", article_text.strip()))
+        return rows
+
+    idx_lp = header_line.find("(", len(article_id))
+    idx_rp = header_line.find(")", idx_lp + 1) if idx_lp != -1 else -1
+    if idx_lp == -1 or idx_rp == -1 or idx_rp < idx_lp:
+        title = ""
+        first_body_part = header_line[m.end() :]
+    else:
+        title = header_line[idx_lp + 1 : idx_rp]
+        first_body_part = header_line[idx_rp + 1 :]
+
+    body_lines_local = []
+    if first_body_part is not None:
+        body_lines_local.append(first_body_part.strip())
+    if len(lines_local) > 1:
+        body_lines_local.extend(lines_local[1:])
+    body_text = "\n".join(body_lines_local).strip()
+
+    if not body_text:
+        rows.append((article_id, article_id, title, "0", "0", "0", ""))
+        return rows
+
+    if re.search(r"[①-⑳]", body_text):
+        rows.extend(parse_article_with_hang(article_id, title, body_text))
+    else:
+        rows.extend(parse_article_no_hang(article_id, title, body_text))
+
+    return rows
+
+
+# ----------------------------------------------------------------------
+# 6. 전체 문서 파싱 (장/절 컨텍스트 포함)
+# ----------------------------------------------------------------------
+def parse_document(text) -> ParsedDocument:
+    """text: 원문 문자열 또는 줄 단위 iterable (iter_source_lines 결과)
+
+    줄을 한 번만 훑으면서 조문 단위로 모아 바로 파싱하므로 전체 줄 목록을 보관하지 않습니다.
+    행은 딕셔너리를 거치지 않고 열 단위 모델(ParsedDocument)에 바로 쌓습니다.
+    """
+    lines = text.splitlines() if isinstance(text, str) else text
+    current_chapter_no = ""
+    current_chapter_title = ""
+    current_section_no = ""
+    current_section_title = ""
+
+    doc = ParsedDocument(BASE_COLS, plain=PLAIN_COLS)
+    meta = None
+    seg_lines = []
+
+    def flush():
+        if meta is None: return
+        # 장/절 값은 조문 안의 모든 행이 같으므로 한 번만 정리
+        context = tuple(clean_text(v) for v in meta[1:])
+        for ref, article_id, title, hang, ho, mok, content in parse_article("\n".join(seg_lines)):
+            if mok != "0": level = "목"
+            elif ho != "0": level = "호"
+            elif hang != "0": level = "항"
+            else: level = "조"
+            doc.append((level, *context, clean_text(ref), clean_text(title), clean_text(article_id),
+                        hang, ho, mok, clean_text(content)))
+
+    for idx, line in enumerate(lines):
+        s = line.strip()
+        m_ch = CHAPTER_PATTERN.match(s)
+        if m_ch:
+            current_chapter_no = m_ch.group(1)
+            current_chapter_title = m_ch.group(2).strip()
+            continue
+        m_se = SECTION_PATTERN.match(s)
+        if m_se:
+            current_section_no = m_se.group(1)
+            current_section_title = m_se.group(2).strip()
+            continue
+        if re.match(r"^제\d+조", s):
+            flush()
+            meta = (idx, current_chapter_no, current_chapter_title, current_section_no, current_section_title)
+            seg_lines = []
+        if meta is None or s == "" or s == "조항 인쇄":
+            continue
+        seg_lines.append(line)
+    flush()
+    return doc
+
+
+def parse_all(text):
+    """parse_document 결과를 12컬럼 DataFrame으로 반환"""
+    return parse_document(text).to_frame()
+
+
+# ----------------------------------------------------------------------
+# 7. 파일 파싱 (원본 해시 + 파서 버전 캐시)
+# ----------------------------------------------------------------------
+def source_hash(filename) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse_text_file(filename: str) -> ParsedDocument:
+    with open(filename, "rb") as f:
+        detected = detect_encoding(f.read(SAMPLE_SIZE))
+    candidates = [detected] if detected else []
+    candidates += [enc for enc in ENCODINGS_TO_TRY if enc not in candidates and not (detected or "").startswith("utf-16")]
+
+    for enc in candidates:
+        try:
+            return parse_document(iter_source_lines(filename, encoding=enc))
+        except UnicodeDecodeError:
+            continue
+
+    print(f'[WARN] "{Path(filename).name}" 일반 인코딩 실패. utf-8 + ignore 로 강제 디코딩했습니다.')
+    return parse_document(iter_source_lines(filename, encoding="utf-8", errors="ignore"))
+
+
+def parse_file(filename: str, use_cache: bool = True):
+    """TXT 파일을 스트리밍으로 읽어 파싱. 판별한 인코딩이 중간에 실패하면 다음 인코딩으로 재시도
+    use_cache: 같은 내용(해시)의 파일을 같은 파서 버전으로 파싱한 결과가 캐시에 있으면 그대로 사용"""
+    src_hash = source_hash(filename) if use_cache and parse_cache.enabled() else None
+    doc = parse_cache.load("txt", src_hash, PARSER_VERSION)
+    if doc is None:
+        doc = _parse_text_file(filename)
+        parse_cache.store("txt", src_hash, PARSER_VERSION, doc)
+    return doc.to_frame()
+
+
+def parse_hwp(filename: str, lines=None, use_cache: bool = True):
+    """HWP 파일을 TXT 없이 바로 파싱 (hwp_reader로 문단을 읽어 parse_file과 같은 줄 단위로 넘김)
+
+    lines: iter_hwp_lines 결과를 이미 가지고 있으면(예: TXT 저장과 함께 처리) 그 iterable을 사용.
+           캐시 적중이어도 끝까지 읽으므로 TXT 저장 같은 부수 효과는 그대로 일어남
+    """
+    src_hash = source_hash(filename) if use_cache and parse_cache.enabled() else None
+    doc = parse_cache.load("hwp", src_hash, PARSER_VERSION)
+    if doc is not None:
+        if lines is not None: deque(lines, maxlen=0)
+        return doc.to_frame()
+    if lines is None: lines = iter_hwp_lines(filename)
+    doc = parse_document(_normalize_line(line) for line in lines)
+    parse_cache.store("hwp", src_hash, PARSER_VERSION, doc)
+    return doc.to_frame()
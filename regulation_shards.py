@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+샤드(분할) DB 모듈
+regulation_master.db 하나 대신 시장별(유가증권/코스닥/코넥스/파생/청산결제) 또는 규정별로 SQLite 파일을 나누고,
+작은 카탈로그 DB(catalog.db)에 스냅샷 목록과 각 스냅샷이 있는 샤드를 기록하는 선택적 구성입니다.
+
+    - 규정 1개 대상 조회(개정일, 목차, 히스토리, 상세)는 그 규정의 샤드에서만 실행
+    - 전체 규정 키워드 검색과 인용 분석은 스레드 풀로 모든 샤드에 나누어 실행한 뒤 통합 DB와 같은 순서로 병합
+      (sqlite3는 쿼리 실행 중 GIL을 풀어 주므로 코어 수만큼 병렬로 스캔됨)
+    - 재적재는 해당 샤드 파일만 잠그므로 다른 시장의 조회를 막지 않음
+
+샤드 DB는 regulation_db와 같은 스키마(init_db)를 쓰므로 조회 함수는 regulation_db의 것을 그대로 사용합니다.
+SHARD_DIR/catalog.db가 있으면 대시보드, 폴더 감시, DB 업데이트 작업이 자동으로 샤드 구성을 사용합니다.
+
+사용 예:
+    python regulation_shards.py load                  # '규정' Parquet/CSV를 시장별 샤드로 적재 (없으면 구성 생성)
+    python regulation_shards.py load --by regulation  # 규정별 샤드로 생성
+    python regulation_shards.py status
+"""
+
+import argparse
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import impact_report
+import perf_trace as perf
+import regulation_db as db
+
+SHARD_DIR = os.environ.get("REG_SHARD_DIR", "regulation_shards")
+CATALOG_FILE = "catalog.db"
+
+# 규정명에 포함된 시장 이름 -> 샤드 이름 (앞에서부터 검사, 파일명은 OS 간 한글 정규화 차이가 없도록 영문)
+MARKET_SHARDS = [
+    ("청산결제", "clearing"),
+    ("유가증권시장", "kospi"),
+    ("코스닥시장", "kosdaq"),
+    ("코넥스시장", "konex"),
+    ("파생상품시장", "derivatives"),
+]
+OTHER_SHARD = "other"
+SHARD_BY = ("market", "regulation")
+
+# 전체 규정 검색 시 동시에 조회할 샤드 수
+FANOUT_WORKERS = os.cpu_count() or 4
+
+
+# ----------------------------------------------------------------------
+# 1. 구성 및 연결
+# ----------------------------------------------------------------------
+def is_enabled(shard_dir=None):
+    return os.path.exists(os.path.join(shard_dir or SHARD_DIR, CATALOG_FILE))
+
+def shard_path(shard, shard_dir=None):
+    return os.path.join(shard_dir or SHARD_DIR, f"{shard}.db")
+
+def connect_catalog(shard_dir=None):
+    return db.get_connection(os.path.join(shard_dir or SHARD_DIR, CATALOG_FILE))
+
+def init_catalog(shard_dir=None, by="market"):
+    """카탈로그 DB 생성. 분할 기준(by)은 처음 만들 때 한 번 정해지며 db_meta에 기록됨"""
+    os.makedirs(shard_dir or SHARD_DIR, exist_ok=True)
+    conn = connect_catalog(shard_dir)
+    try:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS regulation_catalog ({', '.join(db.CATALOG_COLUMNS)}, shard TEXT, "
+                     "PRIMARY KEY(regulation_name, reg_date))")
+        conn.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT OR IGNORE INTO db_meta (key, value) VALUES ('shard_by', ?)", (by,))
+        conn.commit()
+        return conn.execute("SELECT value FROM db_meta WHERE key='shard_by'").fetchone()[0]
+    finally:
+        conn.close()
+
+def shard_of(reg_name, by="market"):
+    if by == "regulation":
+        return re.sub(r"\s+", "_", unicodedata.normalize("NFC", reg_name))
+    for market, shard in MARKET_SHARDS:
+        if market in reg_name: return shard
+    return OTHER_SHARD
+
+def list_shards(shard_dir=None):
+    conn = connect_catalog(shard_dir)
+    try: return [s for (s,) in conn.execute("SELECT DISTINCT shard FROM regulation_catalog ORDER BY shard")]
+    finally: conn.close()
+
+def shard_files(shard_dir=None):
+    return [shard_path(s, shard_dir) for s in list_shards(shard_dir)]
+
+def shard_map(shard_dir=None):
+    """{규정명: 샤드}"""
+    conn = connect_catalog(shard_dir)
+    try: return dict(conn.execute("SELECT DISTINCT regulation_name, shard FROM regulation_catalog"))
+    finally: conn.close()
+
+def get_data_version(shard_dir=None):
+    conn = connect_catalog(shard_dir)
+    try: return db.get_data_version(conn)
+    finally: conn.close()
+
+
+# ----------------------------------------------------------------------
+# 2. 적재 (샤드마다 별도 트랜잭션, 끝나면 카탈로그 동기화)
+# ----------------------------------------------------------------------
+def sync_catalog(shard, shard_dir=None):
+    """샤드의 regulation_catalog를 카탈로그 DB에 반영하고 data_version을 올림"""
+    cols = ", ".join(db.CATALOG_COLUMNS)
+    shard_conn = db.get_connection(shard_path(shard, shard_dir))
+    try: rows = shard_conn.execute(f"SELECT {cols} FROM regulation_catalog").fetchall()
+    finally: shard_conn.close()
+
+    conn = connect_catalog(shard_dir)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM regulation_catalog WHERE shard=?", (shard,))
+        cursor.executemany(f"INSERT OR REPLACE INTO regulation_catalog ({cols}, shard) VALUES ({', '.join('?' * (len(db.CATALOG_COLUMNS) + 1))})",
+                           [(*row, shard) for row in rows])
+        db.bump_data_version(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+def update_impact_reports(shard_dir=None):
+    """모든 샤드의 최신 스냅샷으로 인용 관계를 만들어 개정 영향 보고서를 카탈로그 DB에 저장 (샤드 간 인용 포함)"""
+    sources = [db.get_connection(f) for f in shard_files(shard_dir)]
+    conn = connect_catalog(shard_dir)
+    try:
+        with perf.span("impact_report_build"):
+            built = impact_report.update_reports(sources, conn.cursor())
+        if built: db.bump_data_version(conn.cursor())
+        conn.commit()
+        return built
+    finally:
+        conn.close()
+        for c in sources: c.close()
+
+def group_by_shard(csv_paths, by):
+    groups = defaultdict(list)
+    for path in csv_paths:
+        reg_name, reg_date = db.parse_filename_info(path)
+        if reg_date: groups[shard_of(reg_name, by)].append(path)
+    return dict(sorted(groups.items()))
+
+def load_files(data_dir=None, shard_dir=None, progress=None, by="market"):
+    """db.load_files와 같은 증분 적재를 샤드별로 실행. (적재 수, 건너뜀 수) 반환"""
+    data_dir = data_dir or db.DATA_DIR
+    by = init_catalog(shard_dir, by)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        return -1, 0
+
+    files = db.data_files(data_dir)
+    groups = group_by_shard(files, by)
+    count = skipped = done = 0
+    for shard, paths in groups.items():
+        def shard_progress(frac, name, base=done, n=len(paths)):
+            if progress: progress((base + frac * n) / len(files), f"[{shard}] {name}")
+        loaded, skip = db.load_csv_paths(paths, shard_path(shard, shard_dir), shard_progress, impact=False)
+        if loaded: sync_catalog(shard, shard_dir)
+        count, skipped, done = count + loaded, skipped + skip, done + len(paths)
+    if count: update_impact_reports(shard_dir)
+    return count, skipped
+
+def ingest_csv_files(csv_paths, shard_dir=None):
+    """db.ingest_csv_files를 샤드별로 실행 (샤드 하나씩 잠금). 적재한 (규정명, 개정일, 행 수) 목록 반환"""
+    by = init_catalog(shard_dir)
+    loaded = []
+    for shard, paths in group_by_shard(csv_paths, by).items():
+        loaded += db.ingest_csv_files(paths, shard_path(shard, shard_dir), impact=False)
+        sync_catalog(shard, shard_dir)
+    if loaded:
+        invalidate_reports([(reg_name, reg_date) for reg_name, reg_date, _ in loaded], shard_dir)
+        update_impact_reports(shard_dir)
+    return loaded
+
+def delete_snapshots(snapshots, shard_dir=None):
+    """db.delete_snapshots를 스냅샷이 있는 샤드별로 실행하고 카탈로그 DB의 목록과 영향 보고서를 갱신. 삭제한 목록 반환"""
+    shards = shard_map(shard_dir)
+    groups = defaultdict(list)
+    for reg_name, reg_date in snapshots:
+        if reg_name in shards: groups[shards[reg_name]].append((reg_name, reg_date))
+    deleted = []
+    for shard, targets in sorted(groups.items()):
+        deleted += db.delete_snapshots(targets, shard_path(shard, shard_dir), impact=False)
+        sync_catalog(shard, shard_dir)
+    if deleted:
+        invalidate_reports(deleted, shard_dir, drop=True)
+        update_impact_reports(shard_dir)
+    return deleted
+
+def invalidate_reports(snapshots, shard_dir=None, drop=False):
+    """교체(drop=False) 또는 삭제(drop=True)한 스냅샷과 관련된 카탈로그 DB의 영향 보고서를 다시 만들도록 표시"""
+    conn = connect_catalog(shard_dir)
+    try:
+        cursor = conn.cursor()
+        for reg_name, reg_date in snapshots:
+            (db.drop_impact_reports if drop else db.invalidate_impact_reports)(cursor, reg_name, reg_date)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# 3. 조회 (규정 1개는 해당 샤드로, 전체 검색은 병렬 fan-out 후 병합)
+# ----------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="shard")
+        return _pool
+
+def _call(shard, shard_dir, fn, args):
+    conn = db.get_connection(shard_path(shard, shard_dir))
+    try: return fn(conn, *args)
+    finally: conn.close()
+
+def run(reg_name, fn, *args, shard_dir=None):
+    """fn(conn, *args)를 reg_name이 있는 샤드에서 실행"""
+    shard = shard_map(shard_dir).get(reg_name)
+    if shard is None:
+        raise KeyError(f"카탈로그에 없는 규정입니다: {reg_name}")
+    return _call(shard, shard_dir, fn, args)
+
+def fan_out(fn, *args, shard_dir=None):
+    """fn(conn, *args)를 모든 샤드에서 병렬 실행. 결과는 샤드 이름 순 목록"""
+    shards = list_shards(shard_dir)
+    with perf.span("fanout", shards=len(shards)):
+        return list(_get_pool().map(perf.wrap(lambda s: _call(s, shard_dir, fn, args)), shards))
+
+def _merge_rows(frames):
+    """샤드별 결과를 통합 DB의 ORDER BY regulation_name, reg_date DESC, id와 같은 순서로 병합
+    (한 규정은 한 샤드에만 있으므로 샤드 안의 순서를 유지한 채 규정명/개정일로 안정 정렬하면 됨)"""
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    df = pd.concat(frames, ignore_index=True)
+    by = [c for c in ("regulation_name", "reg_date") if c in df.columns]
+    return df.sort_values(by, ascending=[True, False][:len(by)], kind="stable").reset_index(drop=True)
+
+def search_keyword(keyword, target=None, latest=True, collapse=False, shard_dir=None):
+    if target is not None:
+        return run(target, db.search_keyword, keyword, target, latest, collapse, shard_dir=shard_dir)
+    results = fan_out(db.search_keyword, keyword, None, latest, collapse, shard_dir=shard_dir)
+    df = _merge_rows([r[0] for r in results])
+    facets = pd.concat([r[1] for r in results], ignore_index=True)
+    facets = facets.groupby(["facet", "value"], sort=False, as_index=False)["hits"].sum()
+    return df, facets
+
+def find_citation_rows(kind, target_reg, target_art, latest_only=True, deadline=None, shard_dir=None):
+    """db.find_citation_rows를 샤드에서 실행. 내부 참조는 대상 규정의 샤드만, 나머지는 모든 샤드에서 찾아 병합"""
+    args = (kind, target_reg, target_art, latest_only, deadline)
+    if kind == "internal": return run(target_reg, db.find_citation_rows, *args, shard_dir=shard_dir)
+    frames = fan_out(db.find_citation_rows, *args, shard_dir=shard_dir)
+    df = pd.concat([f for f in frames if not f.empty] or frames[:1], ignore_index=True)
+    # 통합 DB 쿼리의 ORDER BY regulation_name, id 순서 (한 규정은 한 샤드에만 있음)
+    return df.sort_values("regulation_name", kind="stable").reset_index(drop=True)
+
+def find_citations(target_reg, target_art, latest_only=True, shard_dir=None):
+    result = db.citation_terms(target_reg, target_art)
+    for kind in db.CITATION_KINDS:
+        result[kind] = find_citation_rows(kind, target_reg, target_art, latest_only, shard_dir=shard_dir)
+    return result
+
+
+# ----------------------------------------------------------------------
+# 4. CLI
+# ----------------------------------------------------------------------
+def print_status(shard_dir=None):
+    if not is_enabled(shard_dir):
+        print(f"'{shard_dir or SHARD_DIR}'에 샤드 구성이 없습니다. 'python regulation_shards.py load'로 생성하세요.")
+        return
+    conn = connect_catalog(shard_dir)
+    try:
+        by = conn.execute("SELECT value FROM db_meta WHERE key='shard_by'").fetchone()[0]
+        stats = conn.execute("""
+            SELECT shard, COUNT(DISTINCT regulation_name), COUNT(*), SUM(row_count)
+            FROM regulation_catalog GROUP BY shard ORDER BY shard
+        """).fetchall()
+    finally:
+        conn.close()
+    print(f"분할 기준: {by}, 데이터 버전: {get_data_version(shard_dir)}")
+    print(f"{'샤드':<40} {'규정':>4} {'스냅샷':>6} {'행':>9} {'MB':>7}")
+    for shard, regs, snaps, rows in stats:
+        size = os.path.getsize(shard_path(shard, shard_dir)) / 1e6
+        print(f"{shard:<40} {regs:>4} {snaps:>6} {rows:>9,} {size:>7.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="시장별/규정별 샤드 DB 적재 및 상태 확인")
+    parser.add_argument("command", choices=["load", "status"])
+    parser.add_argument("--data-dir", default=db.DATA_DIR, help="규정 폴더 (Parquet/CSV, 기본: 규정)")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help=f"샤드 폴더 (기본: {SHARD_DIR})")
+    parser.add_argument("--by", choices=SHARD_BY, default="market", help="분할 기준 (처음 생성할 때만 적용)")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        by = init_catalog(args.shard_dir, args.by)
+        if by != args.by:
+            print(f"[알림] 기존 구성의 분할 기준({by})을 그대로 사용합니다.")
+        count, skipped = load_files(args.data_dir, args.shard_dir, by=by,
+                                    progress=lambda frac, name: print(f"\r[{frac:5.1%}] {name[:60]:<60}", end="", flush=True))
+        print(f"\n적재 {count}개, 건너뜀 {skipped}개")
+    print_status(args.shard_dir)
+
+
+if __name__ == "__main__":
+    main()
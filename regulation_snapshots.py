@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스냅샷 단위 교체/삭제 CLI
+잘못 파싱된 스냅샷(규정명, 개정일) 하나를 고치려고 DB 전체를 지우고 다시 적재하지 않도록,
+파일 하나만 다시 적재(교체)하거나 스냅샷을 삭제합니다.
+
+    - 교체: 새 파일을 임시(staging) 테이블에 먼저 읽어 둔 뒤, 한 트랜잭션에서 기존 행을 지우고 옮겨 넣음.
+      원본 해시가 같아도 다시 적재하므로 파서를 고친 뒤 같은 파일을 다시 넣을 때도 사용
+    - 삭제: 행과 목차, 용어 사전, 카탈로그, 영향 보고서를 한 트랜잭션에서 삭제
+    - 두 경우 모두 그 스냅샷의 파생 테이블만 다시 만들고, 최신 여부가 바뀐 스냅샷의 유사 조항 벡터·본문 위치 색인·
+      영향 보고서만 갱신하므로 비용은 전체 데이터가 아니라 바뀐 파일 크기에 비례합니다.
+      읽는 쪽(WAL)은 커밋 전까지 이전 스냅샷 전체를, 커밋 후에는 새 스냅샷 전체를 봅니다.
+
+샤드 구성(regulation_shards)이 있으면 해당 규정의 샤드만 잠그고 처리합니다.
+
+사용 예:
+    python regulation_snapshots.py list --reg "유가증권시장 업무규정"
+    python regulation_snapshots.py replace "규정/유가증권시장 업무규정_전문_20260129.parquet"
+    python regulation_snapshots.py delete "유가증권시장 업무규정" 20260129
+"""
+
+import argparse
+import os
+import time
+
+import regulation_db as db
+import regulation_shards as shards
+
+
+def use_shards(db_file):
+    return db_file is None and shards.is_enabled()
+
+def connect_catalog(db_file):
+    if use_shards(db_file): return shards.connect_catalog()
+    db.init_db(db_file)
+    return db.get_connection(db_file)
+
+def list_snapshots(db_file=None, reg_name=None):
+    conn = connect_catalog(db_file)
+    try:
+        sql = "SELECT regulation_name, reg_date, row_count, article_count, source_file, ingested_at FROM regulation_catalog"
+        params = ()
+        if reg_name:
+            sql += " WHERE regulation_name = ?"
+            params = (reg_name,)
+        rows = conn.execute(sql + " ORDER BY regulation_name, reg_date DESC", params).fetchall()
+    finally:
+        conn.close()
+    for name, date, row_count, article_count, source_file, ingested_at in rows:
+        print(f"{name:<36} {date}  {row_count:>6,}행 {article_count:>4}조  {ingested_at or '-':<19}  {source_file or '-'}")
+    print(f"스냅샷 {len(rows)}개")
+
+def replace_files(paths, db_file=None):
+    """파일(Parquet/CSV)의 스냅샷을 해시와 상관없이 교체. 적재한 (규정명, 개정일, 행 수) 목록 반환"""
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing: raise FileNotFoundError(f"파일이 없습니다: {', '.join(missing)}")
+    if use_shards(db_file): return shards.ingest_csv_files(paths)
+    return db.ingest_csv_files(paths, db_file)
+
+def delete_snapshots(snapshots, db_file=None):
+    if use_shards(db_file): return shards.delete_snapshots(snapshots)
+    return db.delete_snapshots(snapshots, db_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스냅샷(규정명, 개정일) 단위 교체/삭제")
+    parser.add_argument("--db", default=None, help=f"DB 파일 (기본: 샤드 구성이 있으면 샤드, 없으면 {db.DB_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="적재된 스냅샷 목록")
+    p.add_argument("--reg", default=None, help="규정명")
+    p = sub.add_parser("replace", help="파일의 스냅샷을 다시 적재 (없으면 추가)")
+    p.add_argument("paths", nargs="+", help="Parquet/CSV 파일 (파일명: 규정명_전문_YYYYMMDD)")
+    p = sub.add_parser("delete", help="스냅샷 삭제")
+    p.add_argument("reg_name", help="규정명")
+    p.add_argument("dates", nargs="+", help="개정일 (YYYYMMDD)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.command == "list":
+        list_snapshots(args.db, args.reg)
+        return
+    if args.command == "replace":
+        for reg_name, reg_date, rows in replace_files(args.paths, args.db):
+            print(f"  교체: {reg_name} ({reg_date}) {rows:,}행")
+    elif args.command == "delete":
+        deleted = delete_snapshots([(args.reg_name, d) for d in args.dates], args.db)
+        for reg_name, reg_date in deleted:
+            print(f"  삭제: {reg_name} ({reg_date})")
+        for d in sorted(set(args.dates) - {d for _, d in deleted}):
+            print(f"  [건너뜀] 적재되지 않은 스냅샷: {args.reg_name} ({d})")
+    print(f"완료: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
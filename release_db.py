@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+배포용 읽기 전용 DB 빌드
+조회만 하는 배포 환경(Streamlit Cloud 데모, 사내 조회 서버)용으로 regulation_master.db를 정리한 단일 파일을 만듭니다.
+
+    - 스키마/카탈로그/인덱스를 최신화하고, 목차(regulation_toc)와 유사 조항 벡터, 본문 위치 색인이 빠진 스냅샷은 다시 생성
+    - VACUUM INTO로 빈 페이지 없이 복사한 뒤 페이지 크기를 바꾸고, 롤백 저널(WAL 아님) 모드로 저장
+    - ANALYZE 통계(sqlite_stat1)를 미리 만들어 두고 integrity_check 결과와 행 수, 크기를 db_meta(release_*)에 기록
+    - 같은 이름의 .json 파일에 위 통계와 SHA-256을 함께 저장 (컨테이너에서 배포 파일 검증용)
+
+RELEASE_DB_FILE이 있으면 대시보드는 이 파일을 mode=ro&immutable=1로 열어(잠금/WAL 확인 생략, mmap 사용)
+조회하고, 사이드바의 변환/DB 업데이트 버튼은 숨깁니다. 샤드 구성(regulation_shards)이 있으면 샤드가 우선입니다.
+
+사용 예:
+    python release_db.py build                         # regulation_master.db -> regulation_release.db
+    python release_db.py build --page-size 8192 --dest /app/regulation_release.db
+    python release_db.py info                          # 기록된 빌드 정보 출력
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import regulation_db as db
+import similarity
+import text_index
+
+# 본문(content) 행이 길어 기본값(4096)보다 큰 페이지에서 LIKE 전체 스캔과 인덱스 탐색이 빠름
+RELEASE_PAGE_SIZE = 16384
+PAGE_SIZES = (4096, 8192, 16384, 32768, 65536)
+
+
+# ----------------------------------------------------------------------
+# 1. 감지 및 정보 조회
+# ----------------------------------------------------------------------
+def is_enabled(db_file=None):
+    return os.path.exists(db_file or db.RELEASE_DB_FILE)
+
+def manifest_path(db_file=None):
+    return os.path.splitext(db_file or db.RELEASE_DB_FILE)[0] + ".json"
+
+def read_info(db_file=None):
+    """db_meta에 기록된 빌드 정보 {키: 값} (release_ 접두어 제외)"""
+    conn = db.get_readonly_connection(db_file)
+    try:
+        rows = conn.execute("SELECT key, value FROM db_meta WHERE key LIKE 'release\\_%' ESCAPE '\\'").fetchall()
+    finally:
+        conn.close()
+    return {k[len("release_"):]: v for k, v in rows}
+
+
+# ----------------------------------------------------------------------
+# 2. 빌드
+# ----------------------------------------------------------------------
+def rebuild_missing_toc(conn):
+    """목차가 없는 스냅샷(목차 도입 전에 적재된 DB)의 목차를 생성. 생성한 스냅샷 수 반환"""
+    missing = conn.execute("""
+        SELECT c.regulation_name, c.reg_date FROM regulation_catalog c
+        WHERE NOT EXISTS (SELECT 1 FROM regulation_toc t WHERE t.regulation_name = c.regulation_name AND t.reg_date = c.reg_date)
+    """).fetchall()
+    cursor = conn.cursor()
+    for reg_name, reg_date in missing:
+        db.rebuild_toc(cursor, reg_name, reg_date)
+    conn.commit()
+    return len(missing)
+
+def collect_stats(conn):
+    tables = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    return {
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+        "indexes": conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='index'").fetchone()[0],
+        "regulations": conn.execute("SELECT COUNT(DISTINCT regulation_name) FROM regulation_catalog").fetchone()[0],
+        "snapshots": conn.execute("SELECT COUNT(*) FROM regulation_catalog").fetchone()[0],
+        "rows": {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables},
+    }
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    return h.hexdigest()
+
+def build(src=None, dest=None, page_size=RELEASE_PAGE_SIZE, log=print):
+    """src(기본 regulation_master.db)로 배포용 DB를 만들고 기록한 통계를 반환.
+    임시 파일에 만든 뒤 rename하므로, 이미 열려 있는 immutable 연결은 이전 파일을 계속 읽음"""
+    src, dest = src or db.DB_FILE, dest or db.RELEASE_DB_FILE
+    if not os.path.exists(src):
+        raise FileNotFoundError(f"원본 DB가 없습니다: {src}")
+    if page_size not in PAGE_SIZES:
+        raise ValueError(f"page_size는 {PAGE_SIZES} 중 하나여야 합니다.")
+    started = time.perf_counter()
+
+    # 1) 원본 최신화: 새 테이블/인덱스/카탈로그(init_db)와 빠진 목차, 유사 조항 벡터, 본문 위치 색인
+    db.init_db(src)
+    tmp = dest + ".tmp"
+    if os.path.exists(tmp): os.remove(tmp)
+    conn = db.get_connection(src)
+    try:
+        rebuilt = rebuild_missing_toc(conn)
+        if rebuilt: log(f"목차 재생성: {rebuilt}개 스냅샷")
+        rebuilt = similarity.update_vectors(conn.cursor())
+        conn.commit()
+        if rebuilt: log(f"유사 조항 벡터 생성: {rebuilt}개 스냅샷")
+        rebuilt = text_index.update_postings(conn.cursor())
+        conn.commit()
+        if rebuilt: log(f"본문 위치 색인 생성: {rebuilt}개 스냅샷")
+        data_version = db.get_data_version(conn)
+        # 2) 쓰기 중인 WAL 내용까지 포함한 일관된 스냅샷을 빈 페이지 없이 복사
+        conn.execute("VACUUM INTO ?", (tmp,))
+    finally:
+        conn.close()
+
+    # 3) 페이지 크기 변경은 WAL이 아닐 때 VACUUM으로만 적용됨
+    out = sqlite3.connect(tmp)
+    try:
+        out.execute("PRAGMA journal_mode=DELETE")
+        out.execute(f"PRAGMA page_size={page_size}")
+        out.execute("VACUUM")
+        out.execute("ANALYZE")
+        integrity = out.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != "ok":
+            raise RuntimeError(f"integrity_check 실패: {integrity}")
+
+        stats = {
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "source": os.path.abspath(src),
+            "data_version": data_version,
+            "sqlite_version": sqlite3.sqlite_version,
+            "integrity": integrity,
+            **collect_stats(out),
+        }
+        out.executemany("INSERT OR REPLACE INTO db_meta (key, value) VALUES (?, ?)",
+                        [(f"release_{k}", json.dumps(v, ensure_ascii=False) if isinstance(v, dict) else str(v))
+                         for k, v in stats.items()])
+        out.commit()
+    except Exception:
+        out.close()
+        os.remove(tmp)
+        raise
+    out.close()
+
+    os.replace(tmp, dest)
+    stats.update(file=os.path.abspath(dest), size_bytes=os.path.getsize(dest), sha256=file_sha256(dest),
+                 build_sec=round(time.perf_counter() - started, 2))
+    with open(manifest_path(dest), "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
+    return stats
+
+
+# ----------------------------------------------------------------------
+# 3. CLI
+# ----------------------------------------------------------------------
+def print_info(stats):
+    rows = stats["rows"] if isinstance(stats["rows"], dict) else json.loads(stats["rows"])
+    print(f"빌드 시각: {stats['built_at']} (원본 데이터 버전 {stats['data_version']}, SQLite {stats['sqlite_version']})")
+    print(f"규정 {stats['regulations']}개, 스냅샷 {stats['snapshots']}개, 인덱스 {stats['indexes']}개, 무결성: {stats['integrity']}")
+    print(f"페이지 {int(stats['page_count']):,}개 x {stats['page_size']}B (빈 페이지 {stats['freelist_count']}개)")
+    for table, n in rows.items():
+        print(f"  {table:<24} {n:>10,}행")
+    if "sha256" in stats:
+        print(f"파일: {stats['file']} ({stats['size_bytes'] / 1e6:.1f}MB, {stats['build_sec']}s)\nSHA-256: {stats['sha256']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="배포용 읽기 전용 DB 빌드 및 정보 확인")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--src", default=db.DB_FILE, help=f"원본 DB (기본: {db.DB_FILE})")
+    parser.add_argument("--dest", default=db.RELEASE_DB_FILE, help=f"배포용 DB 경로 (기본: {db.RELEASE_DB_FILE})")
+    parser.add_argument("--page-size", type=int, choices=PAGE_SIZES, default=RELEASE_PAGE_SIZE, help="페이지 크기(바이트)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print_info(build(args.src, args.dest, args.page_size))
+    elif not is_enabled(args.dest):
+        print(f"'{args.dest}'가 없습니다. 'python release_db.py build'로 생성하세요.")
+    else:
+        print_info(read_info(args.dest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+유사 조항 검색 (문자 n-gram TF-IDF)
+최신 스냅샷의 모든 행(조명 + 내용)을 문자 2-gram/3-gram으로 나누고 해시한 희소 벡터로 만들어,
+선택한 조항과 코사인 유사도가 높은 행을 다른 시장 규정이나 시행세칙에서 찾습니다.
+
+    - 적재 시: 새로 적재되어 최신이 된 스냅샷만 벡터화해 similarity_vectors 테이블에 저장(행별 n-gram 빈도, CSR 배열)
+      하고, 더 이상 최신이 아닌 스냅샷의 벡터는 삭제 (regulation_db 적재 함수가 같은 트랜잭션에서 호출)
+    - 조회 시: 저장된 빈도로 IDF 가중치와 열(특징) 기준 역색인을 메모리에 만든 뒤(SimilarityIndex),
+      질의 행의 특징이 나오는 열만 더해 유사도를 계산
+
+scipy 없이 numpy 배열만 사용합니다. 특징 해시는 코드 포인트로 계산하므로 프로세스/실행 환경이 달라도 같습니다.
+"""
+
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# 특징(해시 버킷) 수와 n-gram 길이
+FEATURE_BITS = 20
+N_FEATURES = 1 << FEATURE_BITS
+NGRAM_SIZES = (2, 3)
+_HASH_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+DEFAULT_TOP_K = 10
+
+LATEST_SQL = "SELECT regulation_name, MAX(reg_date) FROM regulation_catalog GROUP BY regulation_name"
+
+
+# ----------------------------------------------------------------------
+# 1. 벡터화
+# ----------------------------------------------------------------------
+def row_text(title, content):
+    return re.sub(r"\s+", " ", f"{title or ''} {content or ''}").strip()
+
+def vectorize(texts, sizes=NGRAM_SIZES, bits=FEATURE_BITS):
+    """텍스트 목록 -> 행별 n-gram 해시 빈도 CSR 배열 (indptr, features, counts)
+    모든 행을 이어 붙인 코드 포인트 배열에서 한 번에 해시하고, 행 경계를 넘는 n-gram은 버림.
+    특징 값은 bits 비트 해시(0 ~ 2^bits - 1)이며 행 안에서 오름차순"""
+    lengths = np.array([len(t) for t in texts], dtype=np.int64)
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    row_of = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+    keys = []
+    for n in sizes:
+        if len(codes) < n: continue
+        m = len(codes) - n + 1
+        h = np.full(m, np.uint64(n))
+        for j in range(n):
+            h = (h ^ codes[j:j + m]) * _HASH_MUL
+        valid = row_of[:m] == row_of[n - 1:]
+        feat = (h[valid] >> np.uint64(64 - bits)).astype(np.int64)
+        keys.append((row_of[:m][valid] << bits) | feat)
+
+    keys, counts = np.unique(np.concatenate(keys) if keys else np.empty(0, np.int64), return_counts=True)
+    rows, features = keys >> bits, keys & ((1 << bits) - 1)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(texts)))])
+    return (indptr.astype(np.int64), features.astype(np.int32 if bits < 32 else np.int64),
+            np.minimum(counts, 65535).astype(np.uint16))
+
+def _pack(arr):
+    return zlib.compress(arr.tobytes(), 1)
+
+def _unpack(blob, dtype):
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype)
+
+
+# ----------------------------------------------------------------------
+# 2. 적재 시 갱신 (증분)
+# ----------------------------------------------------------------------
+def store_snapshot_vectors(cursor, reg_name, reg_date):
+    rows = cursor.execute(
+        "SELECT id, article_title, content FROM regulation_history WHERE regulation_name=? AND reg_date=? ORDER BY id",
+        (reg_name, reg_date)).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    indptr, features, counts = vectorize([row_text(r[1], r[2]) for r in rows])
+    cursor.execute('''
+        INSERT OR REPLACE INTO similarity_vectors
+        (regulation_name, reg_date, row_count, first_id, row_ids, indptr, features, counts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (reg_name, reg_date, len(ids), int(ids[0]) if len(ids) else None,
+          _pack(ids), _pack(indptr), _pack(features), _pack(counts)))
+
+def update_vectors(cursor):
+    """최신 스냅샷 중 벡터가 없거나 다시 적재되어 행이 바뀐 스냅샷만 벡터화하고, 최신이 아닌 스냅샷 벡터는 삭제.
+    갱신한 스냅샷 수 반환"""
+    stale = cursor.execute(f'''
+        SELECT l.regulation_name, l.reg_date FROM (
+            SELECT c.regulation_name, c.reg_date,
+                   (SELECT COUNT(*) FROM regulation_history h WHERE h.regulation_name = c.regulation_name AND h.reg_date = c.reg_date) AS row_count,
+                   (SELECT MIN(id) FROM regulation_history h WHERE h.regulation_name = c.regulation_name AND h.reg_date = c.reg_date) AS first_id
+            FROM regulation_catalog c WHERE (c.regulation_name, c.reg_date) IN ({LATEST_SQL})
+        ) l
+        LEFT JOIN similarity_vectors v ON v.regulation_name = l.regulation_name AND v.reg_date = l.reg_date
+        WHERE v.regulation_name IS NULL OR v.row_count != l.row_count OR v.first_id IS NOT l.first_id
+    ''').fetchall()
+    for reg_name, reg_date in stale:
+        store_snapshot_vectors(cursor, reg_name, reg_date)
+    cursor.execute(f"DELETE FROM similarity_vectors WHERE (regulation_name, reg_date) NOT IN ({LATEST_SQL})")
+    return len(stale)
+
+
+# ----------------------------------------------------------------------
+# 3. 조회용 인덱스
+# ----------------------------------------------------------------------
+class SimilarityIndex:
+    """최신 스냅샷 전체의 TF-IDF 행렬. 열(특징) 기준 역색인(col_ptr, col_rows, col_weights)과 행 정보(rows)를 보관"""
+
+    def __init__(self, meta, indptr, features, counts):
+        self.rows = meta.reset_index(drop=True)
+        n_rows = len(self.rows)
+        row_of = np.repeat(np.arange(n_rows, dtype=np.int32), np.diff(indptr))
+
+        # 가중치: (1 + log tf) * idf, 행별 L2 정규화
+        df = np.bincount(features, minlength=N_FEATURES)
+        self.idf = (np.log((1 + n_rows) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(counts.astype(np.float32))) * self.idf[features]
+        norms = np.sqrt(np.bincount(row_of, weights=weights * weights, minlength=n_rows)).astype(np.float32)
+        weights /= np.where(norms > 0, norms, 1)[row_of]
+
+        self.indptr, self.features, self.weights = indptr, features, weights
+        order = np.argsort(features, kind="stable")
+        self.col_ptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        self.col_rows = row_of[order]
+        self.col_weights = weights[order]
+
+    @classmethod
+    def load(cls, conns):
+        """DB 연결 목록(통합 DB 1개 또는 샤드들)에서 최신 스냅샷 벡터와 행 정보를 읽어 인덱스 생성"""
+        metas, indptrs, features, counts = [], [], [], []
+        offset = 0
+        for conn in conns:
+            for reg_name, reg_date, ids_blob, ptr_blob, feat_blob, cnt_blob in conn.execute(f'''
+                SELECT regulation_name, reg_date, row_ids, indptr, features, counts FROM similarity_vectors
+                WHERE (regulation_name, reg_date) IN ({LATEST_SQL}) ORDER BY regulation_name
+            '''):
+                ids = _unpack(ids_blob, np.int64)
+                meta = pd.DataFrame.from_records(conn.execute(
+                    "SELECT id, regulation_name, reg_date, ref_no, article_title, content FROM regulation_history "
+                    "WHERE regulation_name=? AND reg_date=? ORDER BY id", (reg_name, reg_date)).fetchall(),
+                    columns=["id", "regulation_name", "reg_date", "ref_no", "article_title", "content"])
+                # 벡터를 만든 뒤 스냅샷이 다시 적재되었으면(행 id가 다르면) 다음 적재 때까지 제외
+                if not np.array_equal(meta["id"].to_numpy(), ids): continue
+                ptr = _unpack(ptr_blob, np.int64)
+                metas.append(meta.drop(columns="id"))
+                indptrs.append(ptr[1:] + offset)
+                features.append(_unpack(feat_blob, np.int32))
+                counts.append(_unpack(cnt_blob, np.uint16))
+                offset += int(ptr[-1])
+        if not metas:
+            return cls(pd.DataFrame(columns=["regulation_name", "reg_date", "ref_no", "article_title", "content"]),
+                       np.zeros(1, np.int64), np.empty(0, np.int32), np.empty(0, np.uint16))
+        return cls(pd.concat(metas, ignore_index=True), np.concatenate([[0], *indptrs]),
+                   np.concatenate(features), np.concatenate(counts))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def find_rows(self, reg_name, ref):
+        """규정의 최신 스냅샷에서 조항 번호에 ref가 포함된 행 위치 (조회 메뉴의 LIKE '%ref%'와 같은 기준)"""
+        mask = (self.rows["regulation_name"] == reg_name) & self.rows["ref_no"].str.contains(ref, regex=False, na=False)
+        return np.flatnonzero(mask.to_numpy())
+
+    def scores(self, row):
+        """행 row와 모든 행의 코사인 유사도 (질의 행의 특징이 나오는 열만 합산)"""
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        q_feat, q_weight = self.features[lo:hi], self.weights[lo:hi]
+        starts, ends = self.col_ptr[q_feat], self.col_ptr[q_feat + 1]
+        lens = ends - starts
+        # 각 열의 [start, end) 구간 위치를 한 번에 펼침
+        pos = np.repeat(starts - np.concatenate([[0], np.cumsum(lens)[:-1]]), lens) + np.arange(lens.sum())
+        return np.bincount(self.col_rows[pos], weights=self.col_weights[pos] * np.repeat(q_weight, lens),
+                           minlength=len(self.rows))
+
+    def similar(self, row, k=DEFAULT_TOP_K, other_regulations=False):
+        """행 row와 유사한 상위 k개 행 (같은 스냅샷의 같은 조항 번호 행은 제외)
+        other_regulations=True면 같은 규정의 행을 모두 제외하고 다른 규정에서만 찾음"""
+        scores = self.scores(row)
+        reg_name, ref_no = self.rows.at[row, "regulation_name"], self.rows.at[row, "ref_no"]
+        same_reg = (self.rows["regulation_name"] == reg_name).to_numpy()
+        scores[same_reg if other_regulations else same_reg & (self.rows["ref_no"] == ref_no).to_numpy()] = -1
+        k = min(k, int((scores > 0).sum()))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, np.int64)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return self.rows.iloc[top].assign(similarity=scores[top].round(4)).reset_index(drop=True)
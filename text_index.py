@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+본문 위치 역색인 (음절 2-gram) 및 고급 검색 질의
+최신 스냅샷의 본문을 음절 2-gram 단위의 위치 역색인으로 만들어, LIKE 전체 스캔 없이
+AND/OR/NOT, 따옴표 구문, NEAR/k(k글자 이내) 조건을 게시 목록(posting list) 교집합으로 계산합니다.
+
+    - 적재 시: 새로 최신이 된 스냅샷만 색인을 만들어 text_postings 테이블에 저장하고(2-gram, 개수, 위치 배열),
+      최신이 아닌 스냅샷의 색인은 삭제 (similarity_vectors와 같은 방식, regulation_db 적재 함수가 같은 트랜잭션에서 호출)
+    - 조회 시: 저장된 색인을 합쳐 메모리에 전체 색인(TextIndex)을 만들고, 길이 L인 검색어는
+      L-1개 2-gram의 위치 목록을 i만큼 당겨 교집합해 시작 위치를 구함 (1글자 검색어는 그 글자로 시작하는 2-gram 전체)
+    - 결과: 검색 결과와 같은 열의 DataFrame + matches 열(본문 안의 일치 구간 [(시작, 끝)] - 강조 표시용)
+
+질의 문법 (연산자는 대문자):
+    공매도 호가                 두 단어 모두 (AND 생략 가능)
+    공매도 AND 호가 NOT 시간외   NOT은 앞 조건에서 제외
+    증거금 OR 담보
+    "매매거래의 정지"            따옴표 안은 공백까지 그대로 일치
+    증거금 NEAR/20 위탁         두 일치 구간 사이가 20글자 이내 (같은 행, 순서 무관. NEAR만 쓰면 10글자)
+    (공매도 OR 대차) AND 호가    괄호로 묶기
+
+전체 개정본 대상 검색은 색인이 없으므로, 검색어가 들어 있는 후보 행만 읽어 같은 방식으로 계산합니다(search_scan).
+
+사용 예:
+    python text_index.py search "공매도 AND 호가 NOT 시간외"
+    python text_index.py search "증거금 NEAR/20 위탁" --reg "파생상품시장 업무규정"
+    python text_index.py build                       # 색인이 없는 최신 스냅샷만 생성
+"""
+
+import argparse
+import re
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_NEAR = 10
+# 2-gram 키: (앞 글자 코드 포인트 << 21) | 뒤 글자 코드 포인트. 행 사이 구분 문자는 0
+_CODE_BITS = 21
+_SEP = "\x00"
+# LIKE와 같이 영문 대소문자는 구분하지 않음 (글자 수가 바뀌지 않도록 ASCII만 변환)
+_FOLD = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+LATEST_SQL = "SELECT regulation_name, MAX(reg_date) FROM regulation_catalog GROUP BY regulation_name"
+
+# 검색 결과 행 정보 (regulation_db.search_keyword의 hits 테이블과 같은 열)
+META_COLUMNS = ["id", "regulation_name", "reg_date", "ref_no", "article_title", "content", "level", "chapter"]
+META_SELECT = """
+    SELECT id, regulation_name, reg_date, ref_no, article_title, COALESCE(content, '') AS content,
+           COALESCE(level, '') AS level,
+           CASE WHEN COALESCE(chapter_no, '') = '' THEN '' ELSE '제' || chapter_no || '장 ' || chapter_title END AS chapter
+    FROM regulation_history
+"""
+
+
+# ----------------------------------------------------------------------
+# 1. 색인 생성
+# ----------------------------------------------------------------------
+def build_postings(texts):
+    """텍스트 목록 -> (2-gram 키, 키별 위치 수, 키 순서로 정렬한 위치) - 위치는 구분 문자로 이은 전체 텍스트 기준
+    모든 글자가 자기 위치에서 시작하는 2-gram을 하나씩 갖도록 행 끝 글자는 (글자, 구분 문자)로 색인"""
+    joined = (_SEP.join(texts) + _SEP).translate(_FOLD)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    keys = (codes[:-1] << _CODE_BITS) | codes[1:]
+    pos = np.flatnonzero(codes[:-1] != 0)
+    keys = keys[pos]
+    order = np.argsort(keys, kind="stable")
+    uniq, counts = np.unique(keys[order], return_counts=True)
+    return uniq, counts.astype(np.int32), pos[order].astype(np.int32)
+
+def _pack(arr):
+    return zlib.compress(arr.tobytes(), 1)
+
+def _unpack(blob, dtype):
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype)
+
+
+# ----------------------------------------------------------------------
+# 2. 적재 시 갱신 (증분)
+# ----------------------------------------------------------------------
+def store_snapshot_postings(cursor, reg_name, reg_date):
+    rows = cursor.execute(
+        "SELECT id, COALESCE(content, '') FROM regulation_history WHERE regulation_name=? AND reg_date=? ORDER BY id",
+        (reg_name, reg_date)).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    keys, counts, positions = build_postings([r[1] for r in rows])
+    cursor.execute('''
+        INSERT OR REPLACE INTO text_postings
+        (regulation_name, reg_date, row_count, first_id, row_ids, gram_keys, gram_counts, positions)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (reg_name, reg_date, len(ids), int(ids[0]) if len(ids) else None,
+          _pack(ids), _pack(keys), _pack(counts), _pack(positions)))
+
+def update_postings(cursor):
+    """최신 스냅샷 중 색인이 없거나 다시 적재되어 행이 바뀐 스냅샷만 색인하고, 최신이 아닌 스냅샷 색인은 삭제.
+    갱신한 스냅샷 수 반환"""
+    stale = cursor.execute(f'''
+        SELECT l.regulation_name, l.reg_date FROM (
+            SELECT c.regulation_name, c.reg_date,
+                   (SELECT COUNT(*) FROM regulation_history h WHERE h.regulation_name = c.regulation_name AND h.reg_date = c.reg_date) AS row_count,
+                   (SELECT MIN(id) FROM regulation_history h WHERE h.regulation_name = c.regulation_name AND h.reg_date = c.reg_date) AS first_id
+            FROM regulation_catalog c WHERE (c.regulation_name, c.reg_date) IN ({LATEST_SQL})
+        ) l
+        LEFT JOIN text_postings t ON t.regulation_name = l.regulation_name AND t.reg_date = l.reg_date
+        WHERE t.regulation_name IS NULL OR t.row_count != l.row_count OR t.first_id IS NOT l.first_id
+    ''').fetchall()
+    for reg_name, reg_date in stale:
+        store_snapshot_postings(cursor, reg_name, reg_date)
+    cursor.execute(f"DELETE FROM text_postings WHERE (regulation_name, reg_date) NOT IN ({LATEST_SQL})")
+    return len(stale)
+
+
+# ----------------------------------------------------------------------
+# 3. 질의 파싱
+# ----------------------------------------------------------------------
+_TOKEN = re.compile(r'"([^"]*)"?|(\()|(\))|NEAR(?:/(\d+))?(?=[\s("]|$)|(AND|OR|NOT)(?=[\s("]|$)|([^\s()"]+)')
+
+def tokenize(query):
+    tokens = []
+    for m in _TOKEN.finditer(query):
+        phrase, lp, rp, near_k, op, word = m.groups()
+        if phrase is not None:
+            if phrase: tokens.append(("term", phrase))
+        elif lp: tokens.append(("(", None))
+        elif rp: tokens.append((")", None))
+        elif op: tokens.append((op, None))
+        elif word: tokens.append(("term", word))
+        else: tokens.append(("NEAR", int(near_k) if near_k else DEFAULT_NEAR))
+    return tokens
+
+def parse_query(query):
+    """질의 문자열 -> 구문 트리
+    ("term", 문자열) | ("and", a, b) | ("or", a, b) | ("not", a) | ("near", k, a, b)
+    우선순위: 괄호 > NEAR > NOT > AND(생략 가능) > OR"""
+    tokens = tokenize(query)
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == "OR":
+            take()
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_unary()
+        while peek() in ("AND", "NOT", "term", "("):
+            if peek() == "AND": take()
+            node = ("and", node, parse_unary())
+        return node
+
+    def parse_unary():
+        if peek() == "NOT":
+            take()
+            return ("not", parse_unary())
+        return parse_near()
+
+    def parse_near():
+        node = parse_primary()
+        while peek() == "NEAR":
+            k = take()[1]
+            node = ("near", k, node, parse_primary())
+        return node
+
+    def parse_primary():
+        kind = peek()
+        if kind == "term": return take()
+        if kind == "(":
+            take()
+            node = parse_or()
+            if peek() != ")": raise ValueError("닫는 괄호가 없습니다.")
+            take()
+            return node
+        raise ValueError("검색어가 필요한 위치에 " + (f"'{kind}'" if kind else "질의의 끝") + "이(가) 있습니다.")
+
+    if not tokens: raise ValueError("검색어를 입력하세요.")
+    node = parse_or()
+    if pos < len(tokens): raise ValueError(f"'{tokens[pos][1] or tokens[pos][0]}' 부근을 해석할 수 없습니다.")
+    return node
+
+
+# ----------------------------------------------------------------------
+# 4. 색인 및 질의 계산
+# ----------------------------------------------------------------------
+class _Match:
+    """질의 일부의 계산 결과: 일치 행, 강조 구간, (위치 조건에 쓸) 기준 구간"""
+    __slots__ = ("rows", "hl_starts", "hl_ends", "starts", "ends")
+
+    def __init__(self, rows, hl_starts, hl_ends, starts=None, ends=None):
+        self.rows, self.hl_starts, self.hl_ends, self.starts, self.ends = rows, hl_starts, hl_ends, starts, ends
+
+_EMPTY = np.empty(0, np.int64)
+
+
+class TextIndex:
+    """여러 스냅샷을 합친 위치 역색인. rows: 행 정보(META_COLUMNS), row_starts: 행별 전체 텍스트 시작 위치"""
+
+    def __init__(self, meta, keys, ptr, positions):
+        self.rows = meta.reset_index(drop=True)
+        lengths = self.rows["content"].str.len().to_numpy(dtype=np.int64) + 1
+        self.row_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        self.keys, self.ptr, self.positions = keys, ptr, positions
+
+    @classmethod
+    def from_rows(cls, meta):
+        """행 정보(content 포함)로 바로 색인 생성 (전체 개정본 검색의 후보 행 등)"""
+        keys, counts, positions = build_postings(meta["content"].tolist())
+        return cls(meta, keys, np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), positions.astype(np.int64))
+
+    @classmethod
+    def load(cls, conns):
+        """DB 연결 목록(통합 DB 1개 또는 샤드들)에서 최신 스냅샷 색인과 행 정보를 읽어 합침"""
+        metas, keys, positions = [], [], []
+        offset = 0
+        for conn in conns:
+            for reg_name, reg_date, ids_blob, keys_blob, counts_blob, pos_blob in conn.execute(f'''
+                SELECT regulation_name, reg_date, row_ids, gram_keys, gram_counts, positions FROM text_postings
+                WHERE (regulation_name, reg_date) IN ({LATEST_SQL}) ORDER BY regulation_name
+            '''):
+                ids = _unpack(ids_blob, np.int64)
+                meta = pd.DataFrame.from_records(conn.execute(
+                    META_SELECT + " WHERE regulation_name=? AND reg_date=? ORDER BY id", (reg_name, reg_date)).fetchall(),
+                    columns=META_COLUMNS)
+                # 색인을 만든 뒤 스냅샷이 다시 적재되었으면(행 id가 다르면) 다음 적재 때까지 제외
+                if not np.array_equal(meta["id"].to_numpy(), ids): continue
+                metas.append(meta)
+                keys.append(np.repeat(_unpack(keys_blob, np.int64), _unpack(counts_blob, np.int32)))
+                positions.append(_unpack(pos_blob, np.int32).astype(np.int64) + offset)
+                offset += int(meta["content"].str.len().sum()) + len(meta)
+        if not metas:
+            return cls(pd.DataFrame(columns=META_COLUMNS), _EMPTY, np.zeros(1, np.int64), _EMPTY)
+        all_keys = np.concatenate(keys)
+        # 스냅샷 순서대로 위치가 커지므로 안정 정렬하면 키 안에서 위치 순서가 유지됨
+        order = np.argsort(all_keys, kind="stable")
+        uniq, counts = np.unique(all_keys[order], return_counts=True)
+        return cls(pd.concat(metas, ignore_index=True), uniq,
+                   np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), np.concatenate(positions)[order])
+
+    def __len__(self):
+        return len(self.rows)
+
+    # --- 검색어 위치 ---
+    def _postings(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key: return self.positions[self.ptr[i]:self.ptr[i + 1]]
+        return _EMPTY
+
+    def term_starts(self, term):
+        """검색어가 나오는 시작 위치 (전체 텍스트 기준, 오름차순)"""
+        codes = [ord(c) for c in term.translate(_FOLD)]
+        if len(codes) == 1:
+            # 1글자: 그 글자로 시작하는 2-gram 키 범위 전체
+            lo = np.searchsorted(self.keys, codes[0] << _CODE_BITS)
+            hi = np.searchsorted(self.keys, (codes[0] + 1) << _CODE_BITS)
+            return np.sort(self.positions[self.ptr[lo]:self.ptr[hi]])
+        lists = [(self._postings((a << _CODE_BITS) | b), i) for i, (a, b) in enumerate(zip(codes, codes[1:]))]
+        # 짧은 목록부터 교집합 (i번째 2-gram 위치에서 i를 빼면 검색어 시작 위치)
+        lists.sort(key=lambda x: len(x[0]))
+        starts = lists[0][0] - lists[0][1]
+        for plist, shift in lists[1:]:
+            if not len(starts): break
+            starts = np.intersect1d(starts, plist - shift, assume_unique=True)
+        return starts
+
+    def row_of(self, positions):
+        return np.searchsorted(self.row_starts, positions, side="right") - 1
+
+    # --- 질의 계산 ---
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == "term":
+            starts = self.term_starts(node[1])
+            ends = starts + len(node[1])
+            return _Match(np.unique(self.row_of(starts)), starts, ends, starts, ends)
+        if kind == "not":
+            inner = self.evaluate(node[1])
+            return _Match(np.setdiff1d(np.arange(len(self.rows)), inner.rows), _EMPTY, _EMPTY)
+        if kind == "near":
+            return self._near(node[1], self.evaluate(node[2]), self.evaluate(node[3]))
+
+        a, b = self.evaluate(node[1]), self.evaluate(node[2])
+        rows = np.intersect1d(a.rows, b.rows) if kind == "and" else np.union1d(a.rows, b.rows)
+        hl_starts, hl_ends = np.concatenate([a.hl_starts, b.hl_starts]), np.concatenate([a.hl_ends, b.hl_ends])
+        if kind == "and":
+            keep = np.isin(self.row_of(hl_starts), rows)
+            return _Match(rows, hl_starts[keep], hl_ends[keep])
+        # OR: 양쪽 모두 위치가 있으면 NEAR에 다시 쓸 수 있도록 기준 구간도 합침
+        if a.starts is None or b.starts is None: return _Match(rows, hl_starts, hl_ends)
+        starts, ends = np.concatenate([a.starts, b.starts]), np.concatenate([a.ends, b.ends])
+        order = np.argsort(starts, kind="stable")
+        return _Match(rows, hl_starts, hl_ends, starts[order], ends[order])
+
+    def _near(self, k, a, b):
+        """a와 b의 기준 구간 사이 간격이 k글자 이하인 쌍 (같은 행). 결과 기준 구간은 두 구간을 덮는 구간"""
+        if a.starts is None or b.starts is None:
+            raise ValueError("NEAR는 검색어, 구문 또는 그 OR/NEAR 조합에만 쓸 수 있습니다.")
+        if not len(a.starts) or not len(b.starts): return _Match(_EMPTY, _EMPTY, _EMPTY, _EMPTY, _EMPTY)
+        max_b = int((b.ends - b.starts).max())
+        # b 시작 위치가 [a 시작 - k - b 최대 길이, a 끝 + k] 안에 있는 후보 쌍을 펼친 뒤 정확한 조건으로 거름
+        lo = np.searchsorted(b.starts, a.starts - k - max_b)
+        hi = np.searchsorted(b.starts, a.ends + k, side="right")
+        counts = hi - lo
+        ai = np.repeat(np.arange(len(a.starts)), counts)
+        bi = np.repeat(lo - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + np.arange(counts.sum())
+        gap = np.maximum(b.starts[bi] - a.ends[ai], a.starts[ai] - b.ends[bi])
+        ok = (gap <= k) & (self.row_of(a.starts[ai]) == self.row_of(b.starts[bi]))
+        ai, bi = ai[ok], bi[ok]
+        if not len(ai): return _Match(_EMPTY, _EMPTY, _EMPTY, _EMPTY, _EMPTY)
+        hl = np.unique(np.concatenate([np.stack([a.starts[ai], a.ends[ai]], 1), np.stack([b.starts[bi], b.ends[bi]], 1)]), axis=0)
+        starts, ends = np.minimum(a.starts[ai], b.starts[bi]), np.maximum(a.ends[ai], b.ends[bi])
+        order = np.argsort(starts, kind="stable")
+        return _Match(np.unique(self.row_of(starts)), hl[:, 0], hl[:, 1], starts[order], ends[order])
+
+    def search(self, query, target=None):
+        """질의 결과 행 (regulation_name, reg_date DESC, id 순) + matches 열 (본문 안의 일치 구간 목록)"""
+        result = self.evaluate(parse_query(query) if isinstance(query, str) else query)
+        rows = result.rows
+        if target is not None:
+            rows = rows[(self.rows["regulation_name"].to_numpy()[rows] == target)]
+        df = self.rows.iloc[rows].copy()
+
+        spans = {}
+        hl_rows = self.row_of(result.hl_starts)
+        for r, s, e in zip(hl_rows.tolist(), result.hl_starts.tolist(), result.hl_ends.tolist()):
+            spans.setdefault(r, []).append((s - int(self.row_starts[r]), e - int(self.row_starts[r])))
+        df["matches"] = [merge_spans(spans.get(r, [])) for r in rows.tolist()]
+        return df.sort_values(["regulation_name", "reg_date", "id"], ascending=[True, False, True]).reset_index(drop=True)
+
+
+def merge_spans(spans):
+    """겹치거나 붙은 구간을 합쳐 오름차순으로"""
+    merged = []
+    for s, e in sorted(spans):
+        if merged and s <= merged[-1][1]: merged[-1][1] = max(merged[-1][1], e)
+        else: merged.append([s, e])
+    return [tuple(m) for m in merged]
+
+
+# ----------------------------------------------------------------------
+# 5. 전체 개정본 검색 (색인 없는 스냅샷: 후보 행만 읽어 계산)
+# ----------------------------------------------------------------------
+def search_scan(conns, query, target=None, latest=False):
+    """검색어 중 하나라도 들어 있는 행(질의가 NOT만으로 되어 있으면 대상 전체)을 읽어 임시 색인으로 계산"""
+    node = parse_query(query)
+    positive = _positive_terms(node)
+    where, params = [], []
+    if positive is not None:
+        where.append("(" + " OR ".join("content LIKE ?" for _ in positive) + ")")
+        params += [f"%{t}%" for t in positive]
+    if target is not None:
+        where.append("regulation_name = ?")
+        params.append(target)
+    if latest: where.append(f"(regulation_name, reg_date) IN ({LATEST_SQL})")
+    sql = META_SELECT + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id"
+    metas = [pd.DataFrame.from_records(conn.execute(sql, params).fetchall(), columns=META_COLUMNS) for conn in conns]
+    meta = pd.concat(metas, ignore_index=True) if len(metas) > 1 else metas[0]
+    return TextIndex.from_rows(meta).search(node, target)
+
+def _positive_terms(node):
+    """결과 행이 반드시 하나는 포함하는 검색어 집합. NOT 등으로 정할 수 없으면 None(전체 후보)"""
+    kind = node[0]
+    if kind == "term": return {node[1]}
+    if kind == "not": return None
+    if kind == "near": children = node[2:]
+    else: children = node[1:]
+    sets = [_positive_terms(c) for c in children]
+    if kind in ("and", "near"):
+        # AND: 어느 한쪽의 조건만 있어도 후보를 줄일 수 있으므로 더 작은 쪽을 씀
+        known = [s for s in sets if s is not None]
+        return min(known, key=len) if known else None
+    return None if None in sets else sets[0] | sets[1]
+
+
+# ----------------------------------------------------------------------
+# 6. CLI
+# ----------------------------------------------------------------------
+def highlight(text, spans, left="[", right="]"):
+    out, last = [], 0
+    for s, e in spans:
+        out += [text[last:s], left, text[s:e], right]
+        last = e
+    return "".join(out) + text[last:]
+
+def main():
+    import regulation_db as db
+    import regulation_shards as shards
+
+    parser = argparse.ArgumentParser(description="본문 위치 역색인 생성 및 고급 검색 (AND/OR/NOT, \"구문\", NEAR/k)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="색인이 없는 최신 스냅샷의 색인 생성")
+    p_search = sub.add_parser("search", help="질의 실행")
+    p_search.add_argument("query", help='질의 (예: "공매도 AND 호가 NOT 시간외")')
+    p_search.add_argument("--reg", help="대상 규정 (기본: 전체)")
+    p_search.add_argument("--all-dates", action="store_true", help="모든 개정본 대상 (색인 대신 후보 행을 읽어 계산)")
+    p_search.add_argument("--limit", type=int, default=20, help="출력할 결과 수 (기본: 20)")
+    for p in (p_build, p_search):
+        p.add_argument("--db", default=None, help="DB 파일 (기본: regulation_master.db, 샤드 구성이면 샤드 전체)")
+    args = parser.parse_args()
+
+    files = [args.db] if args.db else (shards.shard_files() if shards.is_enabled() else [db.DB_FILE])
+    if args.command == "build":
+        for f in files:
+            db.init_db(f)
+            conn = db.get_connection(f)
+            try:
+                n = update_postings(conn.cursor())
+                if n: db.bump_data_version(conn.cursor())
+                conn.commit()
+            finally:
+                conn.close()
+            print(f"{f}: {n}개 스냅샷 색인")
+        return
+
+    conns = [db.get_connection(f) for f in files]
+    try:
+        t0 = time.perf_counter()
+        if args.all_dates:
+            df = search_scan(conns, args.query, args.reg)
+            load_ms = 0.0
+        else:
+            index = TextIndex.load(conns)
+            load_ms = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            df = index.search(args.query, args.reg)
+        query_ms = (time.perf_counter() - t0) * 1000
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        for conn in conns: conn.close()
+
+    for _, row in df.head(args.limit).iterrows():
+        print(f"[{row['regulation_name']}] {row['reg_date']} {row['ref_no']} {row['article_title']}")
+        print(f"    {highlight(row['content'], row['matches'])[:300]}")
+    print(f"\n결과 {len(df)}건 · 색인 로드 {load_ms:.0f}ms · 질의 {query_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+'규정' 폴더 감시 적재 데몬
+새로 들어오거나 바뀐 HWP/TXT/Parquet/CSV 파일을 감지해 필요한 단계만 자동으로 실행합니다.
+    .hwp 변경 -> HWP->TXT, TXT->Parquet, DB 적재
+    .txt 변경 -> TXT->Parquet, DB 적재
+    .parquet/.csv 변경 -> DB 적재 (같은 이름의 Parquet이 있으면 CSV는 내보내기 파일로 보고 무시)
+변경 감지는 Linux inotify(ctypes)를 쓰고, 쓸 수 없는 환경에서는 주기적 폴링으로 대신합니다.
+짧은 시간에 몰린 변경은 DEBOUNCE_SEC 동안 모아 하나의 배치로 작업 큐에 넣고,
+배치가 끝나면 DB의 data_version이 올라가 대시보드 캐시가 다음 재실행부터 새 데이터를 봅니다.
+적재는 별도 프로세스의 작업 스레드에서 진행되므로 사용자 세션을 막지 않습니다.
+
+사용 예:
+    python watch_folder.py                    # '규정' 폴더 감시 (시작 시 밀린 파일도 처리)
+    python watch_folder.py --polling --interval 2
+    python watch_folder.py --once             # 밀린 파일만 처리하고 종료
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import perf_trace as perf
+import regulation_db as db
+import regulation_shards as shards
+from jobs import convert_hwp_to_parquet, convert_txt_file
+
+WATCH_SUFFIXES = (".hwp", ".txt", ".parquet", ".csv")
+DEBOUNCE_SEC = 2.0
+POLL_INTERVAL_SEC = 1.0
+# 다른 프로세스(사이드바 DB 업데이트 등)가 쓰기 잠금을 놓지 않아 적재가 실패하면 이만큼 기다렸다가 다시 큐에 넣음
+LOCK_RETRY_SEC = 10.0
+
+# 파일이 바뀌었을 때 실행할 단계 (앞 단계가 바뀌면 뒤 단계도 모두 다시 실행)
+STAGES_BY_SUFFIX = {
+    ".hwp": ("hwp", "txt", "load"),
+    ".txt": ("txt", "load"),
+    ".parquet": ("load",),
+    ".csv": ("load",),
+}
+
+
+def log(msg):
+    print(f"[{datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# ----------------------------------------------------------------------
+# 1. 변경 감지 (inotify / 폴링)
+# ----------------------------------------------------------------------
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """쓰기가 끝났거나(IN_CLOSE_WRITE) 이동되어 들어온(IN_MOVED_TO) 파일만 보고"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify를 지원하지 않는 환경입니다.")
+        self.directory = Path(directory)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch 실패")
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready: return set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(buf):
+            _, _, _, name_len = _EVENT_HEADER.unpack_from(buf, pos)
+            pos += _EVENT_HEADER.size
+            name = buf[pos:pos + name_len].rstrip(b"\0")
+            pos += name_len
+            if name: changed.add(self.directory / os.fsdecode(name))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """interval마다 폴더를 훑어 (mtime, size)가 바뀐 파일을 보고"""
+
+    def __init__(self, directory, interval=POLL_INTERVAL_SEC):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self):
+        state = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    state[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = {path for path, sig in current.items() if self.state.get(path) != sig}
+        self.state = current
+        return changed
+
+    def close(self):
+        pass
+
+def make_watcher(directory, force_polling=False, interval=POLL_INTERVAL_SEC):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            log(f"inotify 사용 불가 ({e}), 폴링으로 전환합니다.")
+    return PollingWatcher(directory, interval)
+
+
+# ----------------------------------------------------------------------
+# 2. 배치 계획 (단계별 변환 함수는 jobs 모듈과 공유)
+# ----------------------------------------------------------------------
+def plan_batch(paths):
+    """변경된 파일 목록 -> {파일 경로(확장자 제외): 실행할 단계}. 같은 규정의 여러 파일이 바뀌면 가장 앞 단계부터"""
+    plan = {}
+    for path in paths:
+        stages = STAGES_BY_SUFFIX.get(path.suffix.lower())
+        if not stages or not db.parse_filename_info(path.name)[1]: continue
+        if path.suffix.lower() == ".csv" and path.with_suffix(".parquet").exists(): continue
+        stem = path.with_suffix("")
+        if len(stages) > len(plan.get(stem, ())):
+            plan[stem] = stages
+    return plan
+
+def is_stale(src, outputs):
+    """src에서 만드는 파일이 없거나, 적재 시 쓰는 파일(outputs 중 처음 있는 것)이 src보다 오래됨"""
+    out = next((o for o in outputs if o.exists()), None)
+    return out is None or src.stat().st_mtime_ns > out.stat().st_mtime_ns
+
+def pending_at_startup(data_dir, db_file=None):
+    """데몬이 꺼져 있던 동안 밀린 파일: TXT가 없거나 TXT보다 새로운 HWP, Parquet/CSV가 없거나 그보다 새로운 TXT,
+    DB에 없거나 적재 후 바뀐 Parquet/CSV"""
+    data_dir = Path(data_dir)
+    pending = [p for p in data_dir.glob("*.hwp") if is_stale(p, [p.with_suffix(".txt")])]
+    pending += [p for p in data_dir.glob("*.txt") if is_stale(p, [p.with_suffix(s) for s in db.DATA_SUFFIXES])]
+
+    loaded = {}
+    if shards.is_enabled() and db_file is None:
+        conn = shards.connect_catalog()
+        try: loaded = db.fetch_loaded_snapshots(conn)
+        finally: conn.close()
+    elif os.path.exists(db_file or db.DB_FILE):
+        db.init_db(db_file)
+        conn = db.get_connection(db_file)
+        try: loaded = db.fetch_loaded_snapshots(conn)
+        finally: conn.close()
+    for p in map(Path, db.data_files(data_dir)):
+        key = db.parse_filename_info(p.name)
+        # 카탈로그 도입 전에 적재된 스냅샷(해시 없음)은 다시 적재하지 않음
+        if key not in loaded or loaded[key] not in (None, db.file_sha256(p)):
+            pending.append(p)
+    return pending
+
+
+# ----------------------------------------------------------------------
+# 3. 작업 큐
+# ----------------------------------------------------------------------
+class IngestWorker(threading.Thread):
+    """배치를 하나씩 꺼내 단계를 실행하는 작업 스레드
+
+    단계가 직접 만든 TXT/Parquet도 감시 이벤트로 되돌아오므로, 쓰는 동안에는 경로를, 쓴 뒤에는
+    시그니처를 기록해 두고 해당 이벤트는 무시함 (is_own_output).
+    """
+
+    def __init__(self, db_file=None):
+        super().__init__(daemon=True)
+        self.db_file = db_file
+        self.jobs = queue.Queue()
+        self._writing = set()
+        self._written = {}
+        self._lock = threading.Lock()
+
+    def submit(self, paths):
+        plan = plan_batch(paths)
+        if plan: self.jobs.put(plan)
+        return len(plan)
+
+    def is_own_output(self, path):
+        with self._lock:
+            if path in self._writing: return True
+            sig = self._written.get(path)
+        return sig is not None and sig == file_signature(path)
+
+    def _produce(self, convert, src, *outs):
+        with self._lock:
+            self._writing.update(outs)
+        try:
+            convert(src)
+        finally:
+            with self._lock:
+                for out in outs:
+                    self._writing.discard(out)
+                    self._written[out] = file_signature(out)
+
+    def run(self):
+        while True:
+            plan = self.jobs.get()
+            if plan is None: break
+            try:
+                self.run_batch(plan)
+            finally:
+                self.jobs.task_done()
+
+    def run_batch(self, plan):
+        t0 = time.perf_counter()
+        data_paths = []
+        failed = retried = 0
+        with perf.request("watch_batch", files=len(plan)):
+            for stem, stages in sorted(plan.items()):
+                try:
+                    # HWP는 TXT 저장과 파싱을 한 번에 처리 (TXT를 다시 읽지 않음)
+                    if "hwp" in stages:
+                        self._produce(convert_hwp_to_parquet, stem.with_suffix(".hwp"), stem.with_suffix(".txt"), stem.with_suffix(".parquet"))
+                    elif "txt" in stages:
+                        self._produce(convert_txt_file, stem.with_suffix(".txt"), stem.with_suffix(".parquet"))
+                    # 적재는 Parquet 우선, 없으면 구버전 CSV
+                    data_paths.append(next(p for p in (stem.with_suffix(s) for s in db.DATA_SUFFIXES) if p.exists()))
+                except Exception as e:
+                    failed += 1
+                    log(f"[오류] {stem.name}: {e}")
+
+            loaded = []
+            if data_paths:
+                try:
+                    # 샤드 구성이면 바뀐 규정의 샤드만 잠그고 적재
+                    if shards.is_enabled() and self.db_file is None:
+                        loaded = shards.ingest_csv_files([str(p) for p in data_paths])
+                    else:
+                        loaded = db.ingest_csv_files([str(p) for p in data_paths], self.db_file)
+                except Exception as e:
+                    if db.is_locked_error(e):
+                        # 버리면 파일이 다시 바뀔 때까지 반영되지 않으므로 적재 단계만 다시 큐에 넣음
+                        # (task_done 전에 넣으므로 --once도 재시도가 끝날 때까지 기다림)
+                        log(f"[재시도] DB 쓰기 잠금 대기 초과, {LOCK_RETRY_SEC:.0f}초 후 다시 적재: {e}")
+                        time.sleep(LOCK_RETRY_SEC)
+                        self.jobs.put({p.with_suffix(""): ("load",) for p in data_paths})
+                        retried = len(data_paths)
+                    else:
+                        failed += len(data_paths)
+                        log(f"[오류] DB 적재 실패: {e}")
+
+        for reg_name, reg_date, rows in loaded:
+            log(f"  적재: {reg_name} ({reg_date}) {rows:,}행")
+        retry = f", 재시도 {retried}건" if retried else ""
+        log(f"배치 완료: {len(loaded)}개 스냅샷 반영, 오류 {failed}건{retry}, {time.perf_counter() - t0:.1f}s")
+
+    def stop(self):
+        self.jobs.put(None)
+        self.join()
+
+
+# ----------------------------------------------------------------------
+# 4. 메인 루프 (디바운스)
+# ----------------------------------------------------------------------
+def watch(data_dir, db_file=None, debounce=DEBOUNCE_SEC, force_polling=False, interval=POLL_INTERVAL_SEC, once=False):
+    os.makedirs(data_dir, exist_ok=True)
+    worker = IngestWorker(db_file)
+    worker.start()
+
+    startup = pending_at_startup(data_dir, db_file)
+    if startup:
+        log(f"밀린 파일 {len(startup)}개 처리")
+        worker.submit(startup)
+    if once:
+        worker.jobs.join()
+        worker.stop()
+        return
+
+    watcher = make_watcher(data_dir, force_polling, interval)
+    log(f"'{data_dir}' 감시 시작 ({type(watcher).__name__}, 디바운스 {debounce}s)")
+    pending = set()
+    last_event = 0.0
+    try:
+        while True:
+            changed = {p for p in watcher.poll(timeout=min(debounce, 0.5))
+                       if p.suffix.lower() in WATCH_SUFFIXES and not worker.is_own_output(p)}
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_event = now
+            elif pending and now - last_event >= debounce:
+                # 배치를 넣기 직전에 사라진 파일(임시 파일 등)은 제외
+                batch = [p for p in pending if p.exists() and not worker.is_own_output(p)]
+                pending = set()
+                if worker.submit(batch):
+                    log(f"변경 {len(batch)}개 감지 -> 작업 큐 등록 (대기 {worker.jobs.qsize()}건)")
+    except KeyboardInterrupt:
+        log("종료 중... (진행 중인 배치를 마칩니다)")
+    finally:
+        watcher.close()
+        worker.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="'규정' 폴더 감시 후 HWP/TXT/Parquet/CSV 변경분 자동 적재")
+    parser.add_argument("--data-dir", default=db.DATA_DIR, help="감시할 폴더 (기본: 규정)")
+    parser.add_argument("--db", default=None, help=f"DB 파일 (기본: {db.DB_FILE})")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SEC, help="마지막 변경 후 배치를 시작할 때까지 기다릴 초")
+    parser.add_argument("--polling", action="store_true", help="inotify 대신 폴링 사용")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SEC, help="폴링 주기(초)")
+    parser.add_argument("--once", action="store_true", help="밀린 파일만 처리하고 종료")
+    args = parser.parse_args()
+    watch(args.data_dir, args.db, args.debounce, args.polling, args.interval, args.once)
+
+
+if __name__ == "__main__":
+    main()